@@ -0,0 +1,145 @@
+import json
+import time
+import argparse
+from collections import defaultdict
+
+from scripts.page_crawler.crawl_frontier import MemoryFrontier
+from scripts.page_crawler.link_scorer import create_link_scorer
+from scripts.page_crawler.budget_allocator import BudgetAllocator
+from benchmark.bench_frontier import generate_site
+
+
+# Saved crawl grouped by site: {site_name: (root url, {url: page})}.
+# Generated sites have different sizes, so the uniform split is too large for small sites and too small for large ones.
+def load_site_dict():
+    site_dict = {}
+    if args.page_list_path is not None:
+        with open(args.page_list_path) as f:
+            for line in f:
+                page = json.loads(line)
+                site = site_dict.setdefault(page["site_name"], [page["url"], {}])
+                site[1][page["url"]] = page
+                if page.get("page_depth") == 0:
+                    site[0] = page["url"]
+    else:
+        article_size_list = [int(size) for size in args.article_size_list.split(",")]
+        for site_id in range(args.site_size):
+            article_size = article_size_list[site_id % len(article_size_list)]
+            site_dict[f"site{site_id}"] = generate_site(site_id, article_size, 10, 20)
+    return site_dict
+
+
+# Useful pages are content pages: gold label "contents" if the page list is labeled, otherwise pages with publish date
+def get_useful_url_set(page_dict):
+    if any(["gold" in page for page in page_dict.values()]):
+        return set([url for url, page in page_dict.items() if page.get("gold") == "contents"])
+    return set([url for url, page in page_dict.items() if page.get("publish_datetime", "None") != "None"])
+
+
+# Replay the crawl of all sites on the saved link graph, one fetch per site in turn (round robin).
+# If "worker_size" is specified, only that many sites are crawled at a time and the next site starts when one finishes
+# (the same as the process pool of the sequential crawl).
+# Without allocator, every site gets "total_budget / site size" pages.
+# With allocator, the page limit of the site is updated in the same way as "GeneralCrawler.get_page_limit".
+def simulate(site_dict, useful_url_set_dict, total_budget, allocator=None):
+    site_state_dict = {}
+    for site_name, (root_url, page_dict) in site_dict.items():
+        frontier = MemoryFrontier(scorer=create_link_scorer(args.frontier_priority))
+        frontier.push(root_url, "", 0)
+        frontier.add_seen(root_url)
+        site_state_dict[site_name] = {
+            "frontier": frontier, "collected": 0, "useful": 0, "granted": 0, "fetch_count": 0, "new_url_count": 0,
+        }
+
+    uniform_budget = total_budget // len(site_dict)
+    waiting_site_list = list(site_dict.keys())
+    worker_size = args.worker_size if args.worker_size is not None else len(waiting_site_list)
+    active_site_list = []
+    while len(active_site_list) > 0 or len(waiting_site_list) > 0:
+        start_size = worker_size - len(active_site_list)
+        active_site_list += waiting_site_list[0:start_size]
+        waiting_site_list = waiting_site_list[start_size:]
+        next_active_site_list = []
+        for site_name in active_site_list:
+            state = site_state_dict[site_name]
+            if allocator is None:
+                page_limit = uniform_budget
+            else:
+                if state["collected"] >= state["granted"]:
+                    state["granted"] += allocator.request(site_name, state["fetch_count"], state["new_url_count"])
+                    state["fetch_count"] = 0
+                    state["new_url_count"] = 0
+                page_limit = state["granted"]
+
+            frontier = state["frontier"]
+            if len(frontier) == 0 or state["collected"] >= page_limit:
+                if allocator is not None:
+                    allocator.finish(site_name, state["collected"])
+                continue
+            next_active_site_list.append(site_name)
+
+            url, _, depth = frontier.pop()
+            state["collected"] += 1
+            state["useful"] += url in useful_url_set_dict[site_name]
+            new_url_count = 0
+            for link in site_dict[site_name][1].get(url, {}).get("child_url_list", []):
+                if frontier.add_seen(link):
+                    frontier.push(link, url, depth+1)
+                    new_url_count += 1
+            state["fetch_count"] += 1
+            state["new_url_count"] += new_url_count
+        active_site_list = next_active_site_list
+
+    return site_state_dict
+
+
+# Compare useful pages per fetched page of the uniform split and the adaptive allocation of one global budget
+def main():
+    site_dict = load_site_dict()
+    useful_url_set_dict = {site_name: get_useful_url_set(page_dict) for site_name, (_, page_dict) in site_dict.items()}
+    page_size = sum([len(page_dict) for _, page_dict in site_dict.values()])
+    total_budget = args.total_budget if args.total_budget is not None else page_size // 4
+
+    print(
+        f"Site size: {len(site_dict)}, page size: {page_size}, "
+        f"useful page size: {sum([len(url_set) for url_set in useful_url_set_dict.values()])}, total budget: {total_budget}"
+    )
+    print("allocation,fetched pages,useful pages,useful pages/fetched page,useful pages/budget,max site share,sites without page,elasped sec")
+    for allocation in ["uniform", "adaptive"]:
+        start_time = time.time()
+        allocator = BudgetAllocator(total_budget, list(site_dict.keys()), args.budget_grant_size) if allocation == "adaptive" else None
+        site_state_dict = simulate(site_dict, useful_url_set_dict, total_budget, allocator)
+        elasped_time = time.time() - start_time
+
+        fetched_count = sum([state["collected"] for state in site_state_dict.values()])
+        useful_count = sum([state["useful"] for state in site_state_dict.values()])
+        max_share = max([state["collected"] for state in site_state_dict.values()]) / max(fetched_count, 1)
+        empty_site_count = len([state for state in site_state_dict.values() if state["collected"] == 0])
+        print(
+            f"{allocation},{fetched_count},{useful_count},{useful_count / max(fetched_count, 1):.3f},"
+            f"{useful_count / total_budget:.3f},{max_share:.3f},{empty_site_count},{elasped_time:.2f}"
+        )
+        if args.verbose:
+            site_count_dict = defaultdict(int)
+            for site_name, state in site_state_dict.items():
+                site_count_dict[site_name] = state["collected"]
+            print(f"  fetched pages per site: {dict(site_count_dict)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_list_path", type=str, default=None, help=(
+        "Saved crawl (JSONL with site_name, url, child_url_list, page_depth, and gold or publish_datetime). "
+        "If not specified, generated sites are used"
+    ))
+    parser.add_argument("--site_size", type=int, default=6, help="Number of generated sites")
+    parser.add_argument("--article_size_list", type=str, default="100,300,1000,3000,10000,30000", help="Number of articles of generated sites (cycled)")
+    parser.add_argument("--total_budget", type=int, default=None, help="Number of pages to fetch in all sites (default: a quarter of the saved pages)")
+    parser.add_argument("--budget_grant_size", type=int, default=None, help="Pages per grant of the allocator")
+    parser.add_argument("--worker_size", type=int, default=None, help="Number of sites crawled at a time (default: all sites)")
+    parser.add_argument("--frontier_priority", type=str, default="bfs", help="Frontier of each site")
+    parser.add_argument("--verbose", action="store_true", help="If true, print fetched pages per site")
+
+    args = parser.parse_args()
+
+    main()
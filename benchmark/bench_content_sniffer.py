@@ -0,0 +1,131 @@
+import json
+import time
+import argparse
+import chardet
+import magic
+
+from benchmark.local_server import generate_page
+from scripts.page_crawler.content_sniffer import ContentSniffer
+from scripts.page_crawler.page_archive import load_saved_page
+
+
+# File type and encoding detection of the previous crawler (libmagic and chardet over the whole page)
+class LegacySniffer():
+    def __init__(self):
+        self.valid_encoding_cand_list = []
+
+    def sniff(self, byte_text, content_type, depth):
+        file_type = magic.from_buffer(byte_text, mime=True).split("/")[-1]
+        if file_type != "html":
+            return file_type, None, None
+
+        if depth == 0:
+            default_encoding = chardet.detect(byte_text)["encoding"]
+            if default_encoding != "utf-8":
+                self.valid_encoding_cand_list = ["utf-8", default_encoding]
+            else:
+                self.valid_encoding_cand_list = ["utf-8"]
+
+        text = None
+        for encoding_cand in self.valid_encoding_cand_list:
+            try:
+                text = byte_text.decode(encoding=encoding_cand)
+                encoding = encoding_cand
+            except Exception:
+                continue
+
+        if text is None:
+            try:
+                encoding = chardet.detect(byte_text)["encoding"]
+                text = byte_text.decode(encoding=encoding)
+            except Exception:
+                encoding = None
+                text = byte_text
+
+        return file_type, encoding, text
+
+
+class FastSniffer():
+    def __init__(self):
+        self.content_sniffer = ContentSniffer()
+
+    def sniff(self, byte_text, content_type, depth):
+        file_type = self.content_sniffer.sniff_file_type(byte_text, content_type)
+        if file_type != "html":
+            return file_type, None, None
+        encoding, text = self.content_sniffer.detect_encoding(byte_text, content_type)
+        return file_type, encoding, text
+
+
+# Pages of one site: (byte_text, Content-Type header, depth)
+def generate_site(site_id, encoding, page_size, page_bytes, use_header, use_meta):
+    page_list = []
+    for i in range(page_size):
+        text = generate_page(site_id * 100000 + i, page_bytes).decode()
+        # Non-ASCII text so that the encoding matters
+        text = text.replace("</p>", " café naïve</p>" if encoding == "cp1252" else " 日本語のニュース記事</p>")
+        if use_meta:
+            text = text.replace("<head>", f'<head><meta charset="{encoding}">')
+        header = f"text/html; charset={encoding}" if use_header else None
+        page_list.append((text.encode(encoding), header, 0 if i == 0 else 1))
+    return page_list
+
+
+def load_site_list():
+    if args.page_list_path is not None:
+        site_dict = {}
+        with open(args.page_list_path) as f:
+            for line in f:
+                page = json.loads(line)
+                site_page_list = site_dict.setdefault(page["site_name"], [])
+                if len(site_page_list) < args.page_size:
+                    site_page_list.append((load_saved_page(page["save_path"]), None, page["page_depth"]))
+        return list(site_dict.values())
+
+    site_list = []
+    setting_list = [
+        ("utf-8", True, True), ("utf-8", False, True), ("utf-8", False, False),
+        ("shift_jis", False, True), ("shift_jis", False, False), ("euc_jp", True, False), ("cp1252", False, False),
+    ]
+    for site_id, (encoding, use_header, use_meta) in enumerate(setting_list):
+        site_list.append(generate_site(site_id, encoding, args.page_size, args.page_bytes, use_header, use_meta))
+    return site_list
+
+
+# Compare pages/sec of file type and encoding detection, and check both paths give the same text
+def main():
+    site_list = load_site_list()
+    page_count = sum([len(site_page_list) for site_page_list in site_list])
+    print(f"Site size: {len(site_list)}, page size: {page_count}")
+
+    result_dict = {}
+    print("sniffer,pages/sec,elasped sec")
+    for name, sniffer_class in [("legacy", LegacySniffer), ("fast", FastSniffer)]:
+        result_dict[name] = []
+        start_time = time.time()
+        for site_page_list in site_list:
+            sniffer = sniffer_class()
+            for byte_text, content_type, depth in site_page_list:
+                result_dict[name].append(sniffer.sniff(byte_text, content_type, depth))
+        elasped_time = time.time() - start_time
+        print(f"{name},{page_count / elasped_time:.1f},{elasped_time:.2f}")
+
+    file_type_mismatch_count = 0
+    text_mismatch_count = 0
+    for legacy_result, fast_result in zip(result_dict["legacy"], result_dict["fast"]):
+        if legacy_result[0] != fast_result[0]:
+            file_type_mismatch_count += 1
+        elif legacy_result[2] != fast_result[2]:
+            text_mismatch_count += 1
+    print(f"File type mismatch: {file_type_mismatch_count}, decoded text mismatch: {text_mismatch_count}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_list_path", type=str, default=None, help="Crawled page list (JSONL). If not specified, generated pages are used")
+    parser.add_argument("--page_size", type=int, default=100, help="Number of pages per site")
+    parser.add_argument("--page_bytes", type=int, default=30000, help="Bytes of generated page")
+
+    args = parser.parse_args()
+
+    main()
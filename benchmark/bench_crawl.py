@@ -0,0 +1,138 @@
+import os
+import io
+import time
+import argparse
+import resource
+import tempfile
+import warnings
+import contextlib
+import multiprocessing
+from types import SimpleNamespace
+
+from benchmark.news_site_server import start_news_sites
+from scripts.page_crawler.general_crawler import GeneralCrawler
+from scripts.page_crawler.index_crawler import IndexCrawler
+from scripts.page_crawler.async_crawl_engine import AsyncCrawlEngine
+from scripts.page_crawler.scheduler_crawl_engine import SchedulerCrawlEngine
+from scripts.utils import thread_process_crawl_stream, merge_page_shards
+
+# Crawler modules enable warnings once, and connections left in the pools at exit are not of interest here
+warnings.filterwarnings("ignore", category=ResourceWarning)
+
+
+def create_crawler_list(root_url_list, download_tool, data_raw_folder):
+    crawler_list = []
+    for site_id, root_url in enumerate(root_url_list):
+        crawler = GeneralCrawler(
+            f"site{site_id}", f"{root_url}/", False, 8, "strict", data_raw_folder, 1000000000,
+            download_tool=download_tool, precheck=args.precheck, shard_folder=f"{data_raw_folder}/page_list_shards",
+        )
+        crawler.crawl_delay = args.crawl_delay
+        crawler_list.append(crawler)
+    return crawler_list
+
+
+# Index crawler reads the sitemaps of the sites (pages are urls in sitemaps)
+def index_crawl(root_url_list, download_tool):
+    crawler_args = SimpleNamespace(
+        disable_page_reget=False, page_size=1000000000, download_tool=download_tool, storage="file", archive_compression="zlib",
+        sitemap_concurrency=8, refresh=False, archive_concurrency=4, archive_rate_limit=10, robots_ttl=86400,
+    )
+    page_list = []
+    for site_id, root_url in enumerate(root_url_list):
+        crawler = IndexCrawler(crawler_args, f"site{site_id}", [f"{root_url}/sitemap.xml"])
+        page_list += crawler.crawl_wrapper()
+    return page_list
+
+
+# Run one crawl in this (child) process and put the result to "result_queue".
+# Crawl engines write page records to per-site shards, which are merged into page_list.jsonl (the same as crawl.py).
+# CPU time and peak memory include the worker processes of the sequential engine.
+def run_crawl(result_queue, engine, download_tool, root_url_list):
+    with tempfile.TemporaryDirectory() as data_raw_folder:
+        # Index crawler saves pages to "./data/index_raw"
+        os.chdir(data_raw_folder)
+        start_time = time.time()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            output_path = f"{data_raw_folder}/page_list.jsonl"
+            if engine == "index":
+                page_count = len(index_crawl(root_url_list, download_tool))
+            else:
+                crawler_list = create_crawler_list(root_url_list, download_tool, data_raw_folder)
+                func_args = (args.page_size, ["html"])
+                if engine == "sequential":
+                    page_count = thread_process_crawl_stream(
+                        crawler_list, func_args, output_path, executor_type="process", max_workers=len(crawler_list)
+                    )
+                else:
+                    if engine == "async":
+                        shard_info_list = AsyncCrawlEngine(crawler_list).crawl(*func_args)
+                    else:
+                        shard_info_list = SchedulerCrawlEngine(crawler_list, max_workers=args.max_workers).crawl(*func_args)
+                    with open(output_path, "wb") as f:
+                        page_count = merge_page_shards(shard_info_list, f)
+        elasped_time = time.time() - start_time
+
+    usage_list = [resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)]
+    result_queue.put({
+        "page_count": page_count,
+        "elasped_time": elasped_time,
+        "cpu_time": sum([usage.ru_utime + usage.ru_stime for usage in usage_list]),
+        # KB in Linux
+        "max_rss": max([usage.ru_maxrss for usage in usage_list]) / 1024,
+    })
+
+
+# Crawl deterministic synthetic news sites on local servers with each crawl engine and download backend,
+# and compare pages/sec, CPU time per page and peak memory (RSS) of the crawl process.
+# Each crawl runs in a new process (servers run in this process), so CPU time and memory of the runs are not mixed.
+def main():
+    server_list = start_news_sites(
+        args.site_size, article_size=args.article_size, trap=args.disable_trap is False,
+        slow_rate=args.slow_rate, slow_sec=args.slow_sec,
+    )
+    root_url_list = [root_url for _, root_url in server_list]
+
+    print(
+        f"Site size: {args.site_size}, article size: {args.article_size}, page size per site: {args.page_size}, "
+        f"crawl delay: {args.crawl_delay}, slow rate: {args.slow_rate}"
+    )
+    print("engine,download_tool,pages,pages/sec,cpu ms/page,max rss MB,elasped sec")
+    for engine in args.engine_list:
+        for download_tool in args.download_tool_list:
+            result_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_crawl, args=(result_queue, engine, download_tool, root_url_list))
+            process.start()
+            result = result_queue.get()
+            process.join()
+
+            page_count = max(result["page_count"], 1)
+            print(
+                f"{engine},{download_tool},{result['page_count']},{result['page_count'] / result['elasped_time']:.1f},"
+                f"{result['cpu_time'] / page_count * 1000:.2f},{result['max_rss']:.1f},{result['elasped_time']:.2f}"
+            )
+
+    for server, _ in server_list:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--site_size", type=int, default=4, help="Number of synthetic news sites (one local host per site)")
+    parser.add_argument("--article_size", type=int, default=1000, help="Number of articles per site")
+    parser.add_argument("--page_size", type=int, default=300, help="Number of pages to crawl per site")
+    parser.add_argument("--crawl_delay", type=float, default=0, help="Crawl delay of each site (seconds)")
+    parser.add_argument("--slow_rate", type=float, default=0.05, help="Rate of articles answered slowly")
+    parser.add_argument("--slow_sec", type=float, default=0.2, help="Seconds to wait before answering slow articles")
+    parser.add_argument("--disable_trap", action="store_true", help="If true, sites have no endless calendar")
+    parser.add_argument("--precheck", type=str, default="head", help="Content-Type pre-check of crawler", choices=["head", "range", "none"])
+    parser.add_argument("--max_workers", type=int, default=16, help="Download threads of scheduler engine")
+    parser.add_argument("--engine_list", type=str, nargs="*", default=["sequential", "async", "scheduler", "index"], help=(
+        "Crawl engines to compare (index: IndexCrawler on sitemaps)"
+    ))
+    parser.add_argument("--download_tool_list", type=str, nargs="*", default=["curl", "http"], help="Download backends to compare")
+
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,38 @@
+import time
+import argparse
+import tempfile
+
+from benchmark.local_server import start_server, PageHandler
+from scripts.page_crawler.downloader import Downloader
+
+
+# Compare download backends of Downloader on a local test server
+def main():
+    PageHandler.page_bytes = args.page_bytes
+    server, root_url = start_server()
+    url_list = [f"{root_url}/page/{i}" for i in range(args.page_size)]
+
+    print(f"Page size: {args.page_size}, page bytes: {args.page_bytes}")
+    print("download_tool,pages/sec,elasped sec")
+    for download_tool in args.download_tool_list:
+        with tempfile.TemporaryDirectory() as data_raw_folder:
+            downloader = Downloader(download_tool, data_raw_folder, "bench")
+            start_time = time.time()
+            for url in url_list:
+                downloader.download(url, page_reget=True, not_save=args.not_save, crawl_delay=0)
+            elasped_time = time.time() - start_time
+        print(f"{download_tool},{args.page_size / elasped_time:.1f},{elasped_time:.2f}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_size", type=int, default=500, help="Number of pages to download per backend")
+    parser.add_argument("--page_bytes", type=int, default=30000, help="Size of each generated page")
+    parser.add_argument("--download_tool_list", type=str, nargs="*", default=["curl", "http"], help="Backends to compare")
+    parser.add_argument("--not_save", action="store_true", help="If true, do not save downloaded pages")
+
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,154 @@
+import json
+import time
+import random
+import datetime
+import argparse
+import traceback
+from collections import defaultdict
+
+from scripts.page_crawler.crawl_frontier import MemoryFrontier
+from scripts.page_crawler.link_scorer import create_link_scorer
+
+
+# Synthetic news site: homepage -> sections / tags -> paginated lists -> articles (newest first).
+# Homepage and articles link to many older (popular and related) articles, so BFS spends the budget on old articles.
+def generate_site(site_id, article_size, section_size, list_page_article_size, related_size=20):
+    rng = random.Random(site_id)
+    root_url = f"https://site{site_id}.example.com/"
+    word_list = ["market", "election", "storm", "court", "team", "study", "city", "minister", "price", "school", "report", "fire"]
+    last_date = datetime.date(2024, 12, 31)
+
+    section_list = [f"{root_url}section/s{i}/" for i in range(section_size)]
+    tag_list = [f"{root_url}tag/t{i}/" for i in range(section_size * 2)]
+    page_dict = {}
+
+    article_list = []
+    for i in range(article_size):
+        publish_date = last_date - datetime.timedelta(days=i * 365 // article_size)
+        slug = "-".join(rng.choice(word_list) for _ in range(rng.randint(6, 12)))
+        url = f"{root_url}{publish_date.year}/{publish_date.month:02}/{publish_date.day:02}/{slug}-{i}.html"
+        article_list.append((url, publish_date, rng.choice(section_list), rng.choice(tag_list)))
+
+    section_article_dict = defaultdict(list)
+    tag_article_dict = defaultdict(list)
+    for url, publish_date, section_url, tag_url in article_list:
+        section_article_dict[section_url].append(url)
+        tag_article_dict[tag_url].append(url)
+
+    nav_list = [root_url] + section_list
+    popular_list = [article_list[rng.randrange(article_size // 10, article_size)][0] for _ in range(related_size * 2)]
+    for num, (url, publish_date, section_url, tag_url) in enumerate(article_list):
+        related_list = [article_list[rng.randrange(num, article_size)][0] for _ in range(related_size)]
+        child_url_list = related_list + popular_list[0:related_size] + [tag_url] + nav_list
+        page_dict[url] = {"child_url_list": child_url_list, "publish_datetime": publish_date.strftime("%Y-%m-%d")}
+
+    for list_url, url_list in list(section_article_dict.items()) + list(tag_article_dict.items()):
+        page_url_list = [list_url] + [f"{list_url}page/{i}/" for i in range(2, (len(url_list) - 1) // list_page_article_size + 2)]
+        for i, page_url in enumerate(page_url_list):
+            next_list = page_url_list[i+1:i+2]
+            child_url_list = nav_list + url_list[i*list_page_article_size:(i+1)*list_page_article_size] + next_list
+            page_dict[page_url] = {"child_url_list": child_url_list, "publish_datetime": "None"}
+
+    # Links of the homepage are in the order of the layout (not sorted by page type)
+    child_url_list = nav_list + tag_list + [url for url, _, _, _ in article_list[0:10]] + popular_list
+    rng.shuffle(child_url_list)
+    page_dict[root_url] = {"child_url_list": child_url_list, "publish_datetime": "None"}
+    return root_url, page_dict
+
+
+# Saved crawl (processed page list with "publish_datetime") grouped by site: {site_name: (root url, {url: page})}
+def load_site_dict():
+    site_dict = {}
+    if args.page_list_path is not None:
+        with open(args.page_list_path) as f:
+            for line in f:
+                page = json.loads(line)
+                site = site_dict.setdefault(page["site_name"], [page["url"], {}])
+                site[1][page["url"]] = page
+                if page.get("page_depth") == 0:
+                    site[0] = page["url"]
+    else:
+        for site_id in range(args.site_size):
+            site_dict[f"site{site_id}"] = generate_site(site_id, args.article_size, 10, 20)
+    return site_dict
+
+
+# Pages published within "fresh_days" days from the latest page of the site (same as evaluate.py)
+def get_fresh_url_set(page_dict):
+    date_dict = {
+        url: datetime.datetime.strptime(page["publish_datetime"], "%Y-%m-%d")
+        for url, page in page_dict.items() if page.get("publish_datetime", "None") != "None"
+    }
+    if len(date_dict) == 0:
+        return set()
+    last_date = max(date_dict.values())
+    return set([url for url, date in date_dict.items() if last_date - date <= datetime.timedelta(days=args.fresh_days)])
+
+
+# Replay the crawl on the saved link graph with the frontier. Return the number of fetched fresh pages after each fetch.
+# Urls which are not in the saved crawl are counted as fetched pages without links.
+def simulate(root_url, page_dict, fresh_url_set, scorer, max_fetch_size):
+    frontier = MemoryFrontier(scorer=scorer)
+    frontier.push(root_url, "", 0)
+    frontier.add_seen(root_url)
+    fetched_fresh_count = 0
+    coverage_list = []
+    while len(frontier) > 0 and len(coverage_list) < max_fetch_size:
+        url, parent_url, depth = frontier.pop()
+        if url in fresh_url_set:
+            fetched_fresh_count += 1
+        for link in page_dict.get(url, {}).get("child_url_list", []):
+            if frontier.add_seen(link):
+                frontier.push(link, url, depth+1)
+        coverage_list.append(fetched_fresh_count)
+    return coverage_list
+
+
+# Compare fresh-content coverage per fetched page of BFS and priority frontiers
+def main():
+    site_dict = load_site_dict()
+    fetch_size_list = [int(size) for size in args.fetch_size_list.split(",")]
+    max_fetch_size = max(fetch_size_list)
+
+    print(f"Site size: {len(site_dict)}, page size: {sum([len(page_dict) for _, page_dict in site_dict.values()])}")
+    print("frontier_priority," + ",".join([f"coverage@{size}" for size in fetch_size_list]) + ",fresh pages/fetched page,elasped sec")
+    for frontier_priority in args.frontier_priority_list.split(","):
+        try:
+            create_link_scorer(frontier_priority)
+        except Exception:
+            print(f"Skip {frontier_priority} because the scorer cannot be created")
+            print(traceback.format_exc())
+            continue
+
+        start_time = time.time()
+        coverage_dict = defaultdict(list)
+        fresh_per_fetch_list = []
+        for site_name, (root_url, page_dict) in site_dict.items():
+            fresh_url_set = get_fresh_url_set(page_dict)
+            if len(fresh_url_set) == 0:
+                continue
+            coverage_list = simulate(root_url, page_dict, fresh_url_set, create_link_scorer(frontier_priority), max_fetch_size)
+            for size in fetch_size_list:
+                fetched_fresh_count = coverage_list[min(size, len(coverage_list)) - 1]
+                coverage_dict[size].append(fetched_fresh_count / len(fresh_url_set))
+            fresh_per_fetch_list.append(coverage_list[-1] / len(coverage_list))
+        elasped_time = time.time() - start_time
+
+        coverage_text = ",".join([f"{sum(coverage_dict[size]) / len(coverage_dict[size]):.3f}" for size in fetch_size_list])
+        print(f"{frontier_priority},{coverage_text},{sum(fresh_per_fetch_list) / len(fresh_per_fetch_list):.3f},{elasped_time:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_list_path", type=str, default=None, help=(
+        "Processed page list (JSONL with url, child_url_list, publish_datetime, page_depth). If not specified, generated sites are used"
+    ))
+    parser.add_argument("--site_size", type=int, default=5, help="Number of generated sites")
+    parser.add_argument("--article_size", type=int, default=5000, help="Number of articles per generated site")
+    parser.add_argument("--fresh_days", type=int, default=5, help="Pages published within this number of days from the latest page are fresh")
+    parser.add_argument("--fetch_size_list", type=str, default="10,30,100,300,1000", help="Number of fetched pages to report coverage")
+    parser.add_argument("--frontier_priority_list", type=str, default="bfs,url_depth,path_pattern,classifier_rule", help="Frontiers to compare")
+
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import argparse
+from urllib.parse import urlparse, urljoin
+from bs4 import BeautifulSoup
+
+from benchmark.local_server import generate_page
+from scripts.page_crawler.link_extractor import LinkExtractor, extract_links
+from scripts.page_crawler.page_archive import load_saved_page
+
+
+# Link extraction of the previous crawler (BeautifulSoup)
+def bs4_extract_links(text, url):
+    child_url_list = []
+    soup = BeautifulSoup(text, "html.parser")
+    link_list = [element.get("href").strip() for element in soup.find_all("a", href=True)]
+    for link in link_list:
+        try:
+            parsed_link = urlparse(link)
+        except Exception:
+            continue
+
+        if parsed_link.scheme not in ["", "http", "https"]:
+            continue
+
+        if parsed_link.netloc == "":
+            link = urljoin(url, link)
+
+        link = urlparse(link)._replace(fragment="").geturl()
+
+        child_url_list.append(link)
+    return child_url_list
+
+
+# Html which is easy to be parsed differently
+TRICKY_HTML_LIST = [
+    '<a href=" /a#frag ">x</a><A HREF="b?x=1&amp;y=2">y</A><a>no href</a><a href>empty</a>',
+    '<a href="mailto:x@example.com">m</a><a href="javascript:void(0)">j</a><a href="//cdn.example.com/c">c</a>',
+    '<a href="/1" href="/2">dup</a><a href=/unquoted>u</a><a href=\'/single\'>s</a>',
+    '<script>var s = "<a href=\\"/in-script\\">";</script><!-- <a href="/in-comment"> --><a href="/after">a</a>',
+    '<div><a href="/unclosed"><p><a href="/nested">n</a></div><a href="http://[invalid">i</a>',
+    '<a href="https://example.com/%E3%81%82">enc</a><a href="/日本語">ja</a><a href="&#47;entity">e</a>',
+]
+
+# Settings of "IndexCrawler" (LinkExtractor arguments, equivalent BeautifulSoup code)
+INDEX_CASE_LIST = [
+    (
+        {"link_attrs": {"class": "loop-card__title-link"}},
+        lambda soup: [e.get("href") for e in soup.find_all("a", attrs={"class": "loop-card__title-link"}, href=True)],
+    ),
+    (
+        {"container_tag": "div", "container_attrs": {"id": "post-results"}, "first_container_only": True},
+        lambda soup: [e.get("href") for e in soup.find("div", attrs={"id": "post-results"}).find_all("a", href=True)],
+    ),
+    (
+        {"container_tag": "li", "container_attrs": {"class": "day-article"}, "first_link_per_container": True},
+        lambda soup: [e.find("a", href=True).get("href") for e in soup.find_all("li", attrs={"class": "day-article"})],
+    ),
+    (
+        {"container_attrs": {"class": "news-toc-section dyn_index_articles"}, "first_container_only": True},
+        lambda soup: [e.get("href") for e in soup.find(attrs={"class": "news-toc-section dyn_index_articles"}).find_all("a", href=True)],
+    ),
+]
+
+INDEX_HTML = (
+    '<div id="nav"><a href="/nav">n</a></div>'
+    '<div id="post-results"><div><a href="/p1">1</a></div><a class="loop-card__title-link big" href="/p2">2</a></div>'
+    '<div id="post-results"><a href="/second-container">s</a></div>'
+    '<ul><li class="day-article"><span><a href="/d1">1</a></span><a href="/d1-2">1-2</a></li>'
+    '<li class="day-article new"><a href="/d2">2</a></li></ul>'
+    '<section class="news-toc-section dyn_index_articles"><a href="/w1">w1</a><a href="/w2">w2</a></section>'
+    '<a class="loop-card__title-link" href="/p3">3</a>'
+)
+
+
+# Committed html of the cases which must be extracted the same as BeautifulSoup
+# (base relative links, javascript:/mailto: links, fragments, entities and malformed tags)
+FIXTURE_FOLDER = os.path.join(os.path.dirname(__file__), "link_extractor_fixtures")
+
+
+def load_fixture_list():
+    fixture_list = []
+    for file_name in sorted(os.listdir(FIXTURE_FOLDER)):
+        if not file_name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURE_FOLDER, file_name), encoding="utf-8") as f:
+            fixture_list.append((f"https://www.example.com/fixture/dir/{file_name}", f.read()))
+    return fixture_list
+
+
+def load_page_list():
+    page_list = []
+    if args.page_list_path is not None:
+        with open(args.page_list_path) as f:
+            for line in f:
+                page = json.loads(line)
+                if page["file_type"] != "html":
+                    continue
+                byte_text = load_saved_page(page["save_path"])
+                page_list.append((page["url"], byte_text.decode(page["encoding"] or "utf-8", errors="replace")))
+                if len(page_list) >= args.page_size:
+                    break
+    else:
+        for i in range(args.page_size):
+            page_list.append((f"https://www.example.com/page/{i}", generate_page(i, args.page_bytes).decode()))
+    for i, html in enumerate(TRICKY_HTML_LIST):
+        page_list.append((f"https://www.example.com/tricky/{i}/", f"<html><body>{html}</body></html>"))
+    return page_list
+
+
+# Compare the streaming link extractor with BeautifulSoup (same links and throughput)
+# Exit with status 1 if any link list is different
+def main():
+    fixture_list = load_fixture_list()
+    page_list = [] if args.check_only else load_page_list()
+    print(f"Fixture size: {len(fixture_list)}, Page size: {len(page_list)}")
+
+    mismatch_count = 0
+    for url, text in fixture_list + page_list:
+        if extract_links(text, url) != bs4_extract_links(text, url):
+            mismatch_count += 1
+            print(f"Mismatch: {url}")
+    for kwargs, bs4_func in INDEX_CASE_LIST:
+        if LinkExtractor(**kwargs).extract(INDEX_HTML) != bs4_func(BeautifulSoup(INDEX_HTML, "html.parser")):
+            mismatch_count += 1
+            print(f"Mismatch of index setting: {kwargs}")
+    print(f"Mismatch count: {mismatch_count}")
+    if mismatch_count > 0:
+        sys.exit(1)
+    if args.check_only:
+        return
+
+    print("extractor,pages/sec,elasped sec")
+    for name, func in [("bs4", bs4_extract_links), ("link_extractor", extract_links)]:
+        start_time = time.time()
+        for url, text in page_list:
+            func(text, url)
+        elasped_time = time.time() - start_time
+        print(f"{name},{len(page_list) / elasped_time:.1f},{elasped_time:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_list_path", type=str, default=None, help="Crawled page list (JSONL). If not specified, generated pages are used")
+    parser.add_argument("--page_size", type=int, default=1000, help="Number of pages")
+    parser.add_argument("--page_bytes", type=int, default=30000, help="Bytes of generated page")
+    parser.add_argument("--check_only", action="store_true", help="Only compare the links of fixtures and index settings")
+
+    args = parser.parse_args()
+
+    main()
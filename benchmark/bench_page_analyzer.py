@@ -0,0 +1,111 @@
+import re
+import json
+import html
+import time
+import argparse
+from bs4 import BeautifulSoup
+
+from benchmark.local_server import generate_page
+from benchmark.bench_link_extractor import bs4_extract_links
+from scripts.content_extractor import ExtractContent
+from scripts.page_crawler.page_analyzer import analyze_page
+from scripts.page_crawler.page_archive import load_saved_page
+
+
+# Publish date estimation of the previous preprocessing (BeautifulSoup)
+def bs4_publish_date(text):
+    soup = BeautifulSoup(text, "html.parser")
+
+    element_list = soup.find_all("script", attrs={"type": "application/ld+json"})
+    if len(element_list) > 0:
+        publish_date = re.search(r'"datePublished":\s*?"(\d{4}-\d{2}-\d{2})', "\n".join([e.text for e in element_list]))
+        if publish_date is not None:
+            return publish_date.group(1)
+
+    element_list = soup.find_all("meta", attrs={"property": "article:published_time"})
+    if len(element_list) > 0:
+        try:
+            publish_date = re.search(r'(\d{4}-\d{2}-\d{2})', "\n".join([e.get("content") for e in element_list]))
+        except Exception:
+            publish_date = None
+        if publish_date is not None:
+            return publish_date.group(1)
+
+    return "None"
+
+
+# Crawler and preprocessing of the previous version: parse by BeautifulSoup twice, and ExtractContent
+def analyze_before(text, url, extractor):
+    link_list = bs4_extract_links(text, url)
+    text = html.unescape(text)
+    main_text_list, title = extractor.analyse(text)
+    return link_list, main_text_list, title, bs4_publish_date(text)
+
+
+def analyze_after(text, url, extractor):
+    link_list = analyze_page(text, url)["link_list"]
+    text = html.unescape(text)
+    analysis = analyze_page(text, url, extractor=extractor, collect_meta=True)
+    return link_list, analysis["main_text_list"], analysis["title"], analysis["publish_datetime"]
+
+
+# Generated page with the metadata of news article
+def generate_article(page_id, page_bytes):
+    text = generate_page(page_id, page_bytes).decode()
+    head = [
+        f'<script type="application/ld+json">{{"@type": "NewsArticle", "datePublished": "2024-01-{page_id % 28 + 1:02}T10:00:00Z"}}</script>',
+        f'<meta property="article:published_time" content="2023-12-{page_id % 28 + 1:02}T10:00:00Z">',
+        '<script type="application/ld+json">{"@type": "Organization"}</script>',
+    ][page_id % 3:]
+    return text.replace("</head>", "".join(head) + "</head>")
+
+
+def load_page_list():
+    page_list = []
+    if args.page_list_path is not None:
+        with open(args.page_list_path) as f:
+            for line in f:
+                page = json.loads(line)
+                if page["file_type"] != "html" or page["encoding"] is None:
+                    continue
+                text = load_saved_page(page["save_path"]).decode(page["encoding"], errors="replace")
+                page_list.append((page["url"], text))
+                if len(page_list) >= args.page_size:
+                    break
+    else:
+        for i in range(args.page_size):
+            page_list.append((f"https://www.example.com/page/{i}", generate_article(i, args.page_bytes)))
+    return page_list
+
+
+# Compare CPU time per page of document analysis (links for crawler, main text / title / publish date for preprocessing)
+def main():
+    page_list = load_page_list()
+    extractor = ExtractContent()
+    print(f"Page size: {len(page_list)}")
+
+    mismatch_count = 0
+    for url, text in page_list:
+        if analyze_before(text, url, extractor) != analyze_after(text, url, extractor):
+            mismatch_count += 1
+            print(f"Mismatch: {url}")
+    print(f"Mismatch count: {mismatch_count}")
+
+    print("analysis,CPU ms/page,CPU sec")
+    for name, func in [("before", analyze_before), ("after", analyze_after)]:
+        start_time = time.process_time()
+        for url, text in page_list:
+            func(text, url, extractor)
+        cpu_time = time.process_time() - start_time
+        print(f"{name},{cpu_time / len(page_list) * 1000:.2f},{cpu_time:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_list_path", type=str, default=None, help="Crawled page list (JSONL). If not specified, generated pages are used")
+    parser.add_argument("--page_size", type=int, default=300, help="Number of pages")
+    parser.add_argument("--page_bytes", type=int, default=30000, help="Bytes of generated page")
+
+    args = parser.parse_args()
+
+    main()
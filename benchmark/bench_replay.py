@@ -0,0 +1,55 @@
+import time
+import argparse
+import tempfile
+import contextlib
+import io
+
+from benchmark.local_server import start_server, PageHandler
+from scripts.page_crawler.general_crawler import GeneralCrawler
+
+
+# Crawl one site and return (page list, elasped sec). Crawler logs are hidden.
+def run_crawl(root_url, data_raw_folder, analysis_cache, offline):
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawler = GeneralCrawler(
+            "bench", root_url, offline, 100, "strict", data_raw_folder, 1000000000,
+            download_tool="http", precheck="none", analysis_cache=analysis_cache, offline=offline,
+        )
+        crawler.crawl_delay = 0
+        page_list = crawler.page_list_crawl(args.page_size, ["html"])
+    return page_list, time.time() - start_time
+
+
+# Compare replay of a saved crawl with and without the page analysis cache (same page list and pages/sec).
+# The first crawl downloads the pages from the local test server and fills the cache, and replays have no network access.
+def main():
+    PageHandler.page_bytes = args.page_bytes
+    server, root_url = start_server()
+
+    print(f"Page size: {args.page_size}, page bytes: {args.page_bytes}")
+    print("mode,pages,pages/sec,elasped sec,same page list")
+    with tempfile.TemporaryDirectory() as data_raw_folder:
+        base_page_list = None
+        for mode, analysis_cache, offline in [
+            ("crawl", True, False), ("replay without cache", False, True), ("replay with cache", True, True),
+        ]:
+            page_list, elasped_time = run_crawl(f"{root_url}/page/0", data_raw_folder, analysis_cache, offline)
+            if base_page_list is None:
+                base_page_list = page_list
+            print(
+                f"{mode},{len(page_list)},{len(page_list) / elasped_time:.1f},{elasped_time:.2f},"
+                f"{page_list == base_page_list}"
+            )
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page_size", type=int, default=1000, help="Number of pages to crawl")
+    parser.add_argument("--page_bytes", type=int, default=30000, help="Size of each generated page")
+
+    args = parser.parse_args()
+
+    main()
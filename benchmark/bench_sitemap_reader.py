@@ -0,0 +1,102 @@
+import re
+import gzip
+import time
+import argparse
+
+from scripts.page_crawler.sitemap_reader import iter_sitemap_entries, iter_sitemap_locs
+
+
+SITEMAP_NAMESPACE = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+EXTENSION_NAMESPACE = (
+    'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1" '
+    'xmlns:news="http://www.google.com/schemas/sitemap-news/0.9" '
+    'xmlns:video="http://www.google.com/schemas/sitemap-video/1.1"'
+)
+
+
+# Sitemap reader of the previous index crawler (regex over the decoded text)
+def regex_sitemap_locs(byte_text):
+    if byte_text.startswith(b"\x1f\x8b"):
+        byte_text = gzip.decompress(byte_text)
+    return [loc.strip() for loc in re.findall(r"<loc>(.*?)</loc>", byte_text.decode(errors="replace"), flags=re.S)]
+
+
+def generate_sitemap(url_size, extension=None):
+    item_list = []
+    for index in range(url_size):
+        item = f"<url><loc>https://example.com/news/{index}</loc><lastmod>2024-01-{index % 28 + 1:02d}</lastmod>"
+        # Extension elements have their own <loc> (image / video) before or after the <loc> of the page
+        if extension == "image":
+            item = (
+                f"<url><image:image><image:loc>https://media.example.com/{index}.jpg</image:loc></image:image>"
+                f"<loc>https://example.com/news/{index}</loc><lastmod>2024-01-{index % 28 + 1:02d}</lastmod>"
+                f"<image:image><image:loc>https://media.example.com/{index}-2.jpg</image:loc></image:image>"
+            )
+        elif extension == "news":
+            item += (
+                f"<news:news><news:publication><news:name>Example</news:name></news:publication>"
+                f"<news:publication_date>2024-01-01</news:publication_date><news:title>Story {index}</news:title></news:news>"
+            )
+        elif extension == "video":
+            item += (
+                f"<video:video><video:content_loc>https://media.example.com/{index}.mp4</video:content_loc>"
+                f"<video:player_loc>https://example.com/player/{index}</video:player_loc></video:video>"
+            )
+        item_list.append(item + "</url>")
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><urlset {SITEMAP_NAMESPACE} {EXTENSION_NAMESPACE}>'
+        + "\n".join(item_list) + "</urlset>"
+    ).encode()
+
+
+def generate_sitemap_index(sitemap_size):
+    item_list = [
+        f"<sitemap><loc>https://example.com/sitemap-{index}.xml</loc><lastmod>2024-02-{index % 28 + 1:02d}</lastmod></sitemap>"
+        for index in range(sitemap_size)
+    ]
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {SITEMAP_NAMESPACE}>{"".join(item_list)}</sitemapindex>'.encode()
+
+
+# Compare urls of the streaming sitemap reader with the previous regex reader (same urls and throughput).
+# Image / news / video sitemaps check that <loc> of extensions is not read as the page url, and lastmod is checked
+# against the generated value.
+def main():
+    case_list = [
+        ("urlset", generate_sitemap(args.url_size)),
+        ("urlset gzip", gzip.compress(generate_sitemap(args.url_size))),
+        ("image", generate_sitemap(args.url_size, "image")),
+        ("news", generate_sitemap(args.url_size, "news")),
+        ("video", generate_sitemap(args.url_size, "video")),
+        ("sitemap index", generate_sitemap_index(args.url_size // 100 + 1)),
+    ]
+
+    print(f"Url size: {args.url_size}")
+    print("case,urls,same urls,same lastmod,regex urls/sec,streaming urls/sec")
+    for case_name, byte_text in case_list:
+        start_time = time.time()
+        regex_loc_list = regex_sitemap_locs(byte_text)
+        regex_time = time.time() - start_time
+
+        start_time = time.time()
+        loc_list = list(iter_sitemap_locs(byte_text))
+        streaming_time = time.time() - start_time
+
+        # Generated lastmod is the day of the index
+        entry_list = list(iter_sitemap_entries(byte_text))
+        same_lastmod = all([
+            lastmod is not None and int(lastmod[-2:]) == index % 28 + 1
+            for index, (_, lastmod) in enumerate(entry_list)
+        ])
+        print(
+            f"{case_name},{len(loc_list)},{loc_list == regex_loc_list},{same_lastmod},"
+            f"{len(regex_loc_list) / max(regex_time, 1e-9):.0f},{len(loc_list) / max(streaming_time, 1e-9):.0f}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url_size", type=int, default=50000, help="Number of urls per generated sitemap")
+
+    args = parser.parse_args()
+
+    main()
@@ -0,0 +1,56 @@
+import gc
+import time
+import argparse
+import tracemalloc
+
+from scripts.page_crawler.url_seen_set import create_url_seen_set
+
+
+def generate_url(i):
+    return f"https://www.example-news.com/{2000 + i % 25}/{i % 12 + 1:02}/section-{i % 97}/article-title-number-{i}/"
+
+
+# Compare memory and lookup throughput of url seen sets
+# Peak memory includes the merge of fingerprint set and the growth of set / Bloom filter
+def main():
+    print(f"URL size: {args.size}")
+    print("url_seen,memory MB,bytes/url,peak memory MB,add urls/sec,lookup urls/sec,false-positive rate")
+    for url_seen_type in args.url_seen_list:
+        gc.collect()
+        tracemalloc.start()
+        seen_set = create_url_seen_set(url_seen_type, capacity=args.capacity, fp_rate=args.fp_rate)
+
+        start_time = time.time()
+        for i in range(args.size):
+            seen_set.add(generate_url(i))
+        add_time = time.time() - start_time
+        memory_bytes, peak_memory_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Half of lookups are added urls, and the other half are not added
+        lookup_size = min(args.size, 1000000)
+        start_time = time.time()
+        false_positive_count = 0
+        for i in range(lookup_size):
+            _ = generate_url(i) in seen_set
+            if generate_url(args.size + i) in seen_set:
+                false_positive_count += 1
+        lookup_time = time.time() - start_time
+
+        print(
+            f"{url_seen_type},{memory_bytes / 1024 / 1024:.1f},{memory_bytes / args.size:.1f},{peak_memory_bytes / 1024 / 1024:.1f},"
+            f"{args.size / add_time:.0f},{lookup_size * 2 / lookup_time:.0f},{false_positive_count / lookup_size:.6f}"
+        )
+        del seen_set
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000000, help="Number of urls to add")
+    parser.add_argument("--url_seen_list", type=str, nargs="*", default=["exact", "bloom", "fingerprint"], help="Url seen sets to compare")
+    parser.add_argument("--capacity", type=int, default=1000000, help="Initial capacity of Bloom filter")
+    parser.add_argument("--fp_rate", type=float, default=0.001, help="False-positive rate of Bloom filter")
+
+    args = parser.parse_args()
+
+    main()
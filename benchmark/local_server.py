@@ -0,0 +1,57 @@
+import gzip
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Generate deterministic html page of about "page_bytes" bytes
+def generate_page(page_id, page_bytes):
+    rng = random.Random(page_id)
+    word_list = ["news", "world", "sport", "science", "market", "report", "city", "health", "update", "story"]
+    body = []
+    size = 0
+    while size < page_bytes:
+        sentence = " ".join(rng.choice(word_list) for _ in range(12)) + "."
+        link = f'<a href="/page/{rng.randrange(1000000)}">{sentence[0:20]}</a>'
+        item = f"<p>{sentence}</p>{link}\n"
+        body.append(item)
+        size += len(item)
+    return f"<html><head><title>Page {page_id}</title></head><body>{''.join(body)}</body></html>".encode()
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    page_bytes = 30000
+
+    def do_GET(self):
+        if self.path.startswith("/page/"):
+            page_id = int(self.path.split("/")[2])
+            byte_text = generate_page(page_id, self.page_bytes)
+            headers = {"Content-Type": "text/html; charset=utf-8"}
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                byte_text = gzip.compress(byte_text, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            self.send_response(200)
+        else:
+            byte_text = b"Not found page"
+            headers = {"Content-Type": "text/plain"}
+            self.send_response(404)
+
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(byte_text)))
+        self.end_headers()
+        self.wfile.write(byte_text)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Start server in background thread. Return (server, root url)
+def start_server(handler_class=PageHandler, host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,275 @@
+import time
+import random
+import argparse
+import datetime
+from http.server import BaseHTTPRequestHandler
+
+from benchmark.local_server import start_server
+
+
+WORD_LIST = [
+    "news", "world", "sport", "science", "market", "report", "city", "health", "update", "story",
+    "election", "energy", "climate", "court", "police", "school", "music", "film", "travel", "business",
+]
+CATEGORY_LIST = ["politics", "business", "tech", "science", "health", "sports", "culture", "travel", "opinion", "world"]
+BASE_DATE = datetime.datetime(2024, 6, 30, 12, 0, 0)
+
+
+# Deterministic synthetic news site. Article 0 is the newest, and "articles_per_day" articles are published per day.
+# Pages:
+#   "/" home (categories, latest articles and calendar), "/category/{name}/" and "/category/{name}/page/{n}/" hubs,
+#   "/news/{yyyy}/{mm}/{dd}/{slug}-{id}.html" articles (text, related articles and category),
+#   "/a/{id}" old article url redirected to the article (linked from hubs for "redirect_rate" of articles),
+#   "/files/report-{id}" extensionless pdf (linked from "media_rate" of articles),
+#   "/calendar/{yyyy}/{mm}/" endless calendar (crawl trap, if "trap" is True),
+#   share links to another host on article and calendar pages (a new off-domain url on every page),
+#   "/robots.txt", "/sitemap.xml" and "/sitemaps/articles-{n}.xml" (sitemap index and urlsets of "sitemap_size" urls).
+# "slow_rate" of articles are answered after "slow_sec" seconds.
+class NewsSite():
+    def __init__(
+        self, site_id=0, article_size=1000, category_size=8, hub_size=20, related_size=3, paragraph_size=8,
+        articles_per_day=20, redirect_rate=0.1, media_rate=0.05, trap=True, slow_rate=0.0, slow_sec=0.5,
+        sitemap_size=500, crawl_delay=None,
+    ):
+        self.site_id = site_id
+        self.article_size = article_size
+        self.category_list = CATEGORY_LIST[0:category_size]
+        self.hub_size = hub_size
+        self.related_size = related_size
+        self.paragraph_size = paragraph_size
+        self.articles_per_day = articles_per_day
+        self.redirect_rate = redirect_rate
+        self.media_rate = media_rate
+        self.trap = trap
+        self.slow_rate = slow_rate
+        self.slow_sec = slow_sec
+        self.sitemap_size = sitemap_size
+        self.crawl_delay = crawl_delay
+
+    def get_rng(self, article_id, salt=0):
+        return random.Random(self.site_id * 1000003 + article_id * 7 + salt)
+
+    def get_category(self, article_id):
+        return self.category_list[article_id % len(self.category_list)]
+
+    def get_date(self, article_id):
+        return BASE_DATE - datetime.timedelta(days=article_id // self.articles_per_day, minutes=article_id % self.articles_per_day)
+
+    def get_title(self, article_id):
+        rng = self.get_rng(article_id)
+        return " ".join([rng.choice(WORD_LIST) for _ in range(6)]).capitalize()
+
+    def get_article_url(self, article_id):
+        slug = "-".join(self.get_title(article_id).lower().split(" ")[0:4])
+        return f"/news/{self.get_date(article_id):%Y/%m/%d}/{slug}-{article_id}.html"
+
+    # Hub links some articles by the old url (redirected)
+    def get_link_url(self, article_id):
+        if self.get_rng(article_id, 1).random() < self.redirect_rate:
+            return f"/a/{article_id}"
+        return self.get_article_url(article_id)
+
+    def is_slow(self, article_id):
+        return self.get_rng(article_id, 2).random() < self.slow_rate
+
+    def get_category_article_list(self, category):
+        index = self.category_list.index(category)
+        return list(range(index, self.article_size, len(self.category_list)))
+
+    def render(self, title, body_list):
+        nav = "".join([f'<li><a href="/category/{category}/">{category}</a></li>' for category in self.category_list])
+        return (
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title}</title></head>"
+            f"<body><header><a href=\"/\">Home</a><nav><ul>{nav}</ul></nav></header>"
+            f"<main>{''.join(body_list)}</main><footer><a href=\"/about/\">About</a></footer></body></html>"
+        ).encode()
+
+    # Share link of the page (the same as real news sites, every page links a new url of the social site)
+    def get_share_link(self, path):
+        return f'<a href="https://social.example.com/intent/share?url=site{self.site_id}{path}">Share</a>'
+
+    def render_article_list(self, article_id_list):
+        return "<ul>" + "".join([
+            f'<li><a href="{self.get_link_url(article_id)}">{self.get_title(article_id)}</a></li>'
+            for article_id in article_id_list
+        ]) + "</ul>"
+
+    def get_home(self):
+        body_list = [f"<h1>Site {self.site_id}</h1>", self.render_article_list(range(0, min(self.hub_size, self.article_size)))]
+        if self.trap:
+            body_list.append(f'<a href="/calendar/{BASE_DATE:%Y/%m}/">Calendar</a>')
+        return self.render(f"Site {self.site_id}", body_list)
+
+    def get_hub(self, category, page):
+        article_id_list = self.get_category_article_list(category)
+        start = (page - 1) * self.hub_size
+        if start >= len(article_id_list) and page > 1:
+            return None
+        body_list = [f"<h1>{category} page {page}</h1>", self.render_article_list(article_id_list[start:start + self.hub_size])]
+        if start + self.hub_size < len(article_id_list):
+            body_list.append(f'<a rel="next" href="/category/{category}/page/{page + 1}/">Next</a>')
+        return self.render(f"{category} - Site {self.site_id}", body_list)
+
+    def get_article(self, article_id):
+        rng = self.get_rng(article_id, 3)
+        paragraph_list = [
+            "<p>" + " ".join([rng.choice(WORD_LIST) for _ in range(40)]) + ".</p>" for _ in range(self.paragraph_size)
+        ]
+        related_id_list = [
+            (article_id + offset) % self.article_size for offset in range(1, self.related_size + 1)
+        ]
+        body_list = [
+            f"<article><h1>{self.get_title(article_id)}</h1>",
+            f'<time datetime="{self.get_date(article_id):%Y-%m-%dT%H:%M:%S}">{self.get_date(article_id):%Y-%m-%d}</time>',
+            "".join(paragraph_list),
+            "</article>",
+            self.get_share_link(self.get_article_url(article_id)),
+            f'<a href="/category/{self.get_category(article_id)}/">{self.get_category(article_id)}</a>',
+            "<h2>Related</h2>" + self.render_article_list(related_id_list),
+        ]
+        if self.get_rng(article_id, 4).random() < self.media_rate:
+            body_list.append(f'<a href="/files/report-{article_id}">Full report</a>')
+        return self.render(self.get_title(article_id), body_list)
+
+    # Every month has the previous and the next month, so the calendar never ends
+    def get_calendar(self, year, month):
+        prev_year, prev_month = (year, month - 1) if month > 1 else (year - 1, 12)
+        next_year, next_month = (year, month + 1) if month < 12 else (year + 1, 1)
+        body_list = [
+            f"<h1>Events {year}-{month:02d}</h1><p>No events.</p>",
+            f'<a href="/calendar/{prev_year}/{prev_month:02d}/">Previous</a>',
+            f'<a href="/calendar/{next_year}/{next_month:02d}/">Next</a>',
+            self.get_share_link(f"/calendar/{year}/{month:02d}/"),
+        ]
+        return self.render(f"Calendar {year}-{month:02d}", body_list)
+
+    def get_robots(self, root_url):
+        text = "User-agent: *\nDisallow: /private/\n"
+        if self.crawl_delay is not None:
+            text += f"Crawl-delay: {self.crawl_delay}\n"
+        return (text + f"Sitemap: {root_url}/sitemap.xml\n").encode()
+
+    def get_sitemap_index(self, root_url):
+        item_list = []
+        for index in range((self.article_size + self.sitemap_size - 1) // self.sitemap_size):
+            lastmod = self.get_date(index * self.sitemap_size)
+            item_list.append(f"<sitemap><loc>{root_url}/sitemaps/articles-{index}.xml</loc><lastmod>{lastmod:%Y-%m-%d}</lastmod></sitemap>")
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + "".join(item_list) + "</sitemapindex>"
+        ).encode()
+
+    def get_sitemap(self, root_url, index):
+        article_id_list = range(index * self.sitemap_size, min((index + 1) * self.sitemap_size, self.article_size))
+        if len(article_id_list) == 0:
+            return None
+        item_list = [
+            f"<url><loc>{root_url}{self.get_article_url(article_id)}</loc>"
+            f"<lastmod>{self.get_date(article_id):%Y-%m-%d}</lastmod></url>"
+            for article_id in article_id_list
+        ]
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' + "".join(item_list) + "</urlset>"
+        ).encode()
+
+    # Return (status, headers, body) of the path
+    def get_response(self, path, root_url):
+        html_headers = {"Content-Type": "text/html; charset=utf-8"}
+        xml_headers = {"Content-Type": "application/xml"}
+        part_list = [part for part in path.split("?")[0].split("/") if part != ""]
+        try:
+            if len(part_list) == 0:
+                return 200, html_headers, self.get_home()
+            if part_list == ["robots.txt"]:
+                return 200, {"Content-Type": "text/plain"}, self.get_robots(root_url)
+            if part_list == ["sitemap.xml"]:
+                return 200, xml_headers, self.get_sitemap_index(root_url)
+            if part_list[0] == "sitemaps" and len(part_list) == 2:
+                body = self.get_sitemap(root_url, int(part_list[1].split("-")[1].split(".")[0]))
+                if body is not None:
+                    return 200, xml_headers, body
+            if part_list[0] == "category" and len(part_list) in [2, 4] and part_list[1] in self.category_list:
+                body = self.get_hub(part_list[1], int(part_list[3]) if len(part_list) == 4 else 1)
+                if body is not None:
+                    return 200, html_headers, body
+            if part_list[0] == "news" and len(part_list) == 5:
+                article_id = int(part_list[4].rsplit("-", 1)[1].split(".")[0])
+                if article_id < self.article_size and path == self.get_article_url(article_id):
+                    if self.is_slow(article_id):
+                        time.sleep(self.slow_sec)
+                    return 200, html_headers, self.get_article(article_id)
+            if part_list[0] == "a" and len(part_list) == 2 and int(part_list[1]) < self.article_size:
+                return 301, {"Location": f"{root_url}{self.get_article_url(int(part_list[1]))}"}, b"Moved permanently"
+            if part_list[0] == "files" and len(part_list) == 2:
+                return 200, {"Content-Type": "application/pdf"}, b"%PDF-1.4\n" + b"0" * 50000
+            if part_list[0] == "calendar" and len(part_list) == 3 and self.trap:
+                return 200, html_headers, self.get_calendar(int(part_list[1]), int(part_list[2]))
+        except ValueError:
+            pass
+        return 404, {"Content-Type": "text/plain"}, b"Not found page"
+
+
+class NewsSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    site = NewsSite()
+
+    def send_page(self, send_body):
+        root_url = f"http://{self.headers.get('Host', '127.0.0.1')}"
+        status, headers, byte_text = self.site.get_response(self.path, root_url)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(byte_text)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(byte_text)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def do_HEAD(self):
+        self.send_page(False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Start "site_size" news sites on their own ports (one host per site). Return list of (server, root url).
+def start_news_sites(site_size=1, **site_kwargs):
+    server_list = []
+    for site_id in range(site_size):
+        handler_class = type(f"NewsSiteHandler{site_id}", (NewsSiteHandler,), {"site": NewsSite(site_id, **site_kwargs)})
+        server_list.append(start_server(handler_class))
+    return server_list
+
+
+# Serve news sites until interrupted (e.g. to run crawl.py or crawl_index.py against them)
+def main():
+    server_list = start_news_sites(
+        args.site_size, article_size=args.article_size, trap=args.disable_trap is False,
+        slow_rate=args.slow_rate, slow_sec=args.slow_sec, crawl_delay=args.crawl_delay,
+    )
+    for site_id, (_, root_url) in enumerate(server_list):
+        print(f"site{site_id},{root_url}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server, _ in server_list:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--site_size", type=int, default=4, help="Number of news sites (one local host per site)")
+    parser.add_argument("--article_size", type=int, default=1000, help="Number of articles per site")
+    parser.add_argument("--slow_rate", type=float, default=0.0, help="Rate of articles answered slowly")
+    parser.add_argument("--slow_sec", type=float, default=0.5, help="Seconds to wait before answering slow articles")
+    parser.add_argument("--crawl_delay", type=int, default=None, help="Crawl-delay of robots.txt")
+    parser.add_argument("--disable_trap", action="store_true", help="If true, sites have no endless calendar")
+
+    args = parser.parse_args()
+
+    main()
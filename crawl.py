@@ -1,13 +1,23 @@
 import os
-import json
+import sys
 import datetime
 import time
+import shutil
 import argparse
 import random
+import subprocess
 import pandas as pd
+from urllib.parse import urlparse
 
 from scripts.page_crawler.general_crawler import GeneralCrawler
-from scripts.utils import thread_process_crawl
+from scripts.page_crawler.async_crawl_engine import AsyncCrawlEngine
+from scripts.page_crawler.scheduler_crawl_engine import SchedulerCrawlEngine
+from scripts.page_crawler.url_canonicalizer import load_canonical_rule_dict, get_site_canonical_rule
+from scripts.page_crawler.budget_allocator import BudgetAllocator, BudgetManager
+from scripts.page_crawler.node_crawl_engine import NodeCrawlEngine
+from scripts.page_crawler.hash_ring import HashRing
+from scripts.page_crawler.spool_queue import SpoolQueue
+from scripts.utils import thread_process_crawl_stream, merge_page_shards
 
 import warnings
 warnings.simplefilter("once")
@@ -36,36 +46,148 @@ def crawl():
     target_site_list = pd.read_csv(f"config/{config_file_name}").to_dict(orient="records")
     target_site_list = target_site_list[0:args.site_size]
 
+    # Distributed crawl: this node crawls only the sites of the hosts assigned to it
+    host_list = [urlparse(site_dict["URL"]).netloc for site_dict in target_site_list]
+    if args.node_id is not None:
+        hash_ring = HashRing(list(range(args.node_size)))
+        target_site_list = [
+            site_dict for site_dict, host in zip(target_site_list, host_list) if hash_ring.get_node(host) == args.node_id
+        ]
+        print(f"Node {args.node_id} of {args.node_size} crawls {len(target_site_list)} sites")
+
+    # Global budget moved between sites by their discovery rate (shared with crawler processes by manager)
+    budget_manager = None
+    budget_allocator = None
+    if args.total_budget is not None:
+        budget_allocator_args = (
+            args.total_budget, [site_dict["site_name"] for site_dict in target_site_list], args.budget_grant_size
+        )
+        if args.crawl_engine == "sequential":
+            budget_manager = BudgetManager()
+            budget_manager.start()
+            budget_allocator = budget_manager.BudgetAllocator(*budget_allocator_args)
+        else:
+            budget_allocator = BudgetAllocator(*budget_allocator_args)
+
+    canonical_rule_dict = load_canonical_rule_dict(args.url_canonical_rule_path)
     site_list = []
     for site_dict in target_site_list:
         crawler = GeneralCrawler(
             site_dict["site_name"], site_dict["URL"],
-            args.disable_page_reget, crawl_max_depth,
+            args.disable_page_reget or args.replay, crawl_max_depth,
             crawl_link_setting, data_raw_folder, crawl_log_interval,
+            download_tool=args.download_tool, storage=args.storage, archive_compression=args.archive_compression,
+            frontier=args.frontier, frontier_folder=f"{args.data_path}/frontier", resume=args.resume,
+            checkpoint_interval=args.checkpoint_interval,
+            url_seen=args.url_seen, url_seen_capacity=args.url_seen_capacity,
+            url_seen_fp_rate=args.url_seen_fp_rate, url_seen_memory_mb=args.url_seen_memory_mb,
+            frontier_priority=args.frontier_priority,
+            url_canonical_rule=get_site_canonical_rule(canonical_rule_dict, site_dict["site_name"]),
+            near_duplicate_distance=args.near_duplicate_distance,
+            precheck=args.precheck, precheck_trust_count=args.precheck_trust_count,
+            trap_window=args.trap_window, trap_min_yield=args.trap_min_yield, trap_sample_interval=args.trap_sample_interval,
+            budget_allocator=budget_allocator,
+            analysis_cache=args.disable_analysis_cache is False, offline=args.replay,
+            shard_folder=f"{args.data_path}/page_list_shards", robots_ttl=args.robots_ttl,
         )
         site_list.append(crawler)
 
-    page_list = []
     page_size = args.page_size
-    print(f"Download page size: {page_size}")
+    print(f"Download page size: {page_size}" + (f", total budget: {args.total_budget}" if args.total_budget is not None else ""))
     print(f"Download site size: {len(target_site_list)}")
 
-    # Download page
+    # Download page. Each site writes page records to its shard, and shards are merged into page_list.jsonl.
     print("Get page list")
+    os.makedirs(args.data_path, exist_ok=True)
+    output_path = \
+        get_node_shard_path(args.node_id) if args.node_id is not None else \
+        f"{args.data_path}/page_list.jsonl"
     func_args = (page_size, target_file_type)
-    page_list = \
-        thread_process_crawl(site_list, func_args, executor_type=crawl_parallel_method, max_workers=crawl_max_workers)
+    if args.node_id is not None:
+        engine = NodeCrawlEngine(
+            site_list, args.node_id, args.node_size, hash_ring, host_list, SpoolQueue(get_spool_folder(), args.node_id),
+            max_workers=crawl_max_workers, metrics_interval=args.metrics_interval,
+            metrics_path=f"{args.data_path}/scheduler_metrics.node{args.node_id}.jsonl",
+        )
+        shard_info_list = engine.crawl(*func_args)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            page_count = merge_page_shards(shard_info_list, f)
+    elif args.crawl_engine == "async":
+        engine = AsyncCrawlEngine(
+            site_list, max_concurrency=args.max_concurrency, site_concurrency=args.site_concurrency
+        )
+        shard_info_list = engine.crawl(*func_args)
+        with open(output_path, "wb") as f:
+            page_count = merge_page_shards(shard_info_list, f)
+    elif args.crawl_engine == "scheduler":
+        engine = SchedulerCrawlEngine(
+            site_list, max_workers=crawl_max_workers, metrics_interval=args.metrics_interval,
+            metrics_path=f"{args.data_path}/scheduler_metrics.jsonl",
+        )
+        shard_info_list = engine.crawl(*func_args)
+        with open(output_path, "wb") as f:
+            page_count = merge_page_shards(shard_info_list, f)
+    else:
+        page_count = thread_process_crawl_stream(
+            site_list, func_args, output_path, executor_type=crawl_parallel_method, max_workers=crawl_max_workers
+        )
     print()
 
-    print(f"Collected page size: {len(page_list)}")
+    if budget_allocator is not None:
+        print(budget_allocator.get_report())
+    if budget_manager is not None:
+        budget_manager.shutdown()
+
+    print(f"Collected page size: {page_count}")
     elasped_time = datetime.timedelta(seconds=time.time() - start_time)
     print(f"End download {elasped_time}")
     print()
 
-    os.makedirs(args.data_path, exist_ok=True)
-    with open(f"{args.data_path}/page_list.jsonl", "w")as f:
-        for page in page_list:
-            f.write(json.dumps(page, ensure_ascii=False) + "\n")
+
+def get_spool_folder():
+    return args.spool_folder if args.spool_folder is not None else f"{args.data_path}/spool"
+
+
+def get_node_shard_path(node_id):
+    return f"{args.data_path}/page_list_nodes/node{node_id}.jsonl"
+
+
+# Merge page lists of all nodes into page_list.jsonl
+def merge_node_shards():
+    shard_info_list = []
+    for node_id in range(args.node_size):
+        shard_path = get_node_shard_path(node_id)
+        with open(shard_path, "rb") as f:
+            page_count = sum([1 for _ in f])
+        shard_info_list.append({"shard_path": shard_path, "page_count": page_count})
+    with open(f"{args.data_path}/page_list.jsonl", "wb") as f:
+        page_count = merge_page_shards(shard_info_list, f)
+    print(f"Collected page size of {args.node_size} nodes: {page_count}")
+
+
+# Run all nodes of distributed crawl as processes on this machine (the same arguments with "--node_id"),
+# and merge their page lists. If a node fails, the other nodes are stopped.
+def launch_local_nodes():
+    start_time = time.time()
+    shutil.rmtree(get_spool_folder(), ignore_errors=True)
+    process_list = [
+        subprocess.Popen([sys.executable, "-u"] + sys.argv + ["--node_id", str(node_id)])
+        for node_id in range(args.node_size)
+    ]
+    while any([process.poll() is None for process in process_list]):
+        if any([process.poll() not in [None, 0] for process in process_list]):
+            for process in process_list:
+                process.terminate()
+            break
+        time.sleep(1)
+    return_code_list = [process.wait() for process in process_list]
+    if any([return_code != 0 for return_code in return_code_list]):
+        raise Exception(f"Crawler node failed, return codes: {return_code_list}")
+
+    merge_node_shards()
+    elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+    print(f"End distributed download {elasped_time}")
 
 
 if __name__ == '__main__':
@@ -73,10 +195,128 @@ if __name__ == '__main__':
     parser.add_argument("--data_path", type=str, help="Path to dataset to be saved")
     parser.add_argument("--data_raw_folder", type=str, default="./data/page_raw", help="Path to save downloaded pages")
     parser.add_argument("--page_size", type=int, default=1000000000, help="Number of pages to download per site")
+    parser.add_argument("--total_budget", type=int, default=None, help=(
+            "Number of pages to download in all sites. If specified, the budget is granted to sites while crawling "
+            "by their discovery rate (new in-domain urls per page), instead of the same --page_size for every site"
+        ))
+    parser.add_argument("--budget_grant_size", type=int, default=None, help=(
+            "Pages per grant of --total_budget (scaled by the discovery rate of the site). Default is a quarter of the uniform split"
+        ))
     parser.add_argument("--site_size", type=int, default=100, help="Max website size to download")
     parser.add_argument("--disable_page_reget", action="store_true", help="If true, skip already downloaded page")
     parser.add_argument("--max_thread", type=int, default=16, help="Max thread size")
+    parser.add_argument("--download_tool", type=str, default="curl", help=(
+            "Download backend. "
+            "curl: Run curl command for each page, "
+            "http: In-process http client with keep-alive connection pool, gzip and timeouts"
+        ),
+        choices=["curl", "http"]
+    )
+    parser.add_argument("--storage", type=str, default="file", help=(
+            "Storage of downloaded pages. "
+            "file: One file per url, "
+            "archive: Append-only segment files with url index (identical bodies are stored once)"
+        ),
+        choices=["file", "archive"]
+    )
+    parser.add_argument("--archive_compression", type=str, default="zlib", help="Compression of each page in archive", choices=["zlib", "gzip", "none"])
+    parser.add_argument("--crawl_engine", type=str, default="sequential", help=(
+            "Crawl engine. "
+            "sequential: Crawl each site sequentially, one process per site (--max_thread processes), "
+            "async: Crawl all sites in one asyncio event loop with many downloads in flight, "
+            "scheduler: Central per-host token bucket scheduler hands out fetches of all sites to --max_thread threads"
+        ),
+        choices=["sequential", "async", "scheduler"]
+    )
+    parser.add_argument("--frontier", type=str, default="memory", help=(
+            "Crawl frontier (link queue, seen urls and collected pages). "
+            "memory: Keep in memory, "
+            "disk: Save to {data_path}/frontier with periodic checkpoint (required for --resume)"
+        ),
+        choices=["memory", "disk"]
+    )
+    parser.add_argument("--frontier_priority", type=str, default="bfs", help=(
+            "Order of crawling queued urls. "
+            "bfs: FIFO (breadth first), "
+            "url_depth: Shallow url path first, "
+            "path_pattern: Index-like url path (section, tag, pagination) first and article-like path (date, long slug) last, "
+            "classifier_rule: Index probability of PageClassifier.classify_rule with the url slug as the title"
+        ),
+        choices=["bfs", "url_depth", "path_pattern", "classifier_rule"]
+    )
+    parser.add_argument("--resume", action="store_true", help="If true, continue crawling from the last checkpoint of disk frontier")
+    parser.add_argument("--checkpoint_interval", type=int, default=100, help="Number of pages between checkpoints of disk frontier")
+    parser.add_argument("--url_seen", type=str, default="exact", help=(
+            "Set of already queued urls in memory frontier. "
+            "exact: Set of url strings, "
+            "bloom: Scalable Bloom filter (false-positive rate is --url_seen_fp_rate), "
+            "fingerprint: Sorted array of 64-bit url hashes"
+        ),
+        choices=["exact", "bloom", "fingerprint"]
+    )
+    parser.add_argument("--url_seen_capacity", type=int, default=1000000, help="Initial capacity of Bloom filter per site")
+    parser.add_argument("--url_seen_fp_rate", type=float, default=0.001, help="False-positive rate of Bloom filter")
+    parser.add_argument("--url_seen_memory_mb", type=float, default=None, help="Max memory of Bloom filter per site (MB)")
+    parser.add_argument("--max_concurrency", type=int, default=64, help="Max number of downloads in flight (async engine)")
+    parser.add_argument("--site_concurrency", type=int, default=2, help="Max number of downloads in flight per site (async engine)")
+    parser.add_argument("--url_canonical_rule_path", type=str, default="config/url_canonical_rules.json", help="Per-site url canonicalization rules")
+    parser.add_argument("--robots_ttl", type=float, default=86400, help="Seconds to reuse cached robots.txt ({data_raw_folder}/robots.sqlite)")
+    parser.add_argument("--near_duplicate_distance", type=int, default=3, help=(
+            "Max Hamming distance of SimHash (text and links) to treat a page as a near duplicate of an expanded page. "
+            "Links of near-duplicate pages are not queued. -1 disables the check"
+        ))
+    parser.add_argument("--precheck", type=str, default="head", help=(
+            "Check Content-Type of not downloaded urls before downloading them, and skip non-html resources. "
+            "head: HEAD request (ranged GET if HEAD is not allowed), "
+            "range: GET of the first 1KB (also sniffs the body if Content-Type is generic), "
+            "none: Download all urls"
+        ),
+        choices=["head", "range", "none"]
+    )
+    parser.add_argument("--precheck_trust_count", type=int, default=3, help=(
+            "Number of urls of a path pattern with the same result after which the pattern is decided without pre-check"
+        ))
+    parser.add_argument("--trap_window", type=int, default=50, help=(
+            "Number of recent pages of a url template (numbers and hashes replaced) used to judge crawl traps. 0 disables it"
+        ))
+    parser.add_argument("--trap_min_yield", type=float, default=0.5, help=(
+            "Template is throttled if its mean yield (new links to the other templates per page, plus 1 for new text) falls below this"
+        ))
+    parser.add_argument("--trap_sample_interval", type=int, default=10, help="Only one of this number of urls of a throttled template is downloaded")
+    parser.add_argument("--disable_analysis_cache", action="store_true", help=(
+            "If true, saved pages are parsed again instead of reusing file type, encoding and links by content hash "
+            "({data_raw_folder}/{site}/page_analysis.sqlite)"
+        ))
+    parser.add_argument("--replay", action="store_true", help=(
+            "If true, replay the crawl only from saved pages without network access (urls not saved are skipped)"
+        ))
+    parser.add_argument("--node_size", type=int, default=1, help=(
+            "Number of crawler nodes of distributed crawl. Hosts are assigned to nodes by consistent hashing, "
+            "and each node crawls its sites by the scheduler engine (--crawl_engine is ignored). "
+            "Without --node_id, all nodes are run as processes on this machine"
+        ))
+    parser.add_argument("--node_id", type=int, default=None, help=(
+            "Run only this node (0 to --node_size - 1) of distributed crawl. Its pages are saved to "
+            "{data_path}/page_list_nodes/node{node_id}.jsonl"
+        ))
+    parser.add_argument("--spool_folder", type=str, default=None, help=(
+            "Folder shared by all nodes to forward cross-host links (default: {data_path}/spool). "
+            "Use an empty folder for each crawl"
+        ))
+    parser.add_argument("--merge_node_shards", action="store_true", help="If true, only merge page lists of all nodes into page_list.jsonl")
+    parser.add_argument("--metrics_interval", type=float, default=60, help="Seconds between reports of per-host fetch rate and queue depth (scheduler engine)")
 
     args = parser.parse_args()
+    if args.resume and args.frontier != "disk":
+        parser.error("--resume requires --frontier disk")
+    if args.node_id is not None and not 0 <= args.node_id < args.node_size:
+        parser.error("--node_id must be less than --node_size")
+    if args.node_size > 1 and args.total_budget is not None:
+        parser.error("--total_budget is not supported with --node_size")
 
-    crawl()
+    if args.merge_node_shards:
+        merge_node_shards()
+    elif args.node_size > 1 and args.node_id is None:
+        launch_local_nodes()
+    else:
+        crawl()
@@ -1,63 +1,63 @@
-from collections import Counter
 import os
 import json
 import argparse
 
 from scripts.page_crawler.index_crawler import IndexCrawler
-from scripts.utils import thread_process_crawl_index
+from scripts.page_crawler.url_seen_set import create_url_seen_set
+from scripts.utils import thread_process_crawl_index, PageListWriter
 
 import warnings
 warnings.simplefilter("once")
 
 
 def main():
+    # Sites are defined in the profile file (adding a site only needs a new profile)
+    with open(args.profile_path) as f:
+        profile_dict = json.load(f)
     site_list = []
-    site_list.append(IndexCrawler(
-        args=args,
-        site_name="CNN",
-        root_url_list=[
-            "https://www.cnn.com/sitemap/article.xml",
-            "https://www.cnn.com/sitemap/video.xml",
-            "https://www.cnn.com/sitemap/gallery.xml"
-        ],
-    ))
-    site_list.append(IndexCrawler(
-        args=args,
-        site_name="Variety",
-        root_url_list=["https://variety.com/sitemap_index.xml"],
-    ))
-    site_list.append(IndexCrawler(
-        args=args,
-        site_name="TechCrunch",
-        homepage_url="https://techcrunch.com"
-    ))
-    site_list.append(IndexCrawler(
-        args=args,
-        site_name="Mongabay",
-        homepage_url="https://news.mongabay.com"
-    ))
-    site_list.append(IndexCrawler(
-        args=args,
-        site_name="Space.com",
-        homepage_url="https://www.space.com"
-    ))
+    for site_name, profile in profile_dict.items():
+        if profile.get("enabled", True) is False:
+            continue
+        site_list.append(IndexCrawler(
+            args=args,
+            site_name=site_name,
+            root_url_list=profile.get("root_url_list"),
+            homepage_url=profile.get("homepage_url"),
+            profile=profile,
+        ))
 
     crawl_parallel_method = "thread"
     func_args = ()
     crawl_max_workers = args.max_thread
-    page_list = \
+
+    # Content pages are saved as soon as they are found (crawlers share the writer, so use thread)
+    # Refresh appends only the pages which are not in the existing list
+    os.makedirs(args.data_path, exist_ok=True)
+    output_path = f"{args.data_path}/content_page_list.jsonl"
+    seen_url_set = None
+    if args.refresh and os.path.exists(output_path):
+        seen_url_set = create_url_seen_set("fingerprint")
+        with open(output_path) as f:
+            for page in f:
+                seen_url_set.add(json.loads(page)["url"])
+        print(f"Existing content page size: {len(seen_url_set)}")
+    elif args.refresh:
+        # Pages of child sitemaps skipped by <lastmod> would be missing from the new list
+        print(f"{output_path} does not exist, so child sitemaps are not skipped by <lastmod>")
+        for crawler in site_list:
+            crawler.sitemap_refresh = False
+    with open(output_path, "a" if seen_url_set is not None else "w")as f:
+        page_writer = PageListWriter(f, seen_url_set=seen_url_set)
+        for crawler in site_list:
+            crawler.page_writer = page_writer
         thread_process_crawl_index(site_list, func_args, executor_type=crawl_parallel_method, max_workers=crawl_max_workers)
     print()
 
-    for site_name, count in sorted(Counter([(page["site_name"]) for page in page_list]).items()):
+    if seen_url_set is not None:
+        print("Newly added content pages")
+    for site_name, count in sorted(page_writer.site_count.items()):
         print(f"{site_name}: {count}")
 
-    # Save
-    os.makedirs(args.data_path, exist_ok=True)
-    with open(f"{args.data_path}/content_page_list.jsonl", "w")as f:
-        for page in page_list:
-            f.write(json.dumps(page, ensure_ascii=False)+"\n")
-
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
@@ -66,6 +66,19 @@ if __name__ == '__main__':
     parser.add_argument("--page_size", type=int, default=1000000000, help="Number of pages to download per site")
     parser.add_argument("--disable_page_reget", action="store_true", help="If true, skip already downloaded page")
     parser.add_argument("--max_thread", type=int, default=16, help="Max thread size")
+    parser.add_argument("--download_tool", type=str, default="curl", help="Download backend", choices=["curl", "http"])
+    parser.add_argument("--storage", type=str, default="file", help="Storage of downloaded pages", choices=["file", "archive"])
+    parser.add_argument("--archive_compression", type=str, default="zlib", help="Compression of each page in archive", choices=["zlib", "gzip", "none"])
+    parser.add_argument("--sitemap_concurrency", type=int, default=4, help="Number of child sitemaps downloaded concurrently per site")
+    parser.add_argument("--refresh", action="store_true", help=(
+        "If true, download only new or changed child sitemaps (by <lastmod>) and append new pages to the existing content_page_list.jsonl"
+    ))
+    parser.add_argument("--profile_path", type=str, default="config/index_profiles.json", help="Profiles of sites to crawl index pages")
+    parser.add_argument("--archive_concurrency", type=int, default=4, help="Number of archive pages downloaded concurrently per site")
+    parser.add_argument("--archive_rate_limit", type=float, default=None, help=(
+        "Max requests per second to the host when downloading archive pages and sitemaps (default and upper limit: 1 / crawl_delay of robots.txt)"
+    ))
+    parser.add_argument("--robots_ttl", type=float, default=86400, help="Seconds to reuse cached robots.txt")
 
     args = parser.parse_args()
 
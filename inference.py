@@ -8,6 +8,7 @@ import itertools
 import pandas as pd
 
 from scripts.page_classifier import PageClassifier
+from scripts.near_duplicate import SimHashIndex, get_page_simhash
 from scripts.utils import thread_process
 
 import warnings
@@ -69,7 +70,37 @@ def main():
         ()
 
     if args.classification_method in ["llm"]:
-        page_list = thread_process(page_list, func, func_args, executor_type="thread", max_workers=args.max_thread)
+        # Near-duplicate pages (in crawled order per site) reuse the label of the first page instead of calling LLM
+        representative_page_list = page_list
+        follower_page_list = []
+        if args.near_duplicate_distance >= 0:
+            representative_page_list = []
+            for site_name, sub_page_list in page_division_dict.items():
+                near_duplicate_index = SimHashIndex(args.near_duplicate_distance)
+                follower_count = 0
+                for page in sub_page_list[0:args.page_size]:
+                    fingerprint = get_page_simhash(page["title"] + " " + page["main_text"], page["child_url_list"])
+                    page["near_duplicate_page_id"] = near_duplicate_index.find(fingerprint)
+                    if page["near_duplicate_page_id"] is None:
+                        near_duplicate_index.add(page["page_id"], fingerprint)
+                        representative_page_list.append(page)
+                    else:
+                        follower_page_list.append(page)
+                        follower_count += 1
+                print(
+                    f"Site {site_name}: near-duplicate pages are {follower_count} "
+                    f"({follower_count / max(len(sub_page_list[0:args.page_size]), 1) * 100:.1f}%)"
+                )
+            print(f"LLM calls: {len(representative_page_list)} (saved {len(follower_page_list)} by near-duplicate detection)")
+
+        representative_page_list = thread_process(
+            representative_page_list, func, func_args, executor_type="thread", max_workers=args.max_thread
+        )
+        representative_page_dict = {page["page_id"]: page for page in representative_page_list}
+        for page in follower_page_list:
+            page["index_probability"] = representative_page_dict[page["near_duplicate_page_id"]]["index_probability"]
+            page["prediction"] = representative_page_dict[page["near_duplicate_page_id"]]["prediction"]
+        page_list = representative_page_list + follower_page_list
     else:
         page_list = [func(page, *func_args) for page in tqdm(page_list)]
 
@@ -117,6 +148,10 @@ if __name__ == '__main__':
         choices=["gpt-4o-mini", "gpt-4o"]
     )
     parser.add_argument("--data_split", type=str, default="test", help="Data split to use", choices=["dev", "test"])
+    parser.add_argument("--near_duplicate_distance", type=int, default=3, help=(
+            "If you use LLMs, pages whose SimHash (title, body and links) is within this Hamming distance "
+            "from an earlier page of the same site reuse its label. -1 disables it"
+        ))
 
     args = parser.parse_args()
 
@@ -1,4 +1,3 @@
-import re
 from collections import Counter
 import os
 import json
@@ -6,33 +5,19 @@ import argparse
 import random
 import itertools
 import pandas as pd
-from urllib.parse import urlparse, urlunparse
-from bs4 import BeautifulSoup
-import traceback
 import html
 from tqdm import tqdm
 
 from scripts.content_extractor import ExtractContent
+from scripts.page_crawler.page_archive import load_saved_page
+from scripts.page_crawler.page_analyzer import analyze_page
+from scripts.page_crawler.url_canonicalizer import normalize_url
 from scripts.utils import thread_process
 
 import warnings
 warnings.simplefilter("once")
 
 
-def normalize_url(url):
-    parsed_url = urlparse(url)
-
-    path = parsed_url.path
-    if path.endswith("index.htm") or path.endswith("index.html"):
-        path = path[:path.rfind("/")]
-
-    if path.endswith("/") == False:
-        path += "/"
-
-    normalized_url = urlunparse(parsed_url._replace(path=path))
-    return normalized_url
-
-
 class PagePreprocessing():
     def __init__(self, content_page_url_set, target_site_to_split):
 
@@ -41,77 +26,19 @@ class PagePreprocessing():
 
         self.extractor = ExtractContent()
 
-    # recieve html, return the detected publish date of the html
-    def publish_datetime_estimator(self, text, url):
-
-        # Extraction from "application/ld+json"
-        def extract_from_ld_json(soup):
-            try:
-                element_list = soup.find_all("script", attrs={"type": "application/ld+json"})
-                if len(element_list) == 0:
-                    return None
-
-                item = "\n".join([item.text for item in element_list])
-                publish_date = re.search(r'"datePublished":\s*?"(\d{4}-\d{2}-\d{2})', item)
-                if publish_date is None:
-                    return None
-
-                publish_date = publish_date.group(1)
-
-                return publish_date
-
-            except Exception:
-                print("Raised exception", url)
-                print(traceback.format_exc())
-                return None
-
-        # Extraction from 'meta property="article:published_time"'
-        def extract_from_meta(soup):
-            try:
-                element_list = soup.find_all("meta", attrs={"property": "article:published_time"})
-                if len(element_list) == 0:
-                    return None
-
-                item = "\n".join([item.get("content") for item in element_list])
-                publish_date = re.search(r'(\d{4}-\d{2}-\d{2})', item)
-                if publish_date is None:
-                    return None
-
-                publish_date = publish_date.group(1)
-
-                return publish_date
-
-            except Exception:
-                print("Raised exception", url)
-                print(traceback.format_exc())
-                return None
-
-        soup = BeautifulSoup(text, "html.parser")
-
-        publish_date = extract_from_ld_json(soup)
-        if publish_date is not None:
-            return publish_date
-
-        publish_date = extract_from_meta(soup)
-        if publish_date is not None:
-            return publish_date
-
-        date_str = "None"
-
-        return date_str
-
     def preprocess_page(self, page):
 
-        with open(page["save_path"], "rb")as f:
-            byte_text = f.read()
+        byte_text = load_saved_page(page["save_path"])
         html_text = byte_text.decode(page["encoding"])
         html_text = html.unescape(html_text)
 
-        main_text_list, title = self.extractor.analyse(html_text)
+        # Publish date is collected by the tokenizer pass, main text and title by "ExtractContent"
+        analysis = analyze_page(html_text, page["url"], extractor=self.extractor, collect_meta=True)
+        main_text_list, title = analysis["main_text_list"], analysis["title"]
 
         main_text = " ".join(main_text_list).replace(title, "")
         main_text = main_text.replace("\n", "").replace('"', "'")
-        publish_datetime = self.publish_datetime_estimator(html_text, page["url"])
+        publish_datetime = analysis["publish_datetime"]
 
         page["main_text"] = main_text
         page["title"] = title
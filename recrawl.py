@@ -0,0 +1,90 @@
+import os
+import json
+import datetime
+import time
+import argparse
+import pandas as pd
+from collections import defaultdict
+
+from scripts.page_crawler.index_recrawler import IndexRecrawler
+from scripts.page_crawler.url_canonicalizer import load_canonical_rule_dict, get_site_canonical_rule
+from scripts.utils import thread_process_crawl
+
+import warnings
+warnings.simplefilter("once")
+
+
+def recrawl():
+
+    start_time = time.time()
+
+    config_file_name = "target_site.csv"
+    target_file_type = ["html"]
+    crawl_log_interval = 100
+
+    page_list = []
+    with open(f"{args.prediction_data_path}/prediction_page_list_{args.data_split}.jsonl")as f:
+        for page in f:
+            page_list.append(json.loads(page))
+
+    site_page_list_dict = defaultdict(list)
+    for page in page_list:
+        site_page_list_dict[page["site_name"]].append(page)
+
+    target_site_list = pd.read_csv(f"config/{config_file_name}").to_dict(orient="records")
+    site_to_url_dict = {site["site_name"]: site["URL"] for site in target_site_list}
+
+    # Top-k predicted index pages per site (same order as evaluate.py: index probability, then crawled order)
+    os.makedirs(args.data_path, exist_ok=True)
+    canonical_rule_dict = load_canonical_rule_dict(args.url_canonical_rule_path)
+    site_list = []
+    for site_name, site_page_list in site_page_list_dict.items():
+        index_page_list = [
+            page for page in sorted(site_page_list, key=lambda x: -x["index_probability"])
+            if page["prediction"] == "index"
+        ][0:args.top_k]
+        known_url_list = list(set(
+            [page["url"] for page in site_page_list] + [url for page in site_page_list for url in page["child_url_list"]]
+        ))
+        site_list.append(IndexRecrawler(
+            site_name, site_to_url_dict[site_name], index_page_list, known_url_list,
+            f"{args.data_path}/link_set.sqlite", args.data_raw_folder, crawl_log_interval,
+            download_tool=args.download_tool, storage=args.storage, archive_compression=args.archive_compression,
+            robots_ttl=args.robots_ttl,
+            url_canonical_rule=get_site_canonical_rule(canonical_rule_dict, site_name),
+        ))
+    print(f"Recrawl site size: {len(site_list)}, index page size: {sum([len(site.index_page_list) for site in site_list])}")
+
+    recrawled_page_list = thread_process_crawl(
+        site_list, (args.page_size, target_file_type), executor_type="process", max_workers=args.max_thread
+    )
+    with open(f"{args.data_path}/recrawl_page_list.jsonl", "w")as f:
+        for page in recrawled_page_list:
+            f.write(json.dumps(page, ensure_ascii=False)+"\n")
+    print()
+
+    new_page_count = len([page for page in recrawled_page_list if page["page_depth"] > 0])
+    print(f"Downloaded page size: {len(recrawled_page_list)} ({len(recrawled_page_list) / max(len(page_list), 1) * 100:.1f}% of the previous crawl)")
+    print(f"New page size: {new_page_count}")
+    elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+    print(f"End recrawl {elasped_time}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prediction_data_path", type=str, help="Path where prediction results are saved")
+    parser.add_argument("--data_split", type=str, default="test", help="Data split to use", choices=["dev", "test"])
+    parser.add_argument("--data_path", type=str, help="Path to save recrawled page list and link sets of index pages")
+    parser.add_argument("--data_raw_folder", type=str, default="./data/page_raw", help="Path to save downloaded pages")
+    parser.add_argument("--top_k", type=int, default=30, help="Number of predicted index pages to revisit per site")
+    parser.add_argument("--page_size", type=int, default=1000000000, help="Max number of new pages to download per site")
+    parser.add_argument("--max_thread", type=int, default=16, help="Max thread size")
+    parser.add_argument("--download_tool", type=str, default="curl", help="Download backend", choices=["curl", "http"])
+    parser.add_argument("--storage", type=str, default="file", help="Storage of downloaded pages", choices=["file", "archive"])
+    parser.add_argument("--archive_compression", type=str, default="zlib", help="Compression of each page in archive", choices=["zlib", "gzip", "none"])
+    parser.add_argument("--url_canonical_rule_path", type=str, default="config/url_canonical_rules.json", help="Per-site url canonicalization rules")
+    parser.add_argument("--robots_ttl", type=float, default=86400, help="Seconds to reuse cached robots.txt")
+
+    args = parser.parse_args()
+
+    recrawl()
@@ -0,0 +1,90 @@
+import re
+import hashlib
+import numpy as np
+from collections import defaultdict
+
+
+WORD_PATTERN = re.compile(r"\w+")
+BIT_MASK = np.array([1 << i for i in range(64)], dtype=np.uint64)
+
+
+def get_feature_hash(feature):
+    digest = hashlib.blake2b(feature.encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# Word n-grams of the text (lowercased)
+def get_shingle_list(text, size=3):
+    word_list = WORD_PATTERN.findall(text.lower())
+    if len(word_list) < size:
+        return [" ".join(word_list)] if len(word_list) > 0 else []
+    return [" ".join(word_list[i:i+size]) for i in range(len(word_list) - size + 1)]
+
+
+# Number of features whose hash has each of 64 bits, and the number of features.
+# Counts of feature lists can be added, so the count of the text is computed once and reused (and cached).
+def get_bit_count(feature_list):
+    if len(feature_list) == 0:
+        return np.zeros(64, dtype=np.int64), 0
+    hash_array = np.array([get_feature_hash(feature) for feature in feature_list], dtype=np.uint64)
+    return ((hash_array[:, None] & BIT_MASK) != 0).sum(axis=0).astype(np.int64), len(feature_list)
+
+
+# SimHash is the majority of each bit
+def get_simhash_from_bit_count(bit_count, feature_count):
+    if feature_count == 0:
+        return 0
+    bit_list = (np.asarray(bit_count) * 2 > feature_count).tolist()
+    return sum([1 << i for i, bit in enumerate(bit_list) if bit])
+
+
+# 64-bit SimHash of the features (each feature has the same weight)
+def get_simhash(feature_list):
+    return get_simhash_from_bit_count(*get_bit_count(feature_list))
+
+
+def get_text_bit_count(text):
+    return get_bit_count(get_shingle_list(text))
+
+
+# SimHash of a page from shingles of the text and the set of outgoing links.
+# "text_bit_count" is the result of "get_text_bit_count" if it is already computed.
+def get_page_simhash(text, link_list, text_bit_count=None):
+    bit_count, feature_count = text_bit_count if text_bit_count is not None else get_text_bit_count(text)
+    link_bit_count, link_feature_count = get_bit_count([f"link:{link}" for link in set(link_list)])
+    return get_simhash_from_bit_count(np.asarray(bit_count) + link_bit_count, feature_count + link_feature_count)
+
+
+def get_hamming_distance(fingerprint1, fingerprint2):
+    return bin(fingerprint1 ^ fingerprint2).count("1")
+
+
+# Find fingerprints within "max_distance" bits.
+# 64 bits are split into "max_distance + 1" blocks, and a near duplicate has at least one identical block,
+# so only fingerprints sharing a block are compared.
+class SimHashIndex():
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        block_size = self.max_distance + 1
+        self.block_range_list = [(64 * i // block_size, 64 * (i + 1) // block_size) for i in range(block_size)]
+        self.block_dict_list = [defaultdict(list) for _ in range(block_size)]
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def get_block_list(self, fingerprint):
+        return [(fingerprint >> start) & ((1 << (end - start)) - 1) for start, end in self.block_range_list]
+
+    # Return key of the near duplicate fingerprint, or None if not found
+    def find(self, fingerprint):
+        for block_dict, block in zip(self.block_dict_list, self.get_block_list(fingerprint)):
+            for candidate, key in block_dict.get(block, []):
+                if get_hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key, fingerprint):
+        for block_dict, block in zip(self.block_dict_list, self.get_block_list(fingerprint)):
+            block_dict[block].append((fingerprint, key))
+        self.size += 1
@@ -127,7 +127,9 @@ class PageClassifier(BaseGenerator):
 
         return page
 
-    def classify_rule(self, page):
+    # Stateless (the crawler calls it without building the generator)
+    @staticmethod
+    def classify_rule(page):
 
         page["index_probability"] = \
             1.0 if len(page["title"].split()) <= 9 else \
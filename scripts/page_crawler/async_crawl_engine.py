@@ -0,0 +1,187 @@
+import asyncio
+import datetime
+import time
+import functools
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Seconds added to "crawl_delay". The request is sent a little after its slot (thread wake-up and the switch interval
+# of the GIL, 5 ms by default), and the delay differs between the requests.
+JITTER_MARGIN = 0.01
+
+
+# Keep "crawl_delay" interval between the requests to the same host.
+# The slot is reserved by the worker thread right before the request is sent, so the delay until the thread pool
+# starts the fetch does not shorten the interval.
+class HostPacer():
+    def __init__(self):
+        self.next_time_dict = {}
+        self.lock = threading.Lock()
+
+    # Seconds until the next slot of the host (the slot is not reserved)
+    def get_wait_time(self, host):
+        with self.lock:
+            return max(self.next_time_dict.get(host, 0) - time.monotonic(), 0)
+
+    def wait(self, host, crawl_delay):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time_dict.get(host, now))
+            self.next_time_dict[host] = slot + (crawl_delay + JITTER_MARGIN if crawl_delay > 0 else 0)
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Crawl all sites in one event loop.
+# Downloads and parsing run in a thread pool, so the event loop keeps other downloads in flight while a page is parsed.
+# Crawl state of a site (frontier, seen urls, detectors) is only changed under the lock of the site.
+# Each site is crawled by "GeneralCrawler" methods, so the page records are the same as "page_list_crawl".
+class AsyncCrawlEngine():
+    def __init__(self, crawler_list, max_concurrency=64, site_concurrency=2):
+        self.crawler_list = crawler_list
+        self.max_concurrency = max_concurrency
+        self.site_concurrency = site_concurrency
+
+    def crawl(self, max_page_size=1, target_file_type=["html"]):
+        return asyncio.run(self.crawl_all(max_page_size, target_file_type))
+
+    async def crawl_all(self, max_page_size, target_file_type):
+        self.pacer = HostPacer()
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Parsing has its own threads, so a download does not wait for parsing after its slot of the host
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor, \
+                ThreadPoolExecutor(max_workers=min(len(self.crawler_list), self.max_concurrency)) as parse_executor:
+            self.executor = executor
+            self.parse_executor = parse_executor
+            result_list = await asyncio.gather(*[
+                self.crawl_site(crawler, max_page_size, target_file_type) for crawler in self.crawler_list
+            ])
+
+        page_list = []
+        for site_page_list in result_list:
+            page_list += site_page_list
+        return page_list
+
+    async def fetch_page(self, crawler, url, parent_url, target_file_type):
+        loop = asyncio.get_running_loop()
+
+        # Page loaded from saved file does not access to the host (nor page not saved in offline replay, which is skipped)
+        is_network = crawler.offline is False and (
+            crawler.disable_page_reget is False or crawler.downloader.is_saved(url) is False
+        )
+
+        # Waiting for the host before acquiring a download slot keeps the download slots for other hosts.
+        # The slot of the host is reserved in the worker thread, and the pre-check request of the page takes a slot
+        # of the host, so the download waits for the next slot.
+        if is_network:
+            await asyncio.sleep(self.pacer.get_wait_time(crawler.site_netloc))
+        async with self.semaphore:
+            return await loop.run_in_executor(
+                self.executor, self.fetch_in_worker, crawler, url, parent_url, target_file_type, is_network
+            )
+
+    def fetch_in_worker(self, crawler, url, parent_url, target_file_type, is_network):
+        wait_host = functools.partial(self.pacer.wait, crawler.site_netloc, crawler.crawl_delay)
+        if is_network:
+            wait_host()
+        return crawler.fetch_page(
+            url, parent_url, skip_first_delay=True, target_file_type=target_file_type, wait_host=wait_host,
+        )
+
+    # Parse the page and queue its links (run in the thread pool under the lock of the site)
+    def process_result(self, crawler, state, item, fetch_result, target_file_type, in_flight_list, start_time):
+        url, parent_url, depth = item
+        byte_text, save_path = fetch_result
+        frontier = crawler.frontier
+
+        page, processed_child_url_list, file_type = \
+            crawler.process_page(url, parent_url, depth, byte_text, save_path, target_file_type)
+
+        for link in processed_child_url_list:
+            frontier.push(link, url, depth+1)
+
+        if page is not None:
+            frontier.add_record(page)
+            crawler.report_progress()
+
+        if file_type in target_file_type:
+            state["collected_page_count"] += 1
+            collected_page_count = state["collected_page_count"]
+            if collected_page_count % crawler.crawl_log_interval == 0:
+                elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+                print(f"Crawled {collected_page_count} pages of {crawler.site_name}, current depth is {depth}, elasped time is {elasped_time}")
+            if collected_page_count % crawler.checkpoint_interval == 0:
+                frontier.checkpoint(state, in_flight_list=in_flight_list)
+
+    async def crawl_site(self, crawler, max_page_size, target_file_type):
+        start_time = time.time()
+        state = crawler.start_frontier()
+        frontier = crawler.frontier
+
+        # robots.txt is downloaded by the first access of the site, concurrently with the other sites
+        await asyncio.get_running_loop().run_in_executor(self.executor, crawler.load_robot_parser)
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.pacer.wait, crawler.site_netloc, crawler.crawl_delay
+        )
+
+        # Items popped from frontier but not processed yet
+        in_flight_dict = {}
+        condition = asyncio.Condition()
+        site_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+
+        async def worker(worker_id):
+            while True:
+                async with condition:
+                    while len(frontier) == 0 and len(in_flight_dict) > 0:
+                        await condition.wait()
+                    async with site_lock:
+                        if len(frontier) == 0 or \
+                                state["collected_page_count"] >= crawler.get_page_limit(state["collected_page_count"], max_page_size):
+                            condition.notify_all()
+                            return
+                        url, parent_url, depth = frontier.pop()
+                        in_flight_dict[worker_id] = (url, parent_url, depth)
+
+                try:
+                    async with site_lock:
+                        if crawler.check_target_url(url) is False:
+                            continue
+
+                    fetch_result = await self.fetch_page(crawler, url, parent_url, target_file_type)
+
+                    async with site_lock:
+                        if fetch_result is None or \
+                                state["collected_page_count"] >= crawler.get_page_limit(state["collected_page_count"], max_page_size):
+                            continue
+                        in_flight_list = [item for key, item in in_flight_dict.items() if key != worker_id]
+                        await loop.run_in_executor(self.parse_executor, functools.partial(
+                            self.process_result, crawler, state, (url, parent_url, depth), fetch_result,
+                            target_file_type, in_flight_list, start_time,
+                        ))
+                except Exception:
+                    print(f"Failed to process {url}, parent: {parent_url}")
+                    print(traceback.format_exc())
+                finally:
+                    in_flight_dict.pop(worker_id, None)
+                    async with condition:
+                        condition.notify_all()
+
+        await asyncio.gather(*[worker(worker_id) for worker_id in range(self.site_concurrency)])
+
+        crawled_all = len(frontier) == 0
+        page_list = crawler.finish_frontier(state)
+
+        collected_page_count = state["collected_page_count"]
+        elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+        if crawled_all is False:
+            print(f"End crawling {collected_page_count} pages of {crawler.site_name}, elasped time is {elasped_time}")
+        else:
+            print(f"End crawling {collected_page_count} pages of {crawler.site_name} because crawed all pages, elasped time is {elasped_time}")
+        if crawler.disable_page_reget is False:
+            print(crawler.downloader.get_revalidation_report())
+
+        return page_list
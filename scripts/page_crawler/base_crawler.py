@@ -1,6 +1,7 @@
-import chardet
+import threading
 import urllib.robotparser
 from .downloader import Downloader
+from .robots_cache import RobotsCache
 
 
 class BaseCrawler():
@@ -8,48 +9,81 @@ class BaseCrawler():
         # Need set data_raw_folder, site_netloc, site_domain in child class
         pass
 
-    def set_downloader(self, data_raw_folder, site_save_folder):
-        self.downloader = Downloader("curl", data_raw_folder, site_save_folder)
+    def set_downloader(
+        self, data_raw_folder, site_save_folder, download_tool="curl", storage="file", archive_compression="zlib"
+    ):
+        self.downloader = Downloader(
+            download_tool, data_raw_folder, site_save_folder,
+            storage=storage, archive_compression=archive_compression,
+        )
 
-    def set_robot_parser(self, site_domain):
-        # Set robot file parser
-        self.robot_parser = urllib.robotparser.RobotFileParser()
-        robots_txt_url = f'{site_domain}/robots.txt'
-        byte_text, _ = self.downloader.download(robots_txt_url, not_save=True)
-        self.robot_parser.parse(byte_text.decode().split("\n"))
+    # robots.txt is loaded lazily on the first use of "robot_parser" / "crawl_delay" (not in constructor),
+    # and it is cached in "robots_cache_path" for "robots_ttl" seconds
+    # If "offline" is True, cached robots.txt is used regardless of "robots_ttl", and all pages are allowed if it is not cached
+    def set_robot_parser(self, site_domain, robots_cache_path=None, robots_ttl=86400, offline=False):
+        self.site_domain = site_domain
+        self.robots_offline = offline
+        self.robots_cache = RobotsCache(robots_cache_path, ttl=robots_ttl) if robots_cache_path is not None else None
+        self.init_robot_state()
 
-        crawl_delay_value = self.robot_parser.crawl_delay("*")
-        self.crawl_delay = crawl_delay_value if crawl_delay_value is not None else 1
+    def init_robot_state(self):
+        self._robot_parser = None
+        self._crawl_delay = None
+        self.robot_lock = threading.Lock()
 
-    def check_robots_txt(self, url):
-        return self.robot_parser.can_fetch("*", url)
+    # Lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("robot_lock", None)
+        return state
 
-    def detect_encoding(self, byte_text, url, depth):
-        if depth == 0:
-            default_encoding = chardet.detect(byte_text)["encoding"]
-            if default_encoding != "utf-8":
-                self.valid_encoding_cand_list = ["utf-8", default_encoding]
-            else:
-                self.valid_encoding_cand_list = ["utf-8"]
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.robot_lock = threading.Lock()
 
-        text = None
-        for encoding_cand in self.valid_encoding_cand_list:
-            try:
-                text = byte_text.decode(encoding=encoding_cand)
-                encoding = encoding_cand
-            except Exception:
-                continue
+    def load_robot_parser(self):
+        with self.robot_lock:
+            if self._robot_parser is not None:
+                return self._robot_parser
 
-        if text is None:
+            robot_parser = urllib.robotparser.RobotFileParser()
             try:
-                print(f"Default encoding is cannot used: {url}")
-                encoding_cand = chardet.detect(byte_text)["encoding"]
-                text = byte_text.decode(encoding=encoding_cand)
-                encoding = encoding_cand
+                if self.robots_offline:
+                    text = self.robots_cache.get(self.site_domain, ignore_ttl=True) if self.robots_cache is not None else None
+                    if text is None:
+                        print(f"robots.txt of {self.site_domain} is not cached, all saved pages are allowed")
+                        text = "User-agent: *\nAllow: /"
+                elif self.robots_cache is not None:
+                    text = self.robots_cache.fetch(self.site_domain, self.downloader)
+                else:
+                    text = self.downloader.download_robots(f"{self.site_domain}/robots.txt")
             except Exception:
-                print("Cannot detect valid text encoding")
-                print(url, byte_text[0:1000])
-                encoding = None
-                text = byte_text
+                # Server error or network error (missing robots.txt allows all pages). Not cached, so it is retried in the next run
+                print(f"Cannot access to robots.txt of {self.site_domain}, all pages are disallowed")
+                text = "User-agent: *\nDisallow: /"
+            robot_parser.parse(text.split("\n"))
+
+            crawl_delay_value = robot_parser.crawl_delay("*")
+            if self._crawl_delay is None:
+                self._crawl_delay = crawl_delay_value if crawl_delay_value is not None else 1
+            self._robot_parser = robot_parser
+            return robot_parser
 
-        return encoding, text
+    @property
+    def robot_parser(self):
+        if self._robot_parser is None:
+            self.load_robot_parser()
+        return self._robot_parser
+
+    @property
+    def crawl_delay(self):
+        if self._crawl_delay is None:
+            self.load_robot_parser()
+        return self._crawl_delay
+
+    @crawl_delay.setter
+    def crawl_delay(self, crawl_delay):
+        self._crawl_delay = crawl_delay
+
+    def check_robots_txt(self, url):
+        return self.robot_parser.can_fetch("*", url)
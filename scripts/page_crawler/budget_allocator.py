@@ -0,0 +1,91 @@
+import threading
+from multiprocessing.managers import BaseManager
+
+
+# Global crawl budget (number of collected pages) shared by all sites of one crawl.
+# Each site gets the budget in grants: it asks for the next grant when it has used the last one, with the number of
+# fetched pages and new in-domain urls queued by them. The grant is "grant_size" multiplied by the marginal discovery
+# rate of the site (new urls per fetch in the last grant) relative to the mean rate of the active sites,
+# so productive sites get more of the remaining budget. Unused budget of finished sites goes back to the pool.
+# All sites are registered up front: the first grant of each site which has not started yet is reserved in the pool,
+# and a grant is at most the pool divided by the unfinished sites, so the sites crawled first cannot drain the budget.
+class BudgetAllocator():
+    def __init__(self, total_budget, site_name_list, grant_size=None, min_weight=0.25, max_weight=4.0):
+        self.total_budget = total_budget
+        self.pool = total_budget
+        # Default: the first grant is a quarter of the uniform split, and the rest is moved between sites
+        site_size = len(site_name_list)
+        self.grant_size = grant_size if grant_size is not None else max(total_budget // max(site_size * 4, 1), 1)
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+
+        self.site_dict = {
+            site_name: {"granted": 0, "used": 0, "rate": None, "grant_count": 0, "finished": False}
+            for site_name in site_name_list
+        }
+        self.lock = threading.Lock()
+
+    def get_weight(self, site_name):
+        rate_list = [
+            site["rate"] for site in self.site_dict.values() if site["finished"] is False and site["rate"] is not None
+        ]
+        rate = self.site_dict[site_name]["rate"]
+        mean_rate = sum(rate_list) / len(rate_list) if len(rate_list) > 0 else 0
+        if rate is None or mean_rate == 0:
+            return 1.0
+        return min(max(rate / mean_rate, self.min_weight), self.max_weight)
+
+    # Return the number of pages granted to the site (0 if the budget is used up)
+    def request(self, site_name, fetch_count=0, new_url_count=0):
+        with self.lock:
+            if site_name not in self.site_dict:
+                self.site_dict[site_name] = {
+                    "granted": 0, "used": 0, "rate": None, "grant_count": 0, "finished": False,
+                }
+            site = self.site_dict[site_name]
+            if fetch_count > 0:
+                site["rate"] = new_url_count / fetch_count
+
+            reserved_count = len([
+                other_site_name for other_site_name, other_site in self.site_dict.items()
+                if other_site_name != site_name and other_site["grant_count"] == 0 and other_site["finished"] is False
+            ])
+            available = max(self.pool - reserved_count * self.grant_size, 0)
+            unfinished_count = len([other_site for other_site in self.site_dict.values() if other_site["finished"] is False])
+            max_grant = max(available // max(unfinished_count, 1), min(self.grant_size, available), 1)
+            grant = min(max(round(self.grant_size * self.get_weight(site_name)), 1), max_grant, available)
+            self.pool -= grant
+            site["granted"] += grant
+            site["grant_count"] += grant > 0
+            return grant
+
+    # Return the budget which is not used by the finished site to the pool
+    def finish(self, site_name, used_count):
+        with self.lock:
+            site = self.site_dict.get(site_name)
+            if site is None or site["finished"]:
+                return
+            site["used"] = used_count
+            site["finished"] = True
+            self.pool += max(site["granted"] - used_count, 0)
+
+    def get_report(self, top_k=10):
+        with self.lock:
+            used_count = sum([site["used"] for site in self.site_dict.values()])
+            site_list = sorted(self.site_dict.items(), key=lambda x: -x[1]["granted"])
+            item_list = [
+                f"{site_name} {site['used']}/{site['granted']} (rate {site['rate'] if site['rate'] is not None else 0:.2f})"
+                for site_name, site in site_list[0:top_k]
+            ]
+            return (
+                f"Budget allocation: used {used_count} of {self.total_budget} pages, {self.pool} left, "
+                f"top sites (used/granted): {', '.join(item_list)}"
+            )
+
+
+# Share one allocator with the crawler processes (crawler holds the proxy)
+class BudgetManager(BaseManager):
+    pass
+
+
+BudgetManager.register("BudgetAllocator", BudgetAllocator)
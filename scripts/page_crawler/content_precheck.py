@@ -0,0 +1,154 @@
+import re
+import threading
+from urllib.parse import urlparse
+
+from .content_sniffer import get_header_file_type
+
+
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+# Path pattern of the url: the first two directories (numbers are replaced with "0") and the shape of the rest.
+# e.g. "/files/report-2023" -> "/files/*", "/media/123/clip.mp4" -> "/media/0/*.mp4", "/news/2024/05/title/" -> "/news/0/*/*/"
+def get_path_pattern(url):
+    segment_list = urlparse(url).path.split("/")[1:] or [""]
+    last_segment = segment_list[-1]
+    pattern_list = [NUMBER_PATTERN.sub("0", segment) for segment in segment_list[:-1][0:2]]
+    pattern_list += ["*"] * (len(segment_list) - 1 - len(pattern_list))
+
+    extension = last_segment.rsplit(".", 1)[-1].lower() if "." in last_segment else ""
+    if last_segment == "":
+        pattern_list.append("")
+    elif 0 < len(extension) <= 5:
+        pattern_list.append(f"*.{extension}")
+    else:
+        pattern_list.append("*")
+    return "/" + "/".join(pattern_list)
+
+
+# Total size of the resource from the probe response (None if unknown)
+def get_content_size(response):
+    content_range = response.headers.get("content-range", "")
+    if content_range.rsplit("/", 1)[-1].strip().isdigit():
+        return int(content_range.rsplit("/", 1)[-1])
+    content_length = response.headers.get("content-length", "").strip()
+    if response.status == 200 and content_length.isdigit():
+        return int(content_length)
+    return None
+
+
+# Skip non-target resources (pdf, image, video, feed, ...) before downloading their bodies.
+# Content-Type is checked by HEAD request (or ranged GET of the first bytes), and the answer is cached per path pattern:
+# once "trust_count" urls of a pattern are all target (or all non-target), urls of the pattern are decided without request.
+# Url whose type is unknown (no header, error) is downloaded as before.
+class ContentPrecheck():
+    def __init__(self, downloader, content_sniffer, method="head", trust_count=3, range_size=1024):
+        self.downloader = downloader
+        self.content_sniffer = content_sniffer
+        self.method = method
+        self.trust_count = trust_count
+        self.range_size = range_size
+
+        # Path pattern: [number of target urls, number of non-target urls, total size of non-target urls of known size,
+        # number of non-target urls of known size]
+        self.pattern_dict = {}
+        self.stats = {
+            "probe_count": 0, "pattern_hit_count": 0, "skipped_count": 0,
+            "skipped_bytes": 0, "estimated_bytes": 0, "unknown_size_count": 0,
+        }
+        self.init_lock()
+
+    def init_lock(self):
+        self.lock = threading.Lock()
+
+    # Lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_lock()
+
+    # "javascript" page is processed as html (same as "process_page")
+    def is_target_file_type(self, file_type, target_file_type):
+        return file_type in target_file_type or (file_type == "javascript" and "html" in target_file_type)
+
+    def record(self, url, is_target, size=None):
+        with self.lock:
+            count = self.pattern_dict.setdefault(get_path_pattern(url), [0, 0, 0, 0])
+            count[0 if is_target else 1] += 1
+            if is_target is False and size is not None:
+                count[2] += size
+                count[3] += 1
+
+    # Return True / False if the pattern of the url is always target / non-target, or None if it is not decided
+    def get_pattern_decision(self, url):
+        with self.lock:
+            count = self.pattern_dict.get(get_path_pattern(url))
+        if count is None:
+            return None
+        if count[0] >= self.trust_count and count[1] == 0:
+            return True
+        if count[1] >= self.trust_count and count[0] == 0:
+            return False
+        return None
+
+    # Size of url skipped without request is estimated by the mean size of the pattern
+    def add_estimated_size(self, url):
+        with self.lock:
+            count = self.pattern_dict[get_path_pattern(url)]
+            if count[3] > 0:
+                self.stats["estimated_bytes"] += count[2] // count[3]
+            else:
+                self.stats["unknown_size_count"] += 1
+
+    # Return (is_target, probed). If "probed" is True, the request is already sent after "crawl_delay".
+    def check(self, url, target_file_type, crawl_delay, skip_first_delay=False):
+        decision = self.get_pattern_decision(url)
+        if decision is not None:
+            with self.lock:
+                self.stats["pattern_hit_count"] += 1
+                if decision is False:
+                    self.stats["skipped_count"] += 1
+            if decision is False:
+                self.add_estimated_size(url)
+            return decision, False
+
+        try:
+            response = self.downloader.probe(
+                url, self.method, crawl_delay, skip_first_delay=skip_first_delay, range_size=self.range_size
+            )
+        except Exception:
+            return True, True
+        with self.lock:
+            self.stats["probe_count"] += 1
+        if response.status >= 400:
+            return True, True
+
+        file_type = get_header_file_type(response.headers.get("content-type"))
+        if file_type is None and len(response.body) > 0:
+            file_type = self.content_sniffer.sniff_file_type(response.body)
+        if file_type is None or self.is_target_file_type(file_type, target_file_type):
+            return True, True
+
+        size = get_content_size(response)
+        self.record(url, False, size)
+        with self.lock:
+            self.stats["skipped_count"] += 1
+            if size is not None:
+                self.stats["skipped_bytes"] += max(size - response.wire_size, 0)
+            else:
+                self.stats["unknown_size_count"] += 1
+        return False, True
+
+    def get_report(self, site_name):
+        stats = self.stats
+        return (
+            f"Pre-check of {site_name}: {stats['probe_count']} requests, {stats['pattern_hit_count']} urls decided by path pattern, "
+            f"skipped {stats['skipped_count']} non-target urls "
+            f"({(stats['skipped_bytes'] + stats['estimated_bytes']) / 1024 / 1024:.1f} MB avoided, "
+            f"{stats['estimated_bytes'] / 1024 / 1024:.1f} MB of them estimated by path pattern, "
+            f"{stats['unknown_size_count']} urls of unknown size)"
+        )
@@ -0,0 +1,127 @@
+import re
+import codecs
+import chardet
+import magic
+
+
+BOM_LIST = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Content-Type which does not tell the actual file type
+GENERIC_MIME_LIST = ["", "application/octet-stream", "binary/octet-stream", "text/plain", "application/unknown"]
+
+HEADER_CHARSET_PATTERN = re.compile(r"""charset\s*=\s*["']?\s*([^"';\s]+)""", re.I)
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.I)
+# Page starting with html markup (after BOM, spaces and comments)
+HTML_START_PATTERN = re.compile(rb"(?:\xef\xbb\xbf)?\s*(?:<!--.*?-->\s*)*<(?:!doctype\s+html|html|head|body)[\s>]", re.I | re.S)
+
+
+# Python codec name of the charset label, or None if it is unknown.
+# ASCII and Latin-1 labels are decoded as windows-1252 like browsers.
+def normalize_encoding(label):
+    if label is None:
+        return None
+    try:
+        encoding = codecs.lookup(label.strip()).name
+    except LookupError:
+        return None
+    if encoding in ["ascii", "iso8859-1"]:
+        encoding = "cp1252"
+    return encoding
+
+
+# Return subtype of mime type in Content-Type header (e.g. "html", "pdf"), or None if it does not tell the file type
+def get_header_file_type(content_type):
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime in GENERIC_MIME_LIST or "/" not in mime:
+        return None
+    file_type = mime.split("/")[-1]
+    if file_type == "xhtml+xml":
+        file_type = "html"
+    return file_type
+
+
+# Detect file type and text encoding of downloaded pages of one site.
+# Cheap hints (Content-Type header, BOM, <meta charset>) are used first, and only a bounded sample
+# is passed to libmagic / chardet. Encoding guessed by chardet is cached and reused for the next pages of the site.
+class ContentSniffer():
+    def __init__(self, meta_sniff_size=4096, magic_sample_size=8192, sample_size=32768):
+        self.meta_sniff_size = meta_sniff_size
+        self.magic_sample_size = magic_sample_size
+        self.sample_size = sample_size
+        self.site_encoding = None
+
+    # Return subtype of mime type (e.g. "html", "pdf")
+    def sniff_file_type(self, byte_text, content_type=None):
+        file_type = get_header_file_type(content_type)
+        if file_type is not None:
+            return file_type
+
+        if HTML_START_PATTERN.match(byte_text, 0, self.meta_sniff_size) is not None:
+            return "html"
+        file_type = magic.from_buffer(byte_text[0:self.magic_sample_size], mime=True).split("/")[-1]
+        if file_type == "xhtml+xml":
+            file_type = "html"
+        return file_type
+
+    # Return (source, encoding) of the declared charset, or (None, None) if it is not declared
+    def get_declared_encoding(self, byte_text, content_type=None):
+        if content_type is not None:
+            result = HEADER_CHARSET_PATTERN.search(content_type)
+            encoding = normalize_encoding(result.group(1)) if result is not None else None
+            if encoding is not None:
+                return "header", encoding
+
+        for bom, encoding in BOM_LIST:
+            if byte_text.startswith(bom):
+                return "bom", encoding
+
+        result = META_CHARSET_PATTERN.search(byte_text, 0, self.meta_sniff_size)
+        encoding = normalize_encoding(result.group(1).decode("ascii")) if result is not None else None
+        if encoding is not None:
+            return "meta", encoding
+
+        return None, None
+
+    def guess_encoding(self, byte_text):
+        return normalize_encoding(chardet.detect(byte_text[0:self.sample_size])["encoding"])
+
+    # Return (encoding, text). The page is decoded once if the declared or cached encoding is valid.
+    # If it cannot be decoded, return (None, byte_text).
+    def detect_encoding(self, byte_text, content_type=None):
+        _, encoding = self.get_declared_encoding(byte_text, content_type)
+        if encoding is not None:
+            try:
+                text = byte_text.decode(encoding)
+                return encoding, text
+            except (UnicodeDecodeError, LookupError):
+                pass
+
+        # Not declared (or wrong declaration). Try utf-8, and the encoding guessed from the previous page of the site.
+        try:
+            text = byte_text.decode("utf-8")
+            return "utf-8", text
+        except UnicodeDecodeError:
+            pass
+        if self.site_encoding is not None:
+            try:
+                text = byte_text.decode(self.site_encoding)
+                return self.site_encoding, text
+            except UnicodeDecodeError:
+                pass
+
+        encoding = self.guess_encoding(byte_text)
+        if encoding is not None:
+            try:
+                text = byte_text.decode(encoding)
+                self.site_encoding = encoding
+                return encoding, text
+            except UnicodeDecodeError:
+                pass
+
+        return None, byte_text
@@ -0,0 +1,202 @@
+import os
+import json
+import heapq
+import sqlite3
+from collections import deque
+
+
+# Crawl state of one site: link queue (FIFO), set of already queued urls and collected page records.
+# "MemoryFrontier" keeps everything in memory, and it is lost when the process is stopped.
+# "seen_set" is any object with "in" and "add" (set, or compact set of "url_seen_set").
+# If "records_path" is specified, page records are written to the JSONL file instead of memory.
+# If "scorer" (see "link_scorer") is specified, the url of the highest score is popped first (FIFO among the same score).
+class MemoryFrontier():
+    def __init__(self, seen_set=None, records_path=None, scorer=None):
+        self.scorer = scorer
+        self.link_queue = deque() if self.scorer is None else []
+        self.push_count = 0
+        self.seen_set = seen_set if seen_set is not None else set()
+        self.record_list = []
+        self.record_count = 0
+
+        self.records_path = records_path
+        if self.records_path is not None:
+            os.makedirs(os.path.dirname(self.records_path), exist_ok=True)
+            self.records_file = open(self.records_path, "wb")
+
+    def __len__(self):
+        return len(self.link_queue)
+
+    def is_new(self):
+        return len(self.seen_set) == 0
+
+    def push(self, url, parent_url, depth):
+        if self.scorer is None:
+            self.link_queue.append((url, parent_url, depth))
+        else:
+            score = self.scorer.score(url, parent_url, depth)
+            heapq.heappush(self.link_queue, (-score, self.push_count, (url, parent_url, depth)))
+            self.push_count += 1
+
+    def pop(self):
+        if self.scorer is None:
+            return self.link_queue.popleft()
+        return heapq.heappop(self.link_queue)[2]
+
+    def is_seen(self, url):
+        return url in self.seen_set
+
+    # Return True if the url is not seen yet
+    def add_seen(self, url):
+        if url in self.seen_set:
+            return False
+        self.seen_set.add(url)
+        return True
+
+    def add_record(self, page):
+        if self.records_path is not None:
+            self.records_file.write((json.dumps(page, ensure_ascii=False) + "\n").encode())
+        else:
+            self.record_list.append(page)
+        self.record_count += 1
+
+    def load_state(self):
+        return {}
+
+    def checkpoint(self, state, in_flight_list=[]):
+        if self.records_path is not None:
+            self.records_file.flush()
+
+    def get_records(self):
+        if self.records_path is not None:
+            self.records_file.flush()
+            with open(self.records_path) as f:
+                return [json.loads(line) for line in f]
+        return self.record_list
+
+    def close(self):
+        if self.records_path is not None:
+            self.records_file.close()
+
+
+# Crawl state saved in SQLite ("db_path") and JSONL ("records_path").
+# Only small buffers of the queue are kept in memory, so memory is bounded by "buffer_size".
+# All changes are committed at "checkpoint", and "resume" continues from the last checkpoint.
+# If "scorer" is specified, the url of the highest score in the queue table is popped one by one.
+class DiskFrontier():
+    def __init__(self, db_path, records_path, resume=False, buffer_size=1000, scorer=None):
+        self.db_path = db_path
+        self.records_path = records_path
+        self.buffer_size = buffer_size
+        self.scorer = scorer
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.records_path), exist_ok=True)
+        if resume is False:
+            for path in [self.db_path, f"{self.db_path}-wal", f"{self.db_path}-shm", self.records_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, parent_url TEXT, depth INTEGER, score REAL DEFAULT 0)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS queue_score ON queue (score DESC, id)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+        self.state = self.load_state()
+
+        # Records written after the last checkpoint are discarded
+        self.records_file = open(self.records_path, "a+b")
+        self.records_file.truncate(self.state.get("records_offset", 0))
+        self.records_file.seek(0, os.SEEK_END)
+        self.record_count = self.state.get("record_count", 0)
+
+        # Popped but not processed items at the last checkpoint are processed first
+        self.pop_buffer = deque([tuple(item) for item in self.state.get("pending", [])])
+        self.push_buffer = []
+        self.queue_size = \
+            self.conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0] + len(self.pop_buffer)
+
+    def __len__(self):
+        return self.queue_size
+
+    def is_new(self):
+        return self.conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None
+
+    def flush_push_buffer(self):
+        if len(self.push_buffer) > 0:
+            self.conn.executemany("INSERT INTO queue (url, parent_url, depth, score) VALUES (?, ?, ?, ?)", self.push_buffer)
+            self.push_buffer = []
+
+    def push(self, url, parent_url, depth):
+        score = self.scorer.score(url, parent_url, depth) if self.scorer is not None else 0
+        self.push_buffer.append((url, parent_url, depth, score))
+        self.queue_size += 1
+        if len(self.push_buffer) >= self.buffer_size:
+            self.flush_push_buffer()
+
+    def pop(self):
+        if len(self.pop_buffer) == 0 and self.scorer is not None:
+            self.flush_push_buffer()
+            row = self.conn.execute("SELECT id, url, parent_url, depth FROM queue ORDER BY score DESC, id LIMIT 1").fetchone()
+            self.conn.execute("DELETE FROM queue WHERE id = ?", (row[0],))
+            self.pop_buffer.append(tuple(row[1:]))
+        elif len(self.pop_buffer) == 0:
+            row_list = self.conn.execute(
+                "SELECT id, url, parent_url, depth FROM queue ORDER BY id LIMIT ?", (self.buffer_size,)
+            ).fetchall()
+            if len(row_list) > 0:
+                self.conn.execute("DELETE FROM queue WHERE id <= ?", (row_list[-1][0],))
+                self.pop_buffer.extend([tuple(row[1:]) for row in row_list])
+            else:
+                self.pop_buffer.extend([item[0:3] for item in self.push_buffer])
+                self.push_buffer = []
+
+        self.queue_size -= 1
+        return self.pop_buffer.popleft()
+
+    def is_seen(self, url):
+        return self.conn.execute("SELECT 1 FROM seen WHERE url = ?", (url,)).fetchone() is not None
+
+    # Return True if the url is not seen yet
+    def add_seen(self, url):
+        cursor = self.conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (url,))
+        return cursor.rowcount == 1
+
+    def add_record(self, page):
+        self.records_file.write((json.dumps(page, ensure_ascii=False) + "\n").encode())
+        self.record_count += 1
+
+    def load_state(self):
+        row = self.conn.execute("SELECT value FROM state WHERE key = 'state'").fetchone()
+        return json.loads(row[0]) if row is not None else {}
+
+    # Commit all changes. "in_flight_list" is the items popped but not processed yet.
+    def checkpoint(self, state, in_flight_list=[]):
+        self.flush_push_buffer()
+        self.records_file.flush()
+        os.fsync(self.records_file.fileno())
+
+        self.state = dict(state)
+        self.state["records_offset"] = self.records_file.tell()
+        self.state["record_count"] = self.record_count
+        self.state["pending"] = [list(item) for item in in_flight_list] + [list(item) for item in self.pop_buffer]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO state VALUES ('state', ?)", (json.dumps(self.state, ensure_ascii=False),)
+        )
+        self.conn.commit()
+
+    def get_records(self):
+        self.records_file.flush()
+        with open(self.records_path) as f:
+            return [json.loads(line) for line in f]
+
+    def close(self):
+        self.records_file.close()
+        self.conn.close()
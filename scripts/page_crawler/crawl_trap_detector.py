@@ -0,0 +1,119 @@
+import re
+from collections import deque
+from urllib.parse import urlparse
+
+from ..near_duplicate import SimHashIndex, get_simhash_from_bit_count
+
+
+NUMBER_PATTERN = re.compile(r"\d+")
+# Hex id / uuid, or long token of letters and digits (session id, hash)
+HASH_SEGMENT_PATTERN = re.compile(r"(?=.*\d)(?=.*[a-z])(?:[0-9a-f-]{8,}|[a-z0-9_]{16,})", re.I)
+
+
+def get_template_segment(segment):
+    if HASH_SEGMENT_PATTERN.fullmatch(segment) is not None:
+        return "{hash}"
+    return NUMBER_PATTERN.sub("{n}", segment)
+
+
+# Path template of the url: numbers and hash-like segments are replaced, and only the names of path / query parameters are kept.
+# e.g. "/calendar/2024/05/12/?view=day" -> "/calendar/{n}/{n}/{n}/?view",
+# "/shop/;jsessionid=1a2b3c4d5e6f?color=red&page=3" -> "/shop/;jsessionid?color&page"
+def get_url_template(url):
+    parsed_url = urlparse(url)
+    template = "/".join([get_template_segment(segment) for segment in parsed_url.path.split("/")])
+    if parsed_url.params:
+        template += ";" + ";".join(sorted(set([param.split("=", 1)[0] for param in parsed_url.params.split(";")])))
+    if parsed_url.query:
+        template += "?" + "&".join(sorted(set([
+            param.split("=", 1)[0] for param in parsed_url.query.split("&") if param != ""
+        ])))
+    return template
+
+
+# Online detection of crawl traps (calendar, endless pagination, session id, faceted filter).
+# Urls are clustered into path templates, and the yield of each template is tracked: new in-domain links queued by the page
+# to the other templates (a calendar page only finds the next calendar pages), plus 1 if the text of the page is new
+# (SimHash of the text is not within "text_distance" bits from the already expanded pages).
+# When the mean yield of the last "window" pages of a template falls below "min_yield", the template is throttled:
+# only one of every "sample_interval" urls of it is downloaded, until the yield of the sampled pages recovers.
+class CrawlTrapDetector():
+    def __init__(self, window=50, min_yield=0.5, sample_interval=10, text_distance=3):
+        self.window = window
+        self.min_yield = min_yield
+        self.sample_interval = sample_interval
+        self.template_dict = {}
+        self.text_index = SimHashIndex(text_distance)
+
+    def get_template_state(self, url):
+        template = get_url_template(url)
+        if template not in self.template_dict:
+            self.template_dict[template] = {
+                "template": template,
+                "fetch_count": 0,
+                "yield_list": deque(maxlen=self.window),
+                "is_trap": False,
+                "trap_count": 0,
+                "skipped_count": 0,
+                "throttled_url_count": 0,
+            }
+        return self.template_dict[template]
+
+    # Return False if the url should be skipped because its template is throttled
+    def allow(self, url):
+        state = self.get_template_state(url)
+        if state["is_trap"] is False:
+            return True
+        state["throttled_url_count"] += 1
+        if state["throttled_url_count"] % self.sample_interval == 0:
+            return True
+        state["skipped_count"] += 1
+        return False
+
+    def record_fetch(self, url):
+        self.get_template_state(url)["fetch_count"] += 1
+
+    def get_page_yield(self, url, text_bit_count, new_link_list):
+        template = get_url_template(url)
+        page_yield = len([link for link in new_link_list if get_url_template(link) != template])
+
+        fingerprint = get_simhash_from_bit_count(*text_bit_count)
+        if self.text_index.find(fingerprint) is None:
+            self.text_index.add(url, fingerprint)
+            page_yield += 1
+        return page_yield
+
+    # Record the page whose links are expanded. "text_bit_count" is the result of "get_text_bit_count" of the page text.
+    # "new_link_list" is the new in-domain links of the page (share links to other sites are new on every page).
+    # Return True if the template of the url is newly throttled.
+    def record_page(self, url, text_bit_count, new_link_list):
+        state = self.get_template_state(url)
+        state["yield_list"].append(self.get_page_yield(url, text_bit_count, new_link_list))
+        if len(state["yield_list"]) < self.window:
+            return False
+
+        is_trap = sum(state["yield_list"]) / len(state["yield_list"]) < self.min_yield
+        newly_throttled = is_trap and state["is_trap"] is False
+        if newly_throttled:
+            state["trap_count"] += 1
+        state["is_trap"] = is_trap
+        return newly_throttled
+
+    # Templates sorted by the number of downloaded pages (crawl budget), with throttled urls
+    def get_report(self, site_name, top_k=5):
+        state_list = sorted(self.template_dict.values(), key=lambda x: -x["fetch_count"])
+        fetch_count = sum([state["fetch_count"] for state in state_list])
+        skipped_count = sum([state["skipped_count"] for state in state_list])
+        trap_count = len([state for state in state_list if state["trap_count"] > 0])
+        item_list = []
+        for state in state_list[0:top_k]:
+            if state["fetch_count"] == 0:
+                break
+            item = f"{state['template']} {state['fetch_count']} ({state['fetch_count'] / max(fetch_count, 1) * 100:.1f}%"
+            if state["trap_count"] > 0:
+                item += f", trap, skipped {state['skipped_count']}"
+            item_list.append(item + ")")
+        return (
+            f"Crawl budget of {site_name}: {fetch_count} pages in {len(state_list)} templates, "
+            f"{trap_count} trap templates throttled (skipped {skipped_count} urls), top: {', '.join(item_list)}"
+        )
@@ -1,11 +1,20 @@
 import time
+import datetime
 import os
 import traceback
 import subprocess
+from urllib.parse import urljoin
+
+from .http_client import HttpClient, HttpResponse, ResponseTooLarge
+from .page_archive import PageArchive
+from .page_meta_store import PageMetaStore
 
 
 class Downloader():
-    def __init__(self, download_tool, data_raw_folder, site_save_folder):
+    def __init__(
+        self, download_tool, data_raw_folder, site_save_folder, http_client=None,
+        storage="file", archive_compression="zlib", conditional_get=True,
+    ):
 
         self.download_tool = download_tool
         self.data_raw_folder = data_raw_folder
@@ -13,54 +22,273 @@ class Downloader():
         self.save_folder = f'{self.data_raw_folder}/{self.site_save_folder}'
         os.makedirs(self.save_folder, exist_ok=True)
 
-        self.path_set = set(os.listdir(self.save_folder))
-        print(f"Exist file size of {self.site_save_folder} is {len(self.path_set)}")
+        # file: Save each page as one file, archive: Append pages to segment files of "PageArchive"
+        self.storage = storage
+        if self.storage == "archive":
+            self.archive = PageArchive(self.save_folder, compression=archive_compression)
+            print(f"Exist page size of {self.site_save_folder} is {len(self.archive)}")
+        else:
+            self.path_set = set([
+                f"{self.save_folder}/{path}" for path in os.listdir(self.save_folder)
+                if path.startswith(("page_meta.sqlite", "page_analysis.sqlite")) is False
+            ])
+            print(f"Exist file size of {self.site_save_folder} is {len(self.path_set)}")
+
+        # ETag / Last-Modified of saved pages. Re-get sends them, and 304 response reuses the saved page.
+        self.conditional_get = conditional_get
+        self.page_meta = PageMetaStore(f"{self.save_folder}/page_meta.sqlite")
+        self.stats = {
+            "full_download_count": 0,
+            "full_download_time": 0.0,
+            "not_modified_count": 0,
+            "not_modified_time": 0.0,
+            "saved_bytes": 0,
+        }
 
         self.curl_command = "curl"
+        if self.download_tool == "http":
+            self.http_client = http_client if http_client is not None else HttpClient()
+
+    # Split "curl -D -" output into the header of the last response and body
+    def parse_curl_output(self, url, output):
+        status = 200
+        headers = {}
+        while output.startswith(b"HTTP/"):
+            header_end = output.find(b"\r\n\r\n")
+            if header_end == -1:
+                break
+            line_list = output[:header_end].decode("iso-8859-1").split("\r\n")
+            output = output[header_end + 4:]
+
+            status = int(line_list[0].split()[1])
+            headers = {}
+            for line in line_list[1:]:
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            # Followed redirect, the next response header is written after this header
+            if status in [301, 302, 303, 307, 308] and "location" in headers and output.startswith(b"HTTP/"):
+                url = urljoin(url, headers["location"])
 
-    def curl_download(self, url, crawl_delay, try_count):
+        return status, url, headers, output
+
+    def curl_download(self, url, crawl_delay, try_count, skip_first_delay=False, headers=None):
 
         for now_count in range(try_count):
-            time.sleep(crawl_delay)
+            if now_count > 0 or skip_first_delay is False:
+                time.sleep(crawl_delay)
             try:
-                command = [self.curl_command, "-L", url]
+                start_time = time.time()
+                command = [self.curl_command, "-L", "-D", "-", url]
+                for key, value in (headers or {}).items():
+                    command += ["-H", f"{key}: {value}"]
                 res = subprocess.run(command, capture_output=True)
-                byte_text = res.stdout
-                if len(byte_text) < 10:
+                status, final_url, response_headers, byte_text = self.parse_curl_output(url, res.stdout)
+                if status != 304 and len(byte_text) < 10:
                     raise Exception()
+                response = HttpResponse(
+                    status, final_url, response_headers, byte_text, len(byte_text), time.time() - start_time
+                )
                 break
             except Exception:
                 if now_count == try_count-1:
                     raise Exception(f"Connection failed\nError:{traceback.format_exc()}")
                 continue
 
-        return byte_text
+        return response
 
-    # Download specified url and save to the "save_path"
-    def download(self, url, page_reget=False, not_save=False, crawl_delay=1, try_count=5):
+    # Download by in-process http client. Body is streamed to "save_path" while downloading.
+    def http_download(self, url, crawl_delay, try_count, save_path=None, skip_first_delay=False, headers=None):
+
+        for now_count in range(try_count):
+            if now_count > 0 or skip_first_delay is False:
+                time.sleep(crawl_delay)
+            try:
+                response = self.http_client.request(url, headers=headers, save_path=save_path)
+                if response.status != 304 and len(response.body) < 10:
+                    raise Exception()
+                break
+            except ResponseTooLarge:
+                raise Exception(f"Connection failed\nError:{traceback.format_exc()}")
+            except Exception:
+                if now_count == try_count-1:
+                    raise Exception(f"Connection failed\nError:{traceback.format_exc()}")
+                continue
+
+        return response
+
+    def probe_once(self, url, method, range_size):
+        range_headers = {"Range": f"bytes=0-{range_size - 1}"} if method == "GET" else {}
+        if self.download_tool == "http":
+            return self.http_client.request(
+                url, method=method, headers=range_headers, body_limit=range_size if method == "GET" else None
+            )
+
+        # Server ignoring Range header sends the whole body to curl
+        start_time = time.time()
+        command = [self.curl_command, "-s", "-L", "-I", url] if method == "HEAD" else \
+            [self.curl_command, "-s", "-L", "-D", "-", "-r", f"0-{range_size - 1}", url]
+        res = subprocess.run(command, capture_output=True)
+        status, final_url, response_headers, byte_text = self.parse_curl_output(url, res.stdout)
+        if len(response_headers) == 0:
+            raise Exception(f"No response header: {url}")
+        return HttpResponse(
+            status, final_url, response_headers, byte_text[0:range_size], len(byte_text), time.time() - start_time
+        )
+
+    # Download robots.txt and return its text. Empty file and 4xx response are returned as "" (all pages are allowed).
+    # 5xx response and network error are retried, and raise exception at the last try.
+    def download_robots(self, url, crawl_delay=1, try_count=3):
+        for now_count in range(try_count):
+            if now_count > 0:
+                time.sleep(crawl_delay)
+            try:
+                if self.download_tool == "http":
+                    response = self.http_client.request(url)
+                    status, byte_text = response.status, response.body
+                else:
+                    res = subprocess.run([self.curl_command, "-s", "-L", "-D", "-", url], capture_output=True)
+                    if res.returncode != 0:
+                        raise Exception(f"curl exit code {res.returncode}: {url}")
+                    status, _, _, byte_text = self.parse_curl_output(url, res.stdout)
+                if status >= 500:
+                    raise Exception(f"Server error {status}: {url}")
+            except Exception:
+                if now_count == try_count-1:
+                    raise Exception(f"Connection failed\nError:{traceback.format_exc()}")
+                continue
+
+            if status >= 400:
+                return ""
+            return byte_text.decode(errors="replace")
+
+    # Response header of the url without downloading the body.
+    # "head": HEAD request (ranged GET if HEAD is not allowed), "range": GET of the first "range_size" bytes
+    def probe(self, url, method="head", crawl_delay=1, skip_first_delay=False, range_size=1024):
+        if skip_first_delay is False:
+            time.sleep(crawl_delay)
+        if method == "head":
+            response = self.probe_once(url, "HEAD", range_size)
+            if response.status < 400:
+                return response
+        return self.probe_once(url, "GET", range_size)
+
+    def get_save_path(self, url):
+        if self.storage == "archive":
+            return self.archive.get_locator(url)
 
-        # Generate save path
         if len(url) > 220:
             url_replaced = url.replace("/", "_")
             save_path = f'{self.save_folder}/{url_replaced[0:200] + "---" + url_replaced[-20:]}'
         else:
             url_replaced = url.replace("/", "_")
             save_path = f'{self.save_folder}/{url_replaced}'
+        return save_path
+
+    # Return True if the page is loaded from saved file (no network access) by "download"
+    def is_saved(self, url):
+        if self.storage == "archive":
+            return self.archive.has(url)
+        return self.get_save_path(url) in self.path_set
+
+    def load_saved(self, url, save_path):
+        if self.storage == "archive":
+            return self.archive.get(url)
+        with open(save_path, "rb") as f:
+            return f.read()
+
+    # Request headers of conditional GET. Empty if the page is not saved or has no validator.
+    def get_conditional_headers(self, url):
+        if self.conditional_get is False or self.is_saved(url) is False:
+            return {}
+
+        meta = self.page_meta.get(url)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    # Url after redirects of the last download of the url (the url itself if not redirected or unknown)
+    def get_final_url(self, url):
+        return self.page_meta.get(url).get("final_url") or url
+
+    # Content-Type header of the last download of the url (None if unknown)
+    def get_content_type(self, url):
+        return self.page_meta.get(url).get("content_type")
+
+    # Download specified url and save to the "save_path"
+    # If "skip_first_delay" is True, "crawl_delay" is applied only before retry (caller keeps the interval)
+    def download(self, url, page_reget=False, not_save=False, crawl_delay=1, try_count=5, skip_first_delay=False):
+
+        # Generate save path
+        save_path = self.get_save_path(url)
 
         # If already downloaded, load it.
-        if page_reget is False and save_path in self.path_set:
-            with open(save_path, "rb") as f:
-                byte_text = f.read()
+        if page_reget is False and self.is_saved(url):
+            byte_text = self.load_saved(url, save_path)
         else:
+            request_headers = self.get_conditional_headers(url) if not_save is False else {}
+
             # Download
             if self.download_tool == "curl":
-                byte_text = self.curl_download(url, crawl_delay, try_count)
+                response = self.curl_download(
+                    url, crawl_delay, try_count, skip_first_delay=skip_first_delay, headers=request_headers
+                )
+            elif self.download_tool == "http":
+                # Saved page is kept until the response turns out not to be 304
+                response = self.http_download(
+                    url, crawl_delay, try_count,
+                    save_path=(
+                        save_path if not_save is False and self.storage == "file" and len(request_headers) == 0
+                        else None
+                    ),
+                    skip_first_delay=skip_first_delay, headers=request_headers,
+                )
             else:
                 raise Exception("Not implemented")
 
-            # Save
-            if not_save is False:
+            # Not modified, so reuse the saved page
+            if response.status == 304 and len(request_headers) > 0:
+                byte_text = self.load_saved(url, save_path)
+                self.stats["not_modified_count"] += 1
+                self.stats["not_modified_time"] += response.elapsed
+                self.stats["saved_bytes"] += len(byte_text)
+                return byte_text, save_path
+
+            byte_text = response.body
+            self.stats["full_download_count"] += 1
+            self.stats["full_download_time"] += response.elapsed
+
+            # Save (http client already saved the body to file while streaming)
+            if not_save is False and self.storage == "archive":
+                self.archive.put(url, byte_text)
+            elif not_save is False and (self.download_tool != "http" or len(request_headers) > 0):
                 with open(save_path, "wb")as f:
                     f.write(byte_text)
+            if not_save is False and self.storage == "file":
+                self.path_set.add(save_path)
+
+            if not_save is False:
+                meta = {"content_type": response.headers.get("content-type"), "final_url": response.url}
+                if self.conditional_get:
+                    meta["etag"] = response.headers.get("etag")
+                    meta["last_modified"] = response.headers.get("last-modified")
+                self.page_meta.update(url, **meta)
 
         return byte_text, save_path
+
+    # Report of conditional GET. Saved time is estimated by the mean time of full download.
+    def get_revalidation_report(self):
+        stats = self.stats
+        if stats["not_modified_count"] == 0:
+            return f"Revalidation of {self.site_save_folder}: no page was reused by 304 response"
+
+        mean_download_time = stats["full_download_time"] / max(stats["full_download_count"], 1)
+        saved_time = max(mean_download_time * stats["not_modified_count"] - stats["not_modified_time"], 0)
+        return (
+            f"Revalidation of {self.site_save_folder}: "
+            f"{stats['not_modified_count']} pages not modified, {stats['full_download_count']} pages downloaded, "
+            f"saved {stats['saved_bytes'] / 1024 / 1024:.1f} MB and {datetime.timedelta(seconds=saved_time)}"
+        )
@@ -1,13 +1,20 @@
-from bs4 import BeautifulSoup
 import datetime
-import datetime
-from collections import deque
-from urllib.parse import urlparse, urljoin
-import magic
+from urllib.parse import urlparse
 import time
 import traceback
 
 from .base_crawler import BaseCrawler
+from .crawl_frontier import MemoryFrontier, DiskFrontier
+from .url_seen_set import create_url_seen_set
+from .link_scorer import create_link_scorer
+from .url_canonicalizer import UrlCanonicalizer
+from ..near_duplicate import SimHashIndex, get_page_simhash, get_text_bit_count
+from .page_analyzer import analyze_page
+from .page_analysis_cache import PageAnalysisCache, get_content_hash
+from .link_extractor import normalize_link
+from .content_sniffer import ContentSniffer
+from .content_precheck import ContentPrecheck
+from .crawl_trap_detector import CrawlTrapDetector, get_url_template
 
 
 class GeneralCrawler(BaseCrawler):
@@ -15,7 +22,14 @@ class GeneralCrawler(BaseCrawler):
         self,
         site_name, site_root_url,
         disable_page_reget, max_depth,
-        crawl_link_setting, data_raw_folder, crawl_log_interval
+        crawl_link_setting, data_raw_folder, crawl_log_interval,
+        download_tool="curl", storage="file", archive_compression="zlib",
+        frontier="memory", frontier_folder=None, resume=False, checkpoint_interval=100,
+        url_seen="exact", url_seen_capacity=1000000, url_seen_fp_rate=0.001, url_seen_memory_mb=None,
+        shard_folder=None, robots_ttl=86400, frontier_priority="bfs", url_canonical_rule=None,
+        near_duplicate_distance=3, precheck="head", precheck_trust_count=3,
+        trap_window=50, trap_min_yield=0.5, trap_sample_interval=10, budget_allocator=None,
+        analysis_cache=True, offline=False,
     ):
         super().__init__()
 
@@ -34,138 +48,455 @@ class GeneralCrawler(BaseCrawler):
         self.data_raw_folder = data_raw_folder
 
         self.download_judge_dict = {}
-        self.this_time_download_set = set()
+
+        # memory: Keep crawl state in memory, disk: Save crawl state to "frontier_folder" and checkpoint it
+        self.frontier_type = frontier
+        self.frontier_folder = frontier_folder
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        # bfs: FIFO queue, others: queued url of the highest score (see "link_scorer") is crawled first
+        self.frontier_priority = frontier_priority
+
+        # Set of queued urls in memory frontier (exact / bloom / fingerprint)
+        self.url_seen = url_seen
+        self.url_seen_capacity = url_seen_capacity
+        self.url_seen_fp_rate = url_seen_fp_rate
+        self.url_seen_memory_mb = url_seen_memory_mb
+
+        # If specified, page records are written to "{shard_folder}/{site}.jsonl" while crawling,
+        # and "page_list_crawl" returns the shard info instead of page records.
+        self.shard_folder = shard_folder
+        # Queue to report the number of collected pages to the parent process
+        self.progress_queue = None
 
         self.disable_page_reget = disable_page_reget
         self.crawl_link_setting = crawl_link_setting
-        self.valid_encoding_cand_list = []
+        self.content_sniffer = ContentSniffer()
+
+        # Links are deduplicated by canonical url (see "url_canonicalizer") when they are queued
+        self.url_canonicalizer = UrlCanonicalizer(url_canonical_rule)
+        self.variant_link_set = set()
+        self.canonical_stats = {"merged_link_count": 0, "known_redirect_count": 0, "redirect_duplicate_count": 0}
+
+        # Links of the page whose SimHash of text and links is within "near_duplicate_distance" bits
+        # from the already expanded page are not queued (negative distance disables it)
+        self.near_duplicate_index = SimHashIndex(near_duplicate_distance) if near_duplicate_distance >= 0 else None
+        self.near_duplicate_stats = {"checked_page_count": 0, "near_duplicate_count": 0}
+
+        # Templates of urls whose yield (new links to the other templates and new text) collapses are throttled
+        # (trap_window 0 disables it)
+        self.trap_detector = \
+            CrawlTrapDetector(trap_window, trap_min_yield, trap_sample_interval) if trap_window > 0 else \
+            None
+
+        # If specified, pages are collected within the budget granted by "BudgetAllocator" (and "max_page_size")
+        self.budget_allocator = budget_allocator
+        self.granted_page_count = 0
+        self.grant_stats = {"fetch_count": 0, "new_url_count": 0}
 
         self.crawl_log_interval = crawl_log_interval
 
-        self.set_downloader(self.data_raw_folder, self.site_netloc)
-        self.set_robot_parser(self.site_domain)
+        self.download_tool = download_tool
+        self.storage = storage
+
+        self.set_downloader(
+            self.data_raw_folder, self.site_netloc, self.download_tool, self.storage, archive_compression
+        )
+        # offline: Replay the crawl only from saved pages (urls not saved are skipped, robots.txt is only read from cache)
+        self.offline = offline
+        self.set_robot_parser(self.site_domain, f"{self.data_raw_folder}/robots.sqlite", robots_ttl, offline=offline)
+
+        # File type, encoding and links of saved pages are reused by content hash
+        self.analysis_cache = \
+            PageAnalysisCache(f"{self.downloader.save_folder}/page_analysis.sqlite") if analysis_cache else \
+            None
+        self.analysis_stats = {"hit_count": 0, "miss_count": 0}
+
+        # head / range: Check Content-Type before downloading not saved urls (see "content_precheck"), none: Download all
+        self.content_precheck = \
+            ContentPrecheck(self.downloader, self.content_sniffer, precheck, precheck_trust_count) if precheck != "none" else \
+            None
+
+    # Return True if the url should be downloaded
+    def check_target_url(self, url):
+        if self.check_robots_txt(url) is False:
+            return False
+
+        url_split = urlparse(url).path.split(".")
+        if len(url_split) >= 2 and len(url_split[-1]) <= 5:
+            tmp_file_type = url_split[-1]
+        else:
+            tmp_file_type = ""
+
+        # Download only if domain is match with root (search in-domain page)
+        if url.startswith(self.check_target_root) is False:
+            return False
+
+        if tmp_file_type in ["jpg", "jpeg", "png", "xml", "xlsx", "x-empty", "mp3", "mp4", "zip"]:
+            return False
+
+        # Redirected to already queued url in the previous download (queued urls are canonical)
+        final_url = self.downloader.get_final_url(url)
+        if final_url != url:
+            canonical_final_url = self.url_canonicalizer.canonicalize(final_url)
+            seen_key = self.url_canonicalizer.get_seen_key(canonical_final_url)
+            if seen_key != self.url_canonicalizer.get_seen_key(url) and self.frontier.is_seen(seen_key):
+                self.canonical_stats["known_redirect_count"] += 1
+                return False
+
+        if self.trap_detector is not None and self.trap_detector.allow(url) is False:
+            return False
+
+        return True
+
+    # Max number of pages to collect. With budget allocator, the next grant is requested when the granted pages are collected.
+    def get_page_limit(self, collected_page_count, max_page_size):
+        if self.budget_allocator is None:
+            return max_page_size
+        if collected_page_count >= self.granted_page_count and collected_page_count < max_page_size:
+            self.granted_page_count += self.budget_allocator.request(
+                self.site_name, self.grant_stats["fetch_count"], self.grant_stats["new_url_count"]
+            )
+            self.grant_stats = {"fetch_count": 0, "new_url_count": 0}
+        return min(self.granted_page_count, max_page_size)
+
+    def get_near_duplicate_report(self):
+        stats = self.near_duplicate_stats
+        return (
+            f"Near-duplicate pages of {self.site_name}: {stats['near_duplicate_count']} of {stats['checked_page_count']} "
+            f"({stats['near_duplicate_count'] / max(stats['checked_page_count'], 1) * 100:.1f}%), their links are not expanded"
+        )
+
+    def get_canonical_report(self):
+        stats = self.canonical_stats
+        return (
+            f"Canonicalization of {self.site_name}: saved {stats['merged_link_count'] + stats['known_redirect_count']} fetches "
+            f"({stats['merged_link_count']} url variants, {stats['known_redirect_count']} known redirects), "
+            f"skipped {stats['redirect_duplicate_count']} pages redirected to already queued urls"
+        )
+
+    # Download page. Return None if it cannot be downloaded.
+    # If "target_file_type" is specified, url which is not saved yet and turns out to be non-target by pre-check is not downloaded.
+    # After a pre-check request, the download waits for the host by "wait_host" (crawl engine pacing the host),
+    # or "crawl_delay" if it is not specified.
+    def fetch_page(self, url, parent_url, skip_first_delay=False, target_file_type=None, wait_host=None):
+        # Body is loaded in "process_page" only if its analysis is not cached
+        if self.offline:
+            if self.downloader.is_saved(url) is False:
+                return None
+            return None, self.downloader.get_save_path(url)
+
+        if self.disable_page_reget:
+            page_reget = False
+        else:
+            page_reget = True
+
+        if target_file_type is not None and self.content_precheck is not None and self.downloader.is_saved(url) is False:
+            is_target, probed = self.content_precheck.check(url, target_file_type, self.crawl_delay, skip_first_delay)
+            if is_target is False:
+                return None
+            if probed and wait_host is not None:
+                wait_host()
+                skip_first_delay = True
+            elif probed:
+                skip_first_delay = False
+
+        try:
+            byte_text, save_path = self.downloader.download(
+                url, page_reget=page_reget, crawl_delay=self.crawl_delay, skip_first_delay=skip_first_delay
+            )
+        except Exception as e:
+            if str(e).startswith("Connection failed"):
+                print(f"Cannot access to {url} because of connection error")
+                return None
+            else:
+                print(f"Cannot access to {url}, parent: {parent_url}")
+                print(traceback.format_exc())
+                return None
+
+        return byte_text, save_path
+
+    # File type, encoding, links (if "expand") and bit count of text shingles of the downloaded page.
+    # The result is cached by content hash, so the saved page is not sniffed and parsed again.
+    # Links are normalized by "base_url", and raw href is also kept for the same content at another url.
+    # "byte_text" is None if the page is not loaded (offline), and it is loaded only if the result is not cached.
+    def analyze_content(self, url, byte_text, save_path, expand, base_url):
+        content_type = self.downloader.get_content_type(url)
+        need_text = expand and (self.near_duplicate_index is not None or self.trap_detector is not None)
+
+        content_hash = None
+        if self.analysis_cache is not None:
+            content_hash = \
+                get_content_hash(byte_text, content_type) if byte_text is not None else \
+                self.downloader.page_meta.get(url).get("content_hash")
+            analysis = self.analysis_cache.get(content_hash) if content_hash is not None else None
+            if analysis is not None and (analysis["file_type"] != "html" or (
+                (expand is False or analysis["href_list"] is not None) and
+                (need_text is False or analysis["text_bit_count"] is not None)
+            )):
+                self.analysis_stats["hit_count"] += 1
+                return analysis
+            self.analysis_stats["miss_count"] += 1
+
+        if byte_text is None:
+            byte_text = self.downloader.load_saved(url, save_path)
+            content_hash = get_content_hash(byte_text, content_type) if self.analysis_cache is not None else None
+
+        # Detect file format
+        file_type = self.content_sniffer.sniff_file_type(byte_text, content_type)
+        file_type = \
+            "html" if file_type == "javascript" else \
+            file_type
+
+        # Detect encoding
+        if file_type == "html":
+            encoding, text = self.content_sniffer.detect_encoding(byte_text, content_type)
+            if encoding is None:
+                print(f"Cannot detect valid text encoding: {url}")
+        else:
+            encoding = None
+            text = None
+
+        href_list = None
+        link_list = None
+        text_bit_count = None
+        if file_type == "html" and expand:
+            # Links are extracted even if the encoding is unknown
+            link_text = text if encoding is not None else byte_text.decode("utf-8", errors="replace")
+            page_analysis = analyze_page(link_text, base_url, collect_text=need_text)
+            href_list = page_analysis["href_list"]
+            link_list = page_analysis["link_list"]
+            if need_text:
+                bit_count, feature_count = get_text_bit_count(page_analysis["text"])
+                text_bit_count = [bit_count.tolist(), feature_count]
+
+        analysis = {
+            "file_type": file_type,
+            "encoding": encoding,
+            "href_list": href_list,
+            "base_url": base_url,
+            "link_list": link_list,
+            "text_bit_count": text_bit_count,
+            "size": len(byte_text),
+        }
+        if self.analysis_cache is not None:
+            self.analysis_cache.put(content_hash, analysis)
+            if self.downloader.page_meta.get(url).get("content_hash") != content_hash:
+                self.downloader.page_meta.update(url, content_hash=content_hash)
+        return analysis
+
+    def get_analysis_cache_report(self):
+        stats = self.analysis_stats
+        return (
+            f"Analysis cache of {self.site_name}: {stats['hit_count']} of {stats['hit_count'] + stats['miss_count']} pages "
+            f"reused without parsing"
+        )
+
+    # Return the page record (None if it is not html or target file type) and newly found child urls
+    def process_page(self, url, parent_url, depth, byte_text, save_path, target_file_type):
+        if self.trap_detector is not None:
+            self.trap_detector.record_fetch(url)
+
+        # Page redirected to another url is skipped if the url is already queued
+        final_url = self.downloader.get_final_url(url)
+        if final_url != url:
+            if self.url_canonicalizer.learn_redirect(url, final_url):
+                print(f"Use trailing slash rule \"{self.url_canonicalizer.rule['trailing_slash']}\" for {self.site_name}")
+            canonical_final_url = self.url_canonicalizer.canonicalize(final_url)
+            seen_key = self.url_canonicalizer.get_seen_key(canonical_final_url)
+            if seen_key != self.url_canonicalizer.get_seen_key(url) and self.frontier.add_seen(seen_key) is False:
+                self.canonical_stats["redirect_duplicate_count"] += 1
+                return None, [], None
+
+        expand = depth + 1 < self.max_depth
+        analysis = self.analyze_content(url, byte_text, save_path, expand, final_url)
+        file_type = analysis["file_type"]
+        encoding = analysis["encoding"]
+
+        if self.content_precheck is not None:
+            self.content_precheck.record(
+                url, self.content_precheck.is_target_file_type(file_type, target_file_type), analysis["size"]
+            )
+
+        child_url_list = []
+        canonical_child_url_list = []
+        near_duplicate_url = None
+        if file_type == "html" and expand:
+            if analysis["base_url"] == final_url:
+                child_url_list = analysis["link_list"]
+            else:
+                child_url_list = [normalize_link(href, final_url) for href in analysis["href_list"]]
+                child_url_list = [link for link in child_url_list if link is not None]
+            canonical_child_url_list = [self.url_canonicalizer.canonicalize(link) for link in child_url_list]
+
+            if self.near_duplicate_index is not None:
+                fingerprint = get_page_simhash(None, canonical_child_url_list, analysis["text_bit_count"])
+                near_duplicate_url = self.near_duplicate_index.find(fingerprint)
+                if near_duplicate_url is None:
+                    self.near_duplicate_index.add(url, fingerprint)
+                else:
+                    self.near_duplicate_stats["near_duplicate_count"] += 1
+                self.near_duplicate_stats["checked_page_count"] += 1
+
+        # Remove duplicate (links of near-duplicate page are not queued)
+        processed_child_url_list = []
+        for link, canonical_link in zip(child_url_list, canonical_child_url_list):
+            if near_duplicate_url is not None:
+                break
+            if self.frontier.add_seen(self.url_canonicalizer.get_seen_key(canonical_link)) is False:
+                # Count url variant (e.g. with tracking parameter) which would be downloaded without canonicalization
+                if canonical_link != link and link not in self.variant_link_set:
+                    self.variant_link_set.add(link)
+                    self.canonical_stats["merged_link_count"] += 1
+                continue
+            if canonical_link != link:
+                self.variant_link_set.add(link)
+            processed_child_url_list.append(canonical_link)
+
+        # Discovery rate of the budget allocator and yield of the trap detector count only new in-domain urls
+        # (not social, share, ads or syndication links, which are new on every trap page)
+        new_in_domain_url_list = [link for link in processed_child_url_list if link.startswith(self.check_target_root)]
+        self.grant_stats["fetch_count"] += 1
+        self.grant_stats["new_url_count"] += len(new_in_domain_url_list)
+
+        if self.trap_detector is not None and file_type == "html" and depth + 1 < self.max_depth:
+            if self.trap_detector.record_page(url, analysis["text_bit_count"], new_in_domain_url_list):
+                print(f"Throttle crawl trap {get_url_template(url)} of {self.site_name}")
+
+        # Downloaded page record
+        if file_type in target_file_type + ["html"]:
+            page = {
+                "url": url,
+                "final_url": final_url,
+                "parent_url": parent_url,
+                "child_url_list": canonical_child_url_list,
+                "save_path": save_path,
+                "site_name": self.site_name,
+                "file_type": file_type,
+                "encoding": encoding,
+                "page_depth": depth,
+                "near_duplicate_of": near_duplicate_url,
+            }
+        else:
+            page = None
+
+        return page, processed_child_url_list, file_type
+
+    # Open frontier and return the crawl state (resumed from the last checkpoint if "resume" is True)
+    def start_frontier(self):
+        site_save_folder = self.downloader.site_save_folder
+        shard_path = f"{self.shard_folder}/{site_save_folder}.jsonl" if self.shard_folder is not None else None
+        if self.frontier_type == "disk":
+            self.frontier = DiskFrontier(
+                f"{self.frontier_folder}/{site_save_folder}.sqlite",
+                shard_path if shard_path is not None else f"{self.frontier_folder}/{site_save_folder}.pages.jsonl",
+                resume=self.resume,
+                scorer=create_link_scorer(self.frontier_priority),
+            )
+        else:
+            self.frontier = MemoryFrontier(
+                create_url_seen_set(
+                    self.url_seen, self.url_seen_capacity, self.url_seen_fp_rate, self.url_seen_memory_mb
+                ),
+                records_path=shard_path,
+                scorer=create_link_scorer(self.frontier_priority),
+            )
+
+        if self.frontier.is_new():
+            root_url = self.url_canonicalizer.canonicalize(self.target_root_url)
+            self.frontier.push(root_url, "", 0)
+            self.frontier.add_seen(self.url_canonicalizer.get_seen_key(root_url))
+        else:
+            print(f"Resume crawling {self.site_name} from checkpoint, queue size is {len(self.frontier)}")
+
+        state = {"collected_page_count": 0}
+        state.update(self.frontier.load_state())
+        # Learned trailing slash rule is kept in the checkpoint (state dict is shared with canonicalizer)
+        self.url_canonicalizer.load_redirect_state(state.get("redirect_state", {}))
+        state["redirect_state"] = self.url_canonicalizer.redirect_state
+        return state
+
+    # Save the last checkpoint and return all page records (or shard info if records are written to shard)
+    def finish_frontier(self, state):
+        self.frontier.checkpoint(state)
+        if self.budget_allocator is not None:
+            self.budget_allocator.finish(self.site_name, state["collected_page_count"])
+        print(self.get_canonical_report())
+        if self.near_duplicate_index is not None:
+            print(self.get_near_duplicate_report())
+        if self.content_precheck is not None:
+            print(self.content_precheck.get_report(self.site_name))
+        if self.trap_detector is not None:
+            print(self.trap_detector.get_report(self.site_name))
+        if self.analysis_cache is not None:
+            print(self.get_analysis_cache_report())
+        if self.shard_folder is not None:
+            page_list = [{
+                "site_name": self.site_name,
+                "shard_path": self.frontier.records_path,
+                "page_count": self.frontier.record_count,
+            }]
+        else:
+            page_list = self.frontier.get_records()
+        self.frontier.close()
+        return page_list
+
+    def report_progress(self, count=1):
+        if self.progress_queue is not None:
+            self.progress_queue.put(count)
 
     def page_list_crawl(
         self, max_page_size=1, target_file_type=["html"]
     ):
-        link_queue = deque()
-        link_queue.append((self.target_root_url, "", 0))
-        page_list = []
         start_time = time.time()
-        self.this_time_download_set.add(self.target_root_url)
-
-        collected_page_count = 0
+        state = self.start_frontier()
+        collected_page_count = state["collected_page_count"]
 
         while True:
-            if len(link_queue) == 0:
+            if len(self.frontier) == 0:
                 elasped_time = datetime.timedelta(seconds=time.time() - start_time)
                 print(f"End crawling {collected_page_count} pages of {self.site_name} because crawed all pages, elasped time is {elasped_time}")
                 break
-            if collected_page_count >= max_page_size:
+            if collected_page_count >= self.get_page_limit(collected_page_count, max_page_size):
                 elasped_time = datetime.timedelta(seconds=time.time() - start_time)
                 print(f"End crawling {collected_page_count} pages of {self.site_name}, elasped time is {elasped_time}")
                 break
 
-            url, parent_url, depth = link_queue.popleft()
-
-            if self.check_robots_txt(url) is False:
-                continue
-
-            url_split = urlparse(url).path.split(".")
-            if len(url_split) >= 2 and len(url_split[-1]) <= 5:
-                tmp_file_type = url_split[-1]
-            else:
-                tmp_file_type = ""
+            url, parent_url, depth = self.frontier.pop()
 
-            # Download only if domain is match with root (search in-domain page)
-            if url.startswith(self.check_target_root) is False:
+            if self.check_target_url(url) is False:
                 continue
 
-            if tmp_file_type in ["jpg", "jpeg", "png", "xml", "xlsx", "x-empty", "mp3", "mp4", "zip"]:
+            fetch_result = self.fetch_page(url, parent_url, target_file_type=target_file_type)
+            if fetch_result is None:
                 continue
+            byte_text, save_path = fetch_result
 
-            if self.disable_page_reget:
-                page_reget = False
-            else:
-                page_reget = True
-
-            try:
-                byte_text, save_path = self.downloader.download(
-                    url, page_reget=page_reget, crawl_delay=self.crawl_delay
-                )
-            except Exception as e:
-                if str(e).startswith("Connection failed"):
-                    print(f"Cannot access to {url} because of connection error")
-                    continue
-                else:
-                    print(f"Cannot access to {url}, parent: {parent_url}")
-                    print(traceback.format_exc())
-                    continue
-
-            # Detect file format
-            file_type = magic.from_buffer(byte_text, mime=True).split("/")[-1]
-            file_type = \
-                "html" if file_type == "javascript" else \
-                file_type
-
-            # Detect encoding
-            if file_type == "html":
-                encoding, text = self.detect_encoding(byte_text, url, depth)
-            else:
-                encoding = None
-                text = None
-
-            child_url_list = []
-            if file_type == "html" and depth + 1 < self.max_depth:
-                soup = BeautifulSoup(text, "html.parser")
-                link_list = [element.get("href").strip() for element in soup.find_all("a", href=True)]
-                for link in link_list:
-                    try:
-                        parsed_link = urlparse(link)
-                    except Exception:
-                        print(f"Failed to parse link: {link}")
-                        continue
-
-                    if parsed_link.scheme not in ["", "http", "https"]:
-                        continue
-
-                    if parsed_link.netloc == "":
-                        link = urljoin(url, link)
-
-                    # Remove flagment
-                    link = urlparse(link)._replace(fragment="").geturl()
-
-                    child_url_list.append(link)
-
-            # Remove duplicate
-            processed_child_url_list = []
-            for link in child_url_list:
-                if link in self.this_time_download_set:
-                    continue
-                self.this_time_download_set.add(link)
-                processed_child_url_list.append(link)
+            page, processed_child_url_list, file_type = \
+                self.process_page(url, parent_url, depth, byte_text, save_path, target_file_type)
 
             # Append child url to queue
             for link in processed_child_url_list:
-                link_queue.append((link, url, depth+1))
+                self.frontier.push(link, url, depth+1)
 
             # Append downloaded page to list
-            if file_type in target_file_type + ["html"]:
-                page_list.append({
-                    "url": url,
-                    "parent_url": parent_url,
-                    "child_url_list": child_url_list,
-                    "save_path": save_path,
-                    "site_name": self.site_name,
-                    "file_type": file_type,
-                    "encoding": encoding,
-                    "page_depth": depth,
-                })
+            if page is not None:
+                self.frontier.add_record(page)
+                self.report_progress()
 
             if file_type in target_file_type:
                 collected_page_count += 1
                 if collected_page_count % self.crawl_log_interval == 0 and collected_page_count > 0:
                     elasped_time = datetime.timedelta(seconds=time.time() - start_time)
                     print(f"Crawled {collected_page_count} pages of {self.site_name}, current depth is {depth}, elasped time is {elasped_time}")
+                if collected_page_count % self.checkpoint_interval == 0:
+                    state["collected_page_count"] = collected_page_count
+                    self.frontier.checkpoint(state)
+
+        state["collected_page_count"] = collected_page_count
+        page_list = self.finish_frontier(state)
+
+        if self.disable_page_reget is False:
+            print(self.downloader.get_revalidation_report())
 
         return page_list
@@ -0,0 +1,20 @@
+import bisect
+import hashlib
+
+
+def get_ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# Consistent hashing of hosts to crawler nodes. Each node has "vnode_size" points on the ring, and a host is owned by
+# the node of the first point after the hash of the host, so adding or removing a node moves only its share of hosts.
+class HashRing():
+    def __init__(self, node_list, vnode_size=64):
+        self.point_list = sorted([
+            (get_ring_hash(f"{node}#{index}"), node) for node in node_list for index in range(vnode_size)
+        ])
+        self.hash_list = [point[0] for point in self.point_list]
+
+    def get_node(self, key):
+        index = bisect.bisect(self.hash_list, get_ring_hash(key)) % len(self.hash_list)
+        return self.point_list[index][1]
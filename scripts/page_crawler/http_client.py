@@ -0,0 +1,267 @@
+import os
+import time
+import socket
+import ssl
+import zlib
+import threading
+import http.client
+from urllib.parse import urlparse, urljoin
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class HttpResponse():
+    def __init__(self, status, url, headers, body, wire_size, elapsed):
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.wire_size = wire_size
+        self.elapsed = elapsed
+
+
+# Resolve host name once and reuse the address until "ttl" seconds passed
+class DnsCache():
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.time()
+        with self.lock:
+            item = self.cache.get(key)
+            if item is not None and item[1] > now:
+                return item[0]
+
+        address_list = [
+            address_info[4][0:2] for address_info in
+            socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        ]
+        with self.lock:
+            self.cache[key] = (address_list, now + self.ttl)
+        return address_list
+
+
+def create_connection(address_list, connect_timeout, read_timeout):
+    error = None
+    for address in address_list:
+        try:
+            sock = socket.create_connection(address, connect_timeout)
+            sock.settimeout(read_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock
+        except OSError as e:
+            error = e
+    raise error if error is not None else OSError("No address to connect")
+
+
+class PooledHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, host, port, dns_cache, connect_timeout, read_timeout):
+        super().__init__(host, port, timeout=connect_timeout)
+        self.dns_cache = dns_cache
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        address_list = self.dns_cache.resolve(self.host, self.port)
+        self.sock = create_connection(address_list, self.timeout, self.read_timeout)
+
+
+class PooledHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, port, dns_cache, connect_timeout, read_timeout, ssl_context):
+        super().__init__(host, port, timeout=connect_timeout, context=ssl_context)
+        self.dns_cache = dns_cache
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        address_list = self.dns_cache.resolve(self.host, self.port)
+        sock = create_connection(address_list, self.timeout, self.read_timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+# In-process HTTP client with per-host keep-alive connection pool.
+# Body is decompressed while streaming and written to "save_path" if it is specified.
+class HttpClient():
+    def __init__(
+        self, connect_timeout=10, read_timeout=30, total_timeout=120,
+        max_body_size=50 * 1024 * 1024, max_redirects=10, max_idle_per_host=4,
+        dns_cache_ttl=300, chunk_size=64 * 1024,
+        user_agent="Mozilla/5.0 (compatible; WebPageClassifierCrawler/1.0)",
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_body_size = max_body_size
+        self.max_redirects = max_redirects
+        self.max_idle_per_host = max_idle_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.chunk_size = chunk_size
+        self.user_agent = user_agent
+
+        self.init_pool()
+
+    def init_pool(self):
+        self.pool = {}
+        self.lock = threading.Lock()
+        self.dns_cache = DnsCache(self.dns_cache_ttl)
+        self.ssl_context = ssl.create_default_context()
+
+    # Connections, locks and ssl context cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["pool", "lock", "dns_cache", "ssl_context"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_pool()
+
+    def get_connection(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self.lock:
+            idle_list = self.pool.get(key)
+            if idle_list:
+                return idle_list.pop(), True
+
+        if scheme == "https":
+            conn = PooledHTTPSConnection(
+                host, port, self.dns_cache, self.connect_timeout, self.read_timeout, self.ssl_context
+            )
+        else:
+            conn = PooledHTTPConnection(host, port, self.dns_cache, self.connect_timeout, self.read_timeout)
+        return conn, False
+
+    def release_connection(self, scheme, host, port, conn):
+        key = (scheme, host, port)
+        with self.lock:
+            idle_list = self.pool.setdefault(key, [])
+            if len(idle_list) < self.max_idle_per_host:
+                idle_list.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            for idle_list in self.pool.values():
+                for conn in idle_list:
+                    conn.close()
+            self.pool = {}
+
+    # Stop reading at "body_limit" bytes if it is specified (the connection cannot be reused)
+    def read_body(self, res, deadline, save_path, body_limit=None):
+        content_encoding = res.getheader("Content-Encoding", "").strip().lower()
+        decompressor = \
+            zlib.decompressobj(16 + zlib.MAX_WBITS) if content_encoding in ["gzip", "x-gzip"] else \
+            zlib.decompressobj() if content_encoding == "deflate" else \
+            None
+
+        chunk_list = []
+        body_size = 0
+        wire_size = 0
+        f = open(save_path + ".part", "wb") if save_path is not None else None
+        try:
+            while True:
+                if time.time() > deadline:
+                    raise TimeoutError(f"Total timeout ({self.total_timeout}s) exceeded")
+                chunk = res.read(min(self.chunk_size, body_limit or self.chunk_size))
+                if not chunk:
+                    break
+                wire_size += len(chunk)
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk, self.max_body_size - body_size + 1)
+                body_size += len(chunk)
+                if body_size > self.max_body_size:
+                    raise ResponseTooLarge(f"Response body exceeds {self.max_body_size} bytes")
+                chunk_list.append(chunk)
+                if f is not None:
+                    f.write(chunk)
+                if body_limit is not None and body_size >= body_limit:
+                    break
+            if decompressor is not None and (body_limit is None or body_size < body_limit):
+                chunk = decompressor.flush()
+                chunk_list.append(chunk)
+                if f is not None:
+                    f.write(chunk)
+        except BaseException:
+            if f is not None:
+                f.close()
+                os.remove(save_path + ".part")
+            raise
+
+        if f is not None:
+            f.close()
+            os.replace(save_path + ".part", save_path)
+
+        return b"".join(chunk_list), wire_size
+
+    def request_once(self, url, method, headers, deadline, save_path, body_limit=None):
+        parsed_url = urlparse(url)
+        scheme = parsed_url.scheme
+        host = parsed_url.hostname
+        port = parsed_url.port or (443 if scheme == "https" else 80)
+        path = parsed_url.path or "/"
+        if parsed_url.query:
+            path += "?" + parsed_url.query
+
+        request_headers = {
+            "User-Agent": self.user_agent,
+            "Accept-Encoding": "gzip, deflate",
+            "Accept": "*/*",
+        }
+        request_headers.update(headers)
+
+        # Reused connection may be already closed by the server, so retry once with a new connection
+        for attempt in range(2):
+            conn, reused = self.get_connection(scheme, host, port)
+            try:
+                conn.request(method, path, headers=request_headers)
+                res = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+        try:
+            if method == "HEAD":
+                body, wire_size = b"", 0
+                res.read()
+            else:
+                body, wire_size = self.read_body(res, deadline, save_path, body_limit)
+        except BaseException:
+            conn.close()
+            raise
+
+        response_headers = {key.lower(): value for key, value in res.getheaders()}
+        if res.will_close or (body_limit is not None and len(body) >= body_limit):
+            conn.close()
+        else:
+            self.release_connection(scheme, host, port, conn)
+
+        return res.status, response_headers, body, wire_size
+
+    # Request the url and follow redirects like "curl -L"
+    def request(self, url, method="GET", headers=None, save_path=None, body_limit=None):
+        start_time = time.time()
+        deadline = start_time + self.total_timeout
+        headers = headers if headers is not None else {}
+
+        for _ in range(self.max_redirects + 1):
+            status, response_headers, body, wire_size = \
+                self.request_once(url, method, headers, deadline, save_path, body_limit)
+            if status in [301, 302, 303, 307, 308] and "location" in response_headers:
+                url = urljoin(url, response_headers["location"].strip())
+                continue
+            break
+        else:
+            raise Exception(f"Too many redirects: {url}")
+
+        return HttpResponse(status, url, response_headers, body, wire_size, time.time() - start_time)
@@ -1,23 +1,43 @@
-import re
 import datetime
 import time
 import itertools
+import threading
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from .base_crawler import BaseCrawler
 from .downloader import Downloader
+from .link_extractor import LinkExtractor
+from .sitemap_reader import iter_sitemap_locs, iter_sitemap_entries
 
 import warnings
 warnings.simplefilter("once")
 
 
+# Keep the interval of the requests to the same host ("rate" requests per second) among threads
+class HostRateLimiter():
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class IndexCrawler(BaseCrawler):
-    def __init__(self, args, site_name, root_url_list=None, homepage_url=None):
+    def __init__(self, args, site_name, root_url_list=None, homepage_url=None, profile=None):
         super().__init__()
 
         self.site_name = site_name
         self.root_url_list = root_url_list
+        # Profile of "config/index_profiles.json" (archive pages are crawled by "process_archive")
+        self.profile = profile
 
         self.page_reget = (args.disable_page_reget is False)
         self.page_size = args.page_size
@@ -32,19 +52,49 @@ class IndexCrawler(BaseCrawler):
 
         self.data_raw_folder = "./data/index_raw"
 
-        self.set_downloader(self.data_raw_folder, self.site_netloc)
-        self.set_robot_parser(self.site_domain)
+        self.download_tool = args.download_tool
+        self.storage = args.storage
+        self.archive_compression = args.archive_compression
+
+        # Number of child sitemaps downloaded concurrently
+        self.sitemap_concurrency = args.sitemap_concurrency
+        # If True, child sitemaps whose <lastmod> is not changed from the last run are skipped
+        self.sitemap_refresh = args.refresh
+        # Number of archive pages downloaded concurrently, and max requests per second to the host
+        # (None: the rate of robots.txt "crawl_delay", which is also the upper limit of "archive_rate_limit")
+        # All downloads of the site (sitemaps and archive pages) share "rate_limiter" of the host
+        self.archive_concurrency = args.archive_concurrency
+        self.archive_rate_limit = args.archive_rate_limit
+        # If specified, page records are written to "page_writer" as soon as they are found
+        self.page_writer = None
+
+        self.set_downloader(
+            self.data_raw_folder, self.site_netloc, self.download_tool, self.storage, self.archive_compression
+        )
+        self.set_robot_parser(self.site_domain, f"{self.data_raw_folder}/robots.sqlite", args.robots_ttl)
+
+    def emit_page(self, page_list, url):
+        page = {
+            "url": url,
+            "site_name": self.site_name,
+        }
+        if self.page_writer is not None:
+            self.page_writer.write(page)
+        else:
+            page_list.append(page)
 
     def crawl_wrapper(self):
+        self.rate_limiter = HostRateLimiter(self.get_host_rate())
 
-        if self.site_name == "TechCrunch":
-            return self.process_techcrunch()
-        elif self.site_name == "Mongabay":
-            return self.process_mongabay()
-        elif self.site_name == "Space.com":
-            return self.process_space_com()
+        if self.profile is not None and self.profile["type"] == "archive":
+            page_list = self.process_archive()
         else:
-            return self.process_standard_sitemap()
+            page_list = self.process_standard_sitemap()
+
+        if self.page_reget:
+            print(self.downloader.get_revalidation_report())
+
+        return page_list
 
     # Crawl index page by using XML sitemap
     def process_standard_sitemap(self):
@@ -60,176 +110,138 @@ class IndexCrawler(BaseCrawler):
         parsed_url = urlparse(root_url_list[0])
         top_page_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
 
-        link_list = []
-        for root_url in root_url_list:
-            byte_text, save_path = self.downloader.download(root_url, page_reget=self.page_reget)
-            text = byte_text.decode()
-            link_list += re.findall(rf"<loc>({top_page_url}/.*?)</loc>", text)
-        link_list = link_list[0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, save_path = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-            content_link_list = re.findall(rf"<loc>({top_page_url}/.*?)</loc>", text)
-            for content_link in content_link_list:
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-
-        return page_list
-
-    def process_techcrunch(self):
-
-        start_time = time.time()
-
-        page_list = []
-        site_name = self.site_name
-        print(f"Start process {site_name}")
-
-        link_list = [f"https://techcrunch.com/latest/page/{i}/" for i in range(1, 13380+1)][0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, save_path = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-
-            soup = BeautifulSoup(text, "html.parser")
-            content_link_list = [element.get("href") for element in soup.find_all("a", attrs={"class": "loop-card__title-link"}, href=True)]
-            for content_link in content_link_list:
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-
-        return page_list
-
-    def process_mongabay(self):
-
-        start_time = time.time()
-
-        page_list = []
-        site_name = self.site_name
-        print(f"Start process {site_name}")
-
-        link_list = [f"https://news.mongabay.com/list/2024/page/{i}/" for i in range(1, 790+1)][0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, _ = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-
-            soup = BeautifulSoup(text, "html.parser")
-            soup = soup.find("div", attrs={"id": "post-results"})
-            content_link_list = [element.get("href") for element in soup.find_all("a", href=True)]
-            for content_link in content_link_list:
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
+        # Refresh always downloads sitemap index and new or changed child sitemaps
+        page_reget = self.page_reget or self.sitemap_refresh
 
-        return page_list
-
-    def process_space_com(self):
-
-        start_time = time.time()
-
-        page_list = []
-        site_name = self.site_name
-        print(f"Start process {site_name}")
-
-        link_list = [
-            f"https://www.space.com/archive/{year:04}/{month:02}"
-            for year, month in list(itertools.product(range(1999, 2024+1), range(1, 12+1)))
-        ][0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, save_path = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-            soup = BeautifulSoup(text, "html.parser")
-            content_link_list = [element.find("a", href=True).get("href") for element in soup.find_all("li", attrs={"class": "day-article"})]
-            for content_link in content_link_list:
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
+        entry_list = []
+        for root_url in root_url_list:
+            byte_text, save_path = self.download_page(root_url, page_reget)
+            entry_list += [
+                (link, lastmod) for link, lastmod in iter_sitemap_entries(byte_text)
+                if link.startswith(f"{top_page_url}/")
+            ]
+        entry_list = entry_list[0:self.page_size]
+
+        # <lastmod> of each child sitemap is saved in page meta when it is processed
+        link_list = []
+        lastmod_dict = {}
+        skip_count = 0
+        for link, lastmod in entry_list:
+            if self.sitemap_refresh and lastmod is not None and \
+                    self.downloader.page_meta.get(link).get("sitemap_lastmod") == lastmod:
+                skip_count += 1
+                continue
+            link_list.append(link)
+            lastmod_dict[link] = lastmod
+        if self.sitemap_refresh:
+            print(f"Skipped {skip_count} of {len(entry_list)} child sitemaps of {self.site_name} (lastmod is not changed)")
+
+        # Child sitemaps are downloaded concurrently ("sitemap_concurrency" in flight at most) within the rate limit
+        # of the host, and urls are emitted while the other sitemaps are downloading
+        link_iter = iter(link_list)
+        with ThreadPoolExecutor(max_workers=self.sitemap_concurrency) as executor:
+            future_dict = {}
+            link_num = 0
+            while True:
+                for link in itertools.islice(link_iter, self.sitemap_concurrency - len(future_dict)):
+                    future_dict[executor.submit(self.download_page, link, page_reget)] = link
+                if len(future_dict) == 0:
+                    break
+
+                done_set, _ = wait(list(future_dict.keys()), return_when=FIRST_COMPLETED)
+                for future in done_set:
+                    byte_text, save_path = future.result()
+                    for content_link in iter_sitemap_locs(byte_text):
+                        if content_link.startswith(f"{top_page_url}/"):
+                            self.emit_page(page_list, content_link)
+
+                    link = future_dict.pop(future)
+                    if lastmod_dict[link] is not None:
+                        self.downloader.page_meta.update(link, sitemap_lastmod=lastmod_dict[link])
+
+                    link_num += 1
+                    elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+                    if link_num % 100 == 0:
+                        print(f"Crawled {link_num} pages of {self.site_name}, elasped time is {elasped_time}")
+                    if link_num == len(link_list):
+                        print(f"End crawling {link_num} pages of {self.site_name}, elasped time is {elasped_time}")
 
         return page_list
 
-    def process_webmd(self):
+    # Urls of archive pages in the order of "page_range" (e.g. {"year": [1999, 2024], "month": [1, 12]})
+    def get_archive_url_list(self):
+        key_list = list(self.profile["page_range"].keys())
+        value_list = [range(start, end+1) for start, end in self.profile["page_range"].values()]
+        return [
+            self.profile["url_template"].format(**dict(zip(key_list, values)))
+            for values in itertools.product(*value_list)
+        ]
+
+    # Requests per second to the host allowed by robots.txt "crawl_delay" and "archive_rate_limit"
+    def get_host_rate(self):
+        rate = 1 / self.crawl_delay if self.crawl_delay > 0 else float("inf")
+        if self.archive_rate_limit is not None:
+            rate = min(self.archive_rate_limit, rate)
+        return rate
+
+    def download_page(self, link, page_reget):
+        # Page loaded from saved file does not access to the host
+        if page_reget or self.downloader.is_saved(link) is False:
+            self.rate_limiter.wait()
+        return self.downloader.download(link, page_reget=page_reget, crawl_delay=self.crawl_delay, skip_first_delay=True)
+
+    # Crawl paginated archive pages defined by the profile ("url_template", "page_range", "selector").
+    # Pages are downloaded concurrently within the rate limit of the host.
+    # If a page has no new link, later pages are not downloaded (unless "stop_on_no_new_link" is false).
+    def process_archive(self):
 
         start_time = time.time()
 
-        page_list = []
-        site_name = self.site_name
-        print(f"Start process {site_name}")
-
-        link_list = [f"https://www.webmd.com/news/articles?pg={i}" for i in range(1, 70+1)][0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, save_path = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-
-            soup = BeautifulSoup(text, "html.parser")
-            soup = soup.find(attrs={"class": "news-toc-section dyn_index_articles"})
-            content_link_list = [element.get("href") for element in soup.find_all("a", href=True)]
-            for content_link in content_link_list:
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-
-        return page_list
-
-    def process_scientific_american(self):
-
-        start_time = time.time()
+        print(f"Start process {self.site_name}")
 
         page_list = []
-        site_name = self.site_name
-        print(f"Start process {site_name}")
-
-        link_list = [f"https://www.scientificamerican.com/latest/?page={i}" for i in range(1, 50+1)][0:self.page_size]
-        for link_num, link in enumerate(link_list):
-            byte_text, save_path = self.downloader.download(link, page_reget=self.page_reget)
-            text = byte_text.decode()
-
-            soup = BeautifulSoup(text, "html.parser")
-            content_link_list = [element.get("href") for element in soup.find_all("a", attrs={"class": "articleLink-2OMNo"}, href=True)]
-            for content_link in content_link_list:
-                content_link = urljoin("https://www.scientificamerican.com/", content_link)
-                page_list.append({
-                    "url": content_link,
-                    "site_name": site_name,
-                })
-
-            elasped_time = datetime.timedelta(seconds=time.time() - start_time)
-            if (link_num + 1) % 100 == 0:
-                print(f"Crawled {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
-            if link_num + 1 == len(link_list):
-                print(f"End crawling {link_num + 1} pages of {self.site_name}, elasped time is {elasped_time}")
+        seen_link_set = set()
+        stop_on_no_new_link = self.profile.get("stop_on_no_new_link", True)
+
+        link_list = self.get_archive_url_list()[0:self.page_size]
+        stop_index = len(link_list)
+        with ThreadPoolExecutor(max_workers=self.archive_concurrency) as executor:
+            future_dict = {}
+            next_index = 0
+            link_num = 0
+            while True:
+                while next_index < stop_index and len(future_dict) < self.archive_concurrency:
+                    future = executor.submit(self.download_page, link_list[next_index], self.page_reget)
+                    future_dict[future] = (next_index, link_list[next_index])
+                    next_index += 1
+                if len(future_dict) == 0:
+                    break
+
+                done_set, _ = wait(list(future_dict.keys()), return_when=FIRST_COMPLETED)
+                for future in done_set:
+                    link_index, link = future_dict.pop(future)
+                    byte_text, save_path = future.result()
+                    text = byte_text.decode(errors="replace")
+
+                    new_link_count = 0
+                    for content_link in LinkExtractor(**self.profile["selector"]).extract(text):
+                        content_link = urljoin(self.profile.get("base_url", link), content_link)
+                        if content_link in seen_link_set:
+                            continue
+                        seen_link_set.add(content_link)
+                        new_link_count += 1
+                        self.emit_page(page_list, content_link)
+
+                    if new_link_count == 0 and stop_on_no_new_link and link_index + 1 < stop_index:
+                        print(f"Stop crawling {self.site_name} at {link} because it has no new link")
+                        stop_index = link_index + 1
+
+                    link_num += 1
+                    elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+                    if link_num % 100 == 0:
+                        print(f"Crawled {link_num} pages of {self.site_name}, elasped time is {elasped_time}")
+
+        elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+        print(f"End crawling {link_num} pages of {self.site_name}, elasped time is {elasped_time}")
 
         return page_list
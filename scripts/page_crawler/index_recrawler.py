@@ -0,0 +1,116 @@
+import datetime
+import time
+
+from .general_crawler import GeneralCrawler
+from .crawl_frontier import MemoryFrontier
+from .link_set_store import LinkSetStore, get_link_set_fingerprint
+
+
+# Revisit only the predicted index pages of one site, and download only the urls newly linked from them.
+# "index_page_list" is the page records of the index pages (url, child_url_list) in the order of priority.
+# "known_url_list" is the urls already collected (pages and their links in the prediction file),
+# and it is saved to the link set store on the first recrawl of the site.
+# New in-domain urls are pending until they are downloaded, or rejected by robots.txt or pre-check.
+# Urls over "max_page_size" are downloaded in the next recrawl, and failed urls are retried up to "max_retry" runs.
+class IndexRecrawler(GeneralCrawler):
+    def __init__(
+        self, site_name, site_root_url, index_page_list, known_url_list, link_store_path,
+        data_raw_folder, crawl_log_interval, max_retry=3, **kwargs
+    ):
+        # Links of new pages are recorded (depth 1), but not followed
+        super().__init__(
+            site_name, site_root_url, False, 3, "strict", data_raw_folder, crawl_log_interval, **kwargs
+        )
+        self.index_page_list = index_page_list
+        self.known_url_list = known_url_list
+        self.link_store = LinkSetStore(link_store_path)
+        self.max_retry = max_retry
+        self.stats = {
+            "index_page_count": 0, "unchanged_count": 0, "new_url_count": 0, "pending_url_count": 0, "new_page_count": 0,
+            "rejected_count": 0, "failed_count": 0,
+        }
+
+    # Return page records of recrawled index pages and newly found pages
+    def page_list_crawl(self, max_page_size=1, target_file_type=["html"]):
+        start_time = time.time()
+        self.frontier = MemoryFrontier()
+
+        # Links of page records are canonical urls
+        if self.link_store.has_site(self.site_name) is False:
+            self.link_store.add_known_links(
+                self.site_name, [self.url_canonicalizer.canonicalize(link) for link in self.known_url_list]
+            )
+
+        # Refetch index pages and diff their links with the last recrawl (or the prediction file)
+        for index_page in self.index_page_list:
+            url = index_page["url"]
+            if self.check_target_url(url) is False:
+                continue
+            fetch_result = self.fetch_page(url, "")
+            if fetch_result is None:
+                continue
+            byte_text, save_path = fetch_result
+            page, _, _ = self.process_page(url, "", 0, byte_text, save_path, target_file_type)
+            if page is None:
+                continue
+            self.frontier.add_record(page)
+            self.stats["index_page_count"] += 1
+
+            link_list = page["child_url_list"]
+            last_fingerprint = self.link_store.get_fingerprint(url)
+            if last_fingerprint is None:
+                last_fingerprint = get_link_set_fingerprint(
+                    [self.url_canonicalizer.canonicalize(link) for link in index_page["child_url_list"]]
+                )
+            if get_link_set_fingerprint(link_list) == last_fingerprint:
+                self.stats["unchanged_count"] += 1
+            else:
+                # Links to other sites are never downloaded
+                new_link_list = self.link_store.filter_new_links(
+                    self.site_name, [link for link in link_list if link.startswith(self.check_target_root)]
+                )
+                self.link_store.add_pending_links(self.site_name, new_link_list, url)
+                self.stats["new_url_count"] += len(new_link_list)
+            self.link_store.update_index_page(url, link_list)
+
+        # Download only new urls (including pending urls of the last recrawl)
+        pending_list = self.link_store.get_pending_links(self.site_name)
+        self.stats["pending_url_count"] = len(pending_list)
+        for link, parent_url in pending_list[0:max_page_size]:
+            # Pre-check is done here (not in "fetch_page") to tell a rejected url from a failed download
+            is_target = self.check_target_url(link)
+            if is_target and self.content_precheck is not None and self.offline is False and \
+                    self.downloader.is_saved(link) is False:
+                is_target, _ = self.content_precheck.check(link, target_file_type, self.crawl_delay)
+            if is_target is False:
+                self.link_store.resolve_links(self.site_name, [link])
+                self.stats["rejected_count"] += 1
+                continue
+
+            fetch_result = self.fetch_page(link, parent_url)
+            if fetch_result is None:
+                self.link_store.record_failed_links(self.site_name, [link], self.max_retry)
+                self.stats["failed_count"] += 1
+                continue
+            byte_text, save_path = fetch_result
+            page, _, _ = self.process_page(link, parent_url, 1, byte_text, save_path, target_file_type)
+            self.link_store.resolve_links(self.site_name, [link])
+            if page is not None:
+                self.frontier.add_record(page)
+                self.stats["new_page_count"] += 1
+
+        elasped_time = datetime.timedelta(seconds=time.time() - start_time)
+        print(
+            f"End recrawling {self.site_name}: {self.stats['index_page_count']} index pages "
+            f"({self.stats['unchanged_count']} unchanged), {self.stats['new_url_count']} new urls, "
+            f"{self.stats['pending_url_count']} pending urls ({self.stats['rejected_count']} rejected, "
+            f"{self.stats['failed_count']} failed), {self.stats['new_page_count']} new pages, elasped time is {elasped_time}"
+        )
+        print(self.downloader.get_revalidation_report())
+        if self.content_precheck is not None:
+            print(self.content_precheck.get_report(self.site_name))
+
+        page_list = self.frontier.get_records()
+        self.frontier.close()
+        self.link_store.close()
+        return page_list
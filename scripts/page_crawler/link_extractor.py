@@ -0,0 +1,114 @@
+from html.parser import HTMLParser
+from urllib.parse import urlparse, urljoin
+
+
+# Return True if the tag attributes match "expected_attrs" (like attrs of BeautifulSoup.find_all)
+def match_attrs(attr_dict, expected_attrs):
+    for key, expected_value in expected_attrs.items():
+        value = attr_dict.get(key)
+        if value is None:
+            return False
+        if key == "class":
+            if expected_value != value and expected_value not in value.split():
+                return False
+        elif value != expected_value:
+            return False
+    return True
+
+
+# Collect href of <a> tags by streaming tokenizer, without building a tree.
+# "link_attrs": Collect only <a> matched with the attrs.
+# "container_tag" / "container_attrs": Collect only <a> inside the matched element.
+# "first_container_only": Use only the first matched container (like BeautifulSoup.find).
+# "first_link_per_container": Collect only the first <a> of each container.
+class LinkExtractor(HTMLParser):
+    def __init__(
+        self, link_attrs=None, container_tag=None, container_attrs=None,
+        first_container_only=False, first_link_per_container=False,
+    ):
+        super().__init__()
+        self.link_attrs = link_attrs
+        self.container_tag = container_tag
+        self.container_attrs = container_attrs
+        self.use_container = container_tag is not None or container_attrs is not None
+        self.first_container_only = first_container_only
+        self.first_link_per_container = first_link_per_container
+
+        self.href_list = []
+        self.container_name = None
+        self.container_depth = 0
+        self.container_done = False
+        self.container_link_found = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.use_container:
+            if self.container_depth > 0:
+                if tag == self.container_name:
+                    self.container_depth += 1
+            elif self.container_done is False and \
+                    (self.container_tag is None or tag == self.container_tag) and \
+                    match_attrs(dict(attrs), self.container_attrs or {}):
+                self.container_name = tag
+                self.container_depth = 1
+                self.container_link_found = False
+
+        if tag != "a":
+            return
+        if self.use_container and self.container_depth == 0:
+            return
+        if self.first_link_per_container and self.container_link_found:
+            return
+
+        # Duplicated attribute is overwritten by the last one (same as BeautifulSoup)
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = value if value is not None else ""
+        if "href" not in attr_dict:
+            return
+        if self.link_attrs is not None and match_attrs(attr_dict, self.link_attrs) is False:
+            return
+
+        self.href_list.append(attr_dict["href"])
+        self.container_link_found = True
+
+    def handle_endtag(self, tag):
+        if self.container_depth > 0 and tag == self.container_name:
+            self.container_depth -= 1
+            if self.container_depth == 0 and self.first_container_only:
+                self.container_done = True
+
+    def extract(self, text):
+        self.feed(text)
+        self.close()
+        return self.href_list
+
+
+# Convert href to absolute url without fragment. Return None if it is not http(s) link.
+def normalize_link(link, base_url):
+    link = link.strip()
+    try:
+        parsed_link = urlparse(link)
+    except Exception:
+        print(f"Failed to parse link: {link}")
+        return None
+
+    if parsed_link.scheme not in ["", "http", "https"]:
+        return None
+
+    if parsed_link.netloc == "":
+        link = urljoin(base_url, link)
+
+    # Remove flagment
+    link = urlparse(link)._replace(fragment="").geturl()
+
+    return link
+
+
+# Return normalized urls of all <a href> in the html text
+def extract_links(text, base_url):
+    child_url_list = []
+    for link in LinkExtractor().extract(text):
+        link = normalize_link(link, base_url)
+        if link is not None:
+            child_url_list.append(link)
+    return child_url_list
@@ -0,0 +1,92 @@
+import re
+from urllib.parse import urlparse
+
+
+# Path segments which usually appear in the url of index pages (section, archive, pagination etc.)
+INDEX_SEGMENT_LIST = [
+    "section", "sections", "category", "categories", "tag", "tags", "topic", "topics", "archive", "archives",
+    "latest", "news", "author", "authors", "list", "page", "index", "hub", "series",
+]
+DATE_PATH_PATTERN = re.compile(r"/(19|20)\d\d/\d{1,2}(/\d{1,2})?/")
+PAGE_NUMBER_PATTERN = re.compile(r"(?:/page/(\d+)/?$)|(?:[?&](?:page|pg|p)=(\d+))", re.I)
+SLUG_SPLIT_PATTERN = re.compile(r"[-_+]+")
+
+
+def get_path_segment_list(url):
+    return [segment for segment in urlparse(url).path.split("/") if segment != ""]
+
+
+# Words of the last path segment (e.g. "/2024/05/russia-detains-man.html" -> "russia detains man")
+def get_slug_title(url):
+    segment_list = get_path_segment_list(url)
+    if len(segment_list) == 0:
+        return ""
+    slug = segment_list[-1].rsplit(".", 1)[0]
+    return " ".join([word for word in SLUG_SPLIT_PATTERN.split(slug) if word != ""])
+
+
+# Page number of paginated list (1 if the url is not paginated)
+def get_page_number(url):
+    result = PAGE_NUMBER_PATTERN.search(url)
+    if result is None:
+        return 1
+    return int(result.group(1) or result.group(2))
+
+
+def is_index_like_url(url):
+    segment_list = get_path_segment_list(url)
+    if len(segment_list) == 0 or get_page_number(url) > 1:
+        return True
+    if DATE_PATH_PATTERN.search(urlparse(url).path + "/") is not None or len(get_slug_title(url).split()) >= 5:
+        return False
+    return len([segment for segment in segment_list if segment.lower() in INDEX_SEGMENT_LIST]) > 0
+
+
+# Scorers return the priority of a queued url (larger is crawled first).
+# Url depth: shallow url path first (e.g. "/world/" before "/world/2024/05/article")
+class UrlDepthScorer():
+    def score(self, url, parent_url, depth):
+        return -len(get_path_segment_list(url))
+
+
+# Path pattern: index-like path (section, tag, pagination) and pages linked from it first.
+# Later pages of paginated lists (older pages) and pages linked from article-like pages are crawled last.
+class PathPatternScorer():
+    def score(self, url, parent_url, depth):
+        if is_index_like_url(url):
+            return 2 - 0.25 * len(get_path_segment_list(url)) - 0.5 * (get_page_number(url) - 1)
+        if parent_url != "" and is_index_like_url(parent_url):
+            return 1.5 - 0.5 * (get_page_number(parent_url) - 1)
+        return -1
+
+
+# Page classifier method (e.g. "classify_rule") applied to the url slug as the title of the not downloaded page.
+# Pages linked from the predicted index page and shallow urls are preferred among the same index probability.
+class ClassifierScorer():
+    def __init__(self, classify_func):
+        self.classify_func = classify_func
+
+    def get_index_probability(self, url):
+        return self.classify_func({"url": url, "title": get_slug_title(url)})["index_probability"]
+
+    def score(self, url, parent_url, depth):
+        parent_index_probability = self.get_index_probability(parent_url) if parent_url != "" else 1.0
+        return \
+            self.get_index_probability(url) + 0.5 * parent_index_probability \
+            - 0.1 * (get_page_number(url) - 1) - 0.01 * len(get_path_segment_list(url))
+
+
+# Return scorer of the priority frontier, or None for FIFO (BFS) frontier
+def create_link_scorer(frontier_priority="bfs"):
+    if frontier_priority == "bfs":
+        return None
+    elif frontier_priority == "url_depth":
+        return UrlDepthScorer()
+    elif frontier_priority == "path_pattern":
+        return PathPatternScorer()
+    elif frontier_priority == "classifier_rule":
+        # Imported only for this scorer (page classifier module loads the LLM client and tokenizer)
+        from ..page_classifier import PageClassifier
+        return ClassifierScorer(PageClassifier.classify_rule)
+    else:
+        raise Exception(f"Not implemented frontier priority: {frontier_priority}")
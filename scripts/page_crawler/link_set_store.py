@@ -0,0 +1,156 @@
+import time
+import hashlib
+import sqlite3
+import threading
+
+from .url_seen_set import url_fingerprint
+
+
+# Fingerprint of the set of outgoing links (same for the same links in any order)
+def get_link_set_fingerprint(link_list):
+    text = "\n".join(sorted(set(link_list)))
+    return hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).hexdigest()
+
+
+# 64-bit url fingerprint as signed integer of SQLite
+def get_link_hash(url):
+    link_hash = url_fingerprint(url)
+    return link_hash - (1 << 64) if link_hash >= (1 << 63) else link_hash
+
+
+# Link set fingerprint of each index page and fingerprints of all known urls of each site, saved in SQLite.
+# Recrawl compares them with the current links of index pages to find new urls.
+# New urls are pending until they are resolved: downloaded, rejected (robots.txt, pre-check), or failed "max_retry" times.
+class LinkSetStore():
+    def __init__(self, db_path, batch_size=500):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.init_state()
+
+    def init_state(self):
+        self.conn = None
+        self.lock = threading.Lock()
+
+    # Connection and lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["conn", "lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_state()
+
+    def get_conn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_page (url TEXT PRIMARY KEY, fingerprint TEXT, link_count INTEGER, fetched_at REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS known_link (site_name TEXT, link_hash INTEGER, PRIMARY KEY (site_name, link_hash)) WITHOUT ROWID"
+            )
+            # Rowid keeps the order in which pending urls are found
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_link "
+                "(site_name TEXT, link_hash INTEGER, url TEXT, parent_url TEXT, fail_count INTEGER, PRIMARY KEY (site_name, link_hash))"
+            )
+            self.conn.commit()
+        return self.conn
+
+    # Return the link set fingerprint of the last recrawl, or None if the page is not recrawled yet
+    def get_fingerprint(self, url):
+        with self.lock:
+            row = self.get_conn().execute("SELECT fingerprint FROM index_page WHERE url = ?", (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def update_index_page(self, url, link_list):
+        with self.lock:
+            conn = self.get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO index_page VALUES (?, ?, ?, ?)",
+                (url, get_link_set_fingerprint(link_list), len(link_list), time.time())
+            )
+            conn.commit()
+
+    def has_site(self, site_name):
+        with self.lock:
+            row = self.get_conn().execute("SELECT 1 FROM known_link WHERE site_name = ? LIMIT 1", (site_name,)).fetchone()
+        return row is not None
+
+    def add_known_links(self, site_name, url_list):
+        with self.lock:
+            conn = self.get_conn()
+            conn.executemany(
+                "INSERT OR IGNORE INTO known_link VALUES (?, ?)", [(site_name, get_link_hash(url)) for url in url_list]
+            )
+            conn.commit()
+
+    def add_pending_links(self, site_name, url_list, parent_url):
+        with self.lock:
+            conn = self.get_conn()
+            conn.executemany(
+                "INSERT OR IGNORE INTO pending_link VALUES (?, ?, ?, ?, 0)",
+                [(site_name, get_link_hash(url), url, parent_url) for url in url_list]
+            )
+            conn.commit()
+
+    # Return (url, parent url) of pending urls of the site (failed urls last, then in the order they are found)
+    def get_pending_links(self, site_name):
+        with self.lock:
+            return self.get_conn().execute(
+                "SELECT url, parent_url FROM pending_link WHERE site_name = ? ORDER BY fail_count, rowid", (site_name,)
+            ).fetchall()
+
+    # Resolved urls are moved from pending to known
+    def resolve_links(self, site_name, url_list):
+        hash_list = [(site_name, get_link_hash(url)) for url in url_list]
+        with self.lock:
+            conn = self.get_conn()
+            conn.executemany("INSERT OR IGNORE INTO known_link VALUES (?, ?)", hash_list)
+            conn.executemany("DELETE FROM pending_link WHERE site_name = ? AND link_hash = ?", hash_list)
+            conn.commit()
+
+    # Count the failure of pending urls. Urls failed "max_retry" times are resolved (not retried any more).
+    def record_failed_links(self, site_name, url_list, max_retry):
+        hash_list = [(site_name, get_link_hash(url)) for url in url_list]
+        with self.lock:
+            conn = self.get_conn()
+            conn.executemany(
+                "UPDATE pending_link SET fail_count = fail_count + 1 WHERE site_name = ? AND link_hash = ?", hash_list
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO known_link SELECT site_name, link_hash FROM pending_link WHERE site_name = ? AND fail_count >= ?",
+                (site_name, max_retry)
+            )
+            conn.execute("DELETE FROM pending_link WHERE site_name = ? AND fail_count >= ?", (site_name, max_retry))
+            conn.commit()
+
+    # Return urls which are neither known nor pending in the site (without duplicates, in the original order)
+    def filter_new_links(self, site_name, url_list):
+        hash_dict = {}
+        for url in url_list:
+            hash_dict.setdefault(get_link_hash(url), url)
+        hash_list = list(hash_dict.keys())
+
+        known_hash_set = set()
+        with self.lock:
+            conn = self.get_conn()
+            for start in range(0, len(hash_list), self.batch_size):
+                batch = hash_list[start:start+self.batch_size]
+                placeholder = ",".join(["?"] * len(batch))
+                known_hash_set.update([row[0] for row in conn.execute(
+                    f"SELECT link_hash FROM known_link WHERE site_name = ? AND link_hash IN ({placeholder}) "
+                    f"UNION SELECT link_hash FROM pending_link WHERE site_name = ? AND link_hash IN ({placeholder})",
+                    [site_name] + batch + [site_name] + batch
+                )])
+        return [url for link_hash, url in hash_dict.items() if link_hash not in known_hash_set]
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,133 @@
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from .scheduler_crawl_engine import SchedulerCrawlEngine
+
+
+# Crawl engine of one node of distributed crawl.
+# Hosts of all target sites are assigned to nodes by consistent hashing ("HashRing"), and the node crawls only the sites
+# of its hosts by the scheduler, so all fetches of a host are paced by its token bucket ("crawl_delay") in one process.
+# Links to the hosts of the other target sites are forwarded to the owner node through "SpoolQueue" and queued in
+# the frontier of the site (depth 1, the same as a link from its root). Links to hosts not in target sites are dropped.
+# Sites are kept open until all nodes are idle and all forwarded messages are received (same counts in two polls).
+class NodeCrawlEngine(SchedulerCrawlEngine):
+    def __init__(
+        self, crawler_list, node_id, node_size, hash_ring, host_list, spool_queue,
+        max_workers=16, metrics_interval=60, metrics_path=None, poll_interval=0.5,
+    ):
+        super().__init__(crawler_list, max_workers=max_workers, metrics_interval=metrics_interval, metrics_path=metrics_path)
+        self.node_id = node_id
+        self.node_size = node_size
+        self.host_node_dict = {host: hash_ring.get_node(host) for host in host_list}
+        self.spool_queue = spool_queue
+        self.poll_interval = poll_interval
+
+    def set_status(self, idle):
+        self.spool_queue.set_status(idle=idle, sent=self.stats["sent_count"], received=self.stats["received_count"])
+
+    def push_links(self, site_task, link_list, parent_url, depth):
+        site_host = site_task.crawler.site_netloc
+        for link in link_list:
+            host = urlparse(link).netloc
+            if host == site_host:
+                site_task.crawler.frontier.push(link, parent_url, depth)
+            elif host in self.host_node_dict:
+                message = {"url": link, "parent_url": parent_url}
+                node_id = self.host_node_dict[host]
+                if node_id == self.node_id:
+                    self.queue_link(message)
+                else:
+                    self.outbox_dict[node_id].append(message)
+
+    # Queue the link in the first site of its host (dropped if the site is finished or the url is already seen)
+    def queue_link(self, message):
+        host_state = self.host_state_dict.get(urlparse(message["url"]).netloc)
+        site_task = host_state.site_task_list[0] if host_state is not None else None
+        if site_task is None or site_task.finished:
+            self.stats["dropped_count"] += 1
+            return
+        crawler = site_task.crawler
+        link = crawler.url_canonicalizer.canonicalize(message["url"])
+        if crawler.frontier.add_seen(crawler.url_canonicalizer.get_seen_key(link)) is False:
+            return
+        crawler.frontier.push(link, message["parent_url"], 1)
+        self.stats["queued_count"] += 1
+        self.push_host(host_state, time.monotonic())
+
+    def flush_links(self):
+        for node_id, message_list in self.outbox_dict.items():
+            if len(message_list) == 0:
+                continue
+            self.spool_queue.send(node_id, message_list)
+            self.stats["sent_count"] += len(message_list)
+            self.outbox_dict[node_id] = []
+
+    def process_messages(self, message_list):
+        self.stats["received_count"] += len(message_list)
+        self.set_status(idle=False)
+        for message in message_list:
+            self.queue_link(message)
+
+    # Send and receive links every "poll_interval" seconds while crawling
+    def receive_links(self):
+        if time.monotonic() - self.last_poll_time < self.poll_interval:
+            return
+        self.last_poll_time = time.monotonic()
+        self.flush_links()
+        message_list = self.spool_queue.receive()
+        if len(message_list) > 0:
+            self.process_messages(message_list)
+
+    # Site without work is finished only at the end of crawl (other nodes may forward links), or when its budget is used
+    def can_finish_site(self, site_task):
+        return self.terminated or site_task.is_max_collected(self.max_page_size)
+
+    def is_terminated(self, status_list):
+        return all([status is not None and status["idle"] for status in status_list]) and \
+            sum([status["sent"] for status in status_list]) == sum([status["received"] for status in status_list])
+
+    # Wait until links are received (return True), or all nodes are idle. In the latter case, True is returned once more
+    # to finish the open sites, and then False.
+    def wait_links(self):
+        if self.terminated:
+            return False
+        self.flush_links()
+        self.set_status(idle=True)
+        last_status_list = None
+        while True:
+            message_list = self.spool_queue.receive()
+            if len(message_list) > 0:
+                self.process_messages(message_list)
+                self.last_poll_time = time.monotonic()
+                return True
+
+            status_list = self.spool_queue.get_status_list(self.node_size)
+            if self.is_terminated(status_list):
+                if status_list == last_status_list:
+                    self.terminated = True
+                    return True
+                last_status_list = status_list
+            else:
+                last_status_list = None
+            time.sleep(self.poll_interval)
+
+    def get_node_report(self):
+        stats = self.stats
+        return (
+            f"Node {self.node_id}: {len(self.crawler_list)} sites, forwarded {stats['sent_count']} links to other nodes, "
+            f"received {stats['received_count']} links, queued {stats['queued_count']} new links "
+            f"({stats['dropped_count']} dropped for finished sites)"
+        )
+
+    def crawl(self, max_page_size=1, target_file_type=["html"]):
+        self.outbox_dict = defaultdict(list)
+        self.stats = {"sent_count": 0, "received_count": 0, "queued_count": 0, "dropped_count": 0}
+        self.terminated = False
+        self.last_poll_time = time.monotonic()
+        self.max_page_size = max_page_size
+        self.set_status(idle=False)
+
+        page_list = super().crawl(max_page_size, target_file_type)
+        print(self.get_node_report())
+        return page_list
@@ -0,0 +1,66 @@
+import json
+import hashlib
+import sqlite3
+import threading
+
+
+# Hash of the body and Content-Type (file type is detected from both)
+def get_content_hash(byte_text, content_type=None):
+    content_hash = hashlib.blake2b(digest_size=16)
+    content_hash.update((content_type or "").encode("utf-8", errors="replace") + b"\0")
+    content_hash.update(byte_text)
+    return content_hash.hexdigest()
+
+
+# Result of content analysis of downloaded pages (file type, encoding, href of links and bit count of text shingles),
+# keyed by content hash and saved next to the pages, so the same body is not sniffed and parsed again.
+class PageAnalysisCache():
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.init_state()
+
+    def init_state(self):
+        self.conn = None
+        self.lock = threading.Lock()
+
+    # Connection and lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["conn", "lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_state()
+
+    def get_conn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS analysis (content_hash TEXT PRIMARY KEY, analysis TEXT)")
+            self.conn.commit()
+        return self.conn
+
+    # Return the cached analysis, or None if the content is not analyzed yet
+    def get(self, content_hash):
+        with self.lock:
+            row = self.get_conn().execute(
+                "SELECT analysis FROM analysis WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, content_hash, analysis):
+        with self.lock:
+            conn = self.get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis VALUES (?, ?)", (content_hash, json.dumps(analysis, ensure_ascii=False))
+            )
+            conn.commit()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
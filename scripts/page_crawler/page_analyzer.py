@@ -0,0 +1,106 @@
+import re
+
+from .link_extractor import LinkExtractor, normalize_link
+
+
+# Collect what is needed from a page in one tokenizer pass: href of <a> (always).
+# If "collect_meta" is True, text of <title>, "application/ld+json" scripts and
+# 'meta property="article:published_time"' are also collected (preprocessing). The crawler only needs hrefs.
+# If "collect_text" is True, visible text (outside <script> / <style>) is also collected.
+class PageAnalyzer(LinkExtractor):
+    def __init__(self, collect_meta=False, collect_text=False):
+        super().__init__()
+        self.collect_meta = collect_meta
+        self.title_list = []
+        self.ld_json_list = []
+        self.published_time_list = []
+        self.in_title = False
+        self.in_ld_json = False
+        self.collect_text = collect_text
+        self.text_list = []
+        self.skip_text_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            super().handle_starttag(tag, attrs)
+            return
+        if tag in ["script", "style"]:
+            self.skip_text_depth += 1
+        if self.collect_meta is False:
+            return
+        if tag == "title":
+            self.in_title = True
+        elif tag == "script":
+            self.in_ld_json = dict(attrs).get("type") == "application/ld+json"
+            if self.in_ld_json:
+                self.ld_json_list.append("")
+        elif tag == "meta":
+            attr_dict = dict(attrs)
+            if attr_dict.get("property") == "article:published_time":
+                self.published_time_list.append(attr_dict.get("content"))
+
+    def handle_endtag(self, tag):
+        if tag in ["script", "style"]:
+            self.skip_text_depth = max(self.skip_text_depth - 1, 0)
+        if tag == "title":
+            self.in_title = False
+        elif tag == "script":
+            self.in_ld_json = False
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title_list.append(data)
+        if self.in_ld_json:
+            self.ld_json_list[-1] += data
+        if self.collect_text and self.skip_text_depth == 0:
+            self.text_list.append(data)
+
+    def get_text(self):
+        return " ".join(self.text_list)
+
+    def get_title(self):
+        return "".join(self.title_list).strip()
+
+    # Date of "datePublished" in ld+json, or date of 'meta property="article:published_time"'. "None" if not found.
+    def get_publish_date(self):
+        if len(self.ld_json_list) > 0:
+            publish_date = re.search(r'"datePublished":\s*?"(\d{4}-\d{2}-\d{2})', "\n".join(self.ld_json_list))
+            if publish_date is not None:
+                return publish_date.group(1)
+
+        # Meta tag without content is regarded as invalid
+        if len(self.published_time_list) > 0 and None not in self.published_time_list:
+            publish_date = re.search(r'(\d{4}-\d{2}-\d{2})', "\n".join(self.published_time_list))
+            if publish_date is not None:
+                return publish_date.group(1)
+
+        return "None"
+
+
+# Analyse html text. Links (and title / publish date if "collect_meta" is True) are collected by one tokenizer pass.
+# If "extractor" ("ExtractContent") is specified, main text blocks and title are extracted by it separately.
+# If "collect_text" is True, visible text of the page is returned as "text".
+def analyze_page(text, url, extractor=None, collect_meta=False, collect_text=False):
+    analyzer = PageAnalyzer(collect_meta=collect_meta, collect_text=collect_text)
+    analyzer.extract(text)
+
+    link_list = []
+    for link in analyzer.href_list:
+        link = normalize_link(link, url)
+        if link is not None:
+            link_list.append(link)
+
+    analysis = {
+        "link_list": link_list,
+        "href_list": analyzer.href_list,
+        "title": analyzer.get_title() if collect_meta else None,
+        "publish_datetime": analyzer.get_publish_date() if collect_meta else None,
+        "main_text_list": None,
+        "text": analyzer.get_text() if collect_text else None,
+    }
+
+    # Title of "ExtractContent" is used with main text, so that it is removed from main text in the same form
+    if extractor is not None:
+        analysis["main_text_list"], analysis["title"] = extractor.analyse(text)
+
+    return analysis
@@ -0,0 +1,189 @@
+import os
+import mmap
+import zlib
+import gzip
+import hashlib
+import sqlite3
+import threading
+
+
+# Append-only page archive.
+# Page bodies are appended to large segment files, and "index.sqlite" maps the url hash to the body location.
+# Identical bodies are stored only once (body is located by its content hash).
+class PageArchive():
+    locator_prefix = "archive:"
+
+    def __init__(self, archive_folder, compression="zlib", max_segment_size=1024 * 1024 * 1024):
+        self.archive_folder = archive_folder
+        self.compression = compression
+        self.max_segment_size = max_segment_size
+        os.makedirs(self.archive_folder, exist_ok=True)
+
+        self.init_state()
+
+    def init_state(self):
+        self.conn = None
+        self.lock = threading.Lock()
+        self.segment_file = None
+        self.mmap_dict = {}
+
+    # Connection, file and mmap objects cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["conn", "lock", "segment_file", "mmap_dict"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_state()
+
+    def get_conn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(f"{self.archive_folder}/index.sqlite", check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url_hash TEXT PRIMARY KEY, url TEXT, content_hash TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS contents ("
+                "content_hash TEXT PRIMARY KEY, segment INTEGER, offset INTEGER, length INTEGER, compression TEXT)"
+            )
+            self.conn.commit()
+        return self.conn
+
+    def get_segment_path(self, segment):
+        return f"{self.archive_folder}/segment-{segment:06}.seg"
+
+    @staticmethod
+    def get_url_hash(url):
+        return hashlib.sha1(url.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+    def get_locator(self, url):
+        return f"{self.locator_prefix}{self.archive_folder}#{self.get_url_hash(url)}"
+
+    def __len__(self):
+        with self.lock:
+            return self.get_conn().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def has(self, url):
+        with self.lock:
+            row = self.get_conn().execute(
+                "SELECT 1 FROM pages WHERE url_hash = ?", (self.get_url_hash(url),)
+            ).fetchone()
+        return row is not None
+
+    def compress(self, byte_text):
+        if self.compression == "zlib":
+            return zlib.compress(byte_text)
+        elif self.compression == "gzip":
+            return gzip.compress(byte_text)
+        elif self.compression == "none":
+            return byte_text
+        else:
+            raise Exception(f"Not implemented compression: {self.compression}")
+
+    @staticmethod
+    def decompress(data, compression):
+        if compression == "zlib":
+            return zlib.decompress(data)
+        elif compression == "gzip":
+            return gzip.decompress(data)
+        else:
+            return data
+
+    # Open the last segment for append. New segment is started if it exceeds "max_segment_size".
+    def get_segment_file(self, data_size):
+        if self.segment_file is None:
+            row = self.get_conn().execute("SELECT MAX(segment) FROM contents").fetchone()
+            segment = row[0] if row[0] is not None else 0
+            self.segment = segment
+            self.segment_file = open(self.get_segment_path(segment), "ab")
+
+        if self.segment_file.tell() > 0 and self.segment_file.tell() + data_size > self.max_segment_size:
+            self.segment_file.close()
+            self.segment += 1
+            self.segment_file = open(self.get_segment_path(self.segment), "ab")
+
+        return self.segment_file
+
+    def put(self, url, byte_text):
+        content_hash = hashlib.sha1(byte_text).hexdigest()
+        with self.lock:
+            conn = self.get_conn()
+            row = conn.execute("SELECT 1 FROM contents WHERE content_hash = ?", (content_hash,)).fetchone()
+            if row is None:
+                data = self.compress(byte_text)
+                f = self.get_segment_file(len(data))
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+                conn.execute(
+                    "INSERT INTO contents VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, self.segment, offset, len(data), self.compression)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (self.get_url_hash(url), url, content_hash)
+            )
+            conn.commit()
+
+        return self.get_locator(url)
+
+    def read(self, segment, offset, length):
+        mapped = self.mmap_dict.get(segment)
+        # Segment in writing grows, so map it again if the record is out of the mapped range
+        if mapped is None or offset + length > len(mapped):
+            if mapped is not None:
+                mapped.close()
+            with open(self.get_segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mmap_dict[segment] = mapped
+        return mapped[offset:offset + length]
+
+    def get_by_url_hash(self, url_hash):
+        with self.lock:
+            row = self.get_conn().execute(
+                "SELECT contents.segment, contents.offset, contents.length, contents.compression "
+                "FROM pages JOIN contents ON pages.content_hash = contents.content_hash "
+                "WHERE pages.url_hash = ?", (url_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            segment, offset, length, compression = row
+            data = self.read(segment, offset, length)
+        return self.decompress(data, compression)
+
+    def get(self, url):
+        return self.get_by_url_hash(self.get_url_hash(url))
+
+    def close(self):
+        with self.lock:
+            if self.segment_file is not None:
+                self.segment_file.close()
+                self.segment_file = None
+            for mapped in self.mmap_dict.values():
+                mapped.close()
+            self.mmap_dict = {}
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+# Opened archives in this process, used by "load_saved_page"
+archive_dict = {}
+
+
+# Load page body from "save_path" of the page record (file path or archive locator)
+def load_saved_page(save_path):
+    if save_path.startswith(PageArchive.locator_prefix):
+        archive_folder, url_hash = save_path[len(PageArchive.locator_prefix):].rsplit("#", 1)
+        if archive_folder not in archive_dict:
+            archive_dict[archive_folder] = PageArchive(archive_folder)
+        byte_text = archive_dict[archive_folder].get_by_url_hash(url_hash)
+        if byte_text is None:
+            raise Exception(f"Page is not found in archive: {save_path}")
+        return byte_text
+    else:
+        with open(save_path, "rb")as f:
+            return f.read()
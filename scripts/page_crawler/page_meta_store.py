@@ -0,0 +1,56 @@
+import json
+import sqlite3
+import threading
+
+
+# Per-url metadata of downloaded pages (e.g. ETag / Last-Modified validators), saved next to the pages.
+# Each value is a dict, and "update" merges the given fields into the stored dict.
+class PageMetaStore():
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.init_state()
+
+    def init_state(self):
+        self.conn = None
+        self.lock = threading.Lock()
+
+    # Connection and lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["conn", "lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_state()
+
+    def get_conn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS page_meta (url TEXT PRIMARY KEY, meta TEXT)")
+            self.conn.commit()
+        return self.conn
+
+    def get(self, url):
+        with self.lock:
+            row = self.get_conn().execute("SELECT meta FROM page_meta WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row is not None else {}
+
+    def update(self, url, **fields):
+        with self.lock:
+            conn = self.get_conn()
+            row = conn.execute("SELECT meta FROM page_meta WHERE url = ?", (url,)).fetchone()
+            meta = json.loads(row[0]) if row is not None else {}
+            meta.update(fields)
+            conn.execute("INSERT OR REPLACE INTO page_meta VALUES (?, ?)", (url, json.dumps(meta, ensure_ascii=False)))
+            conn.commit()
+        return meta
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
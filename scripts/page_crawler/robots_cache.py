@@ -0,0 +1,68 @@
+import time
+import sqlite3
+import threading
+
+
+# robots.txt of each site saved in SQLite, shared across runs and processes.
+# Cached robots.txt older than "ttl" seconds is downloaded again.
+class RobotsCache():
+    def __init__(self, db_path, ttl=86400):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.init_state()
+
+    def init_state(self):
+        self.conn = None
+        self.lock = threading.Lock()
+
+    # Connection and lock cannot be pickled (crawler is sent to the other process)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ["conn", "lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_state()
+
+    def get_conn(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, timeout=60, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS robots (site_domain TEXT PRIMARY KEY, text TEXT, fetched_at REAL)")
+            self.conn.commit()
+        return self.conn
+
+    # Return robots.txt text if it is cached and not expired (or "ignore_ttl"), otherwise None
+    def get(self, site_domain, ignore_ttl=False):
+        with self.lock:
+            row = self.get_conn().execute(
+                "SELECT text, fetched_at FROM robots WHERE site_domain = ?", (site_domain,)
+            ).fetchone()
+        if row is None or (ignore_ttl is False and time.time() - row[1] > self.ttl):
+            return None
+        return row[0]
+
+    def put(self, site_domain, text):
+        with self.lock:
+            conn = self.get_conn()
+            conn.execute("INSERT OR REPLACE INTO robots VALUES (?, ?, ?)", (site_domain, text, time.time()))
+            conn.commit()
+
+    # Return cached robots.txt, or download it by "downloader" and save it
+    def fetch(self, site_domain, downloader):
+        text = self.get(site_domain)
+        if text is not None:
+            return text
+
+        text = downloader.download_robots(f"{site_domain}/robots.txt")
+        self.put(site_domain, text)
+        return text
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
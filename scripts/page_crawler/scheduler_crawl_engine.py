@@ -0,0 +1,378 @@
+import os
+import json
+import heapq
+import datetime
+import time
+import functools
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+# Seconds added to the interval of the host. The worker sends the request a little after the token is consumed
+# (thread wake-up and the switch interval of the GIL), and the delay is not the same for every request.
+JITTER_MARGIN = 0.01
+
+
+# Token bucket of one host. A token is added every "interval" seconds, up to "burst" tokens.
+class HostTokenBucket():
+    def __init__(self, interval, burst=1):
+        self.interval = interval
+        self.burst = burst
+        self.tokens = burst
+        self.last_time = time.monotonic()
+
+    def refill(self, now):
+        if self.interval <= 0:
+            self.tokens = self.burst
+        else:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_time) / self.interval)
+        self.last_time = now
+
+    # Seconds until a token is available
+    def get_wait_time(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) * self.interval
+
+    def consume(self, now):
+        self.refill(now)
+        self.tokens -= 1
+
+
+# Crawl state of one site in the scheduler
+class SiteTask():
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.start_time = time.time()
+        self.state = crawler.start_frontier()
+        self.in_flight_dict = {}
+        self.host_state = None
+        self.finished = False
+
+    # Budget of the site is "max_page_size", or the pages granted by the budget allocator
+    def is_max_collected(self, max_page_size):
+        collected_page_count = self.state["collected_page_count"]
+        return collected_page_count >= self.crawler.get_page_limit(collected_page_count, max_page_size)
+
+    def has_work(self, max_page_size):
+        return self.finished is False and len(self.crawler.frontier) > 0 and self.is_max_collected(max_page_size) is False
+
+    # Items popped from frontier but not processed yet (including the item waiting for the token)
+    def get_in_flight_list(self):
+        in_flight_list = list(self.in_flight_dict.values())
+        if self.host_state.pending is not None and self.host_state.pending[0] is self:
+            in_flight_list.append(self.host_state.pending[1])
+        return in_flight_list
+
+    def is_done(self, max_page_size):
+        return len(self.get_in_flight_list()) == 0 and self.has_work(max_page_size) is False
+
+
+# Sites sharing one host. Only one network fetch of the host is in flight, and fetches are paced by token bucket.
+class HostState():
+    def __init__(self, host):
+        self.host = host
+        # Interval is set by "crawl_delay" of robots.txt, which is loaded by the first fetch of the host
+        self.bucket = HostTokenBucket(0)
+        self.robots_loaded = False
+        self.site_task_list = []
+        self.site_index = 0
+        # Popped item waiting for the token: (site task, item)
+        self.pending = None
+        self.in_flight = False
+        self.in_heap = False
+
+        self.fetch_count = 0
+        self.cached_count = 0
+
+    def get_queue_depth(self):
+        return sum([
+            len(site_task.crawler.frontier) for site_task in self.site_task_list if site_task.finished is False
+        ]) + (self.pending is not None)
+
+    # Pop the next item from the sites of this host by round robin
+    def pop(self, max_page_size):
+        if self.pending is not None:
+            pending = self.pending
+            self.pending = None
+            if pending[0].is_max_collected(max_page_size) is False:
+                return pending
+        for _ in range(len(self.site_task_list)):
+            site_task = self.site_task_list[self.site_index]
+            self.site_index = (self.site_index + 1) % len(self.site_task_list)
+            if site_task.has_work(max_page_size):
+                return site_task, site_task.crawler.frontier.pop()
+        return None
+
+    def has_work(self, max_page_size):
+        return self.pending is not None or \
+            any([site_task.has_work(max_page_size) for site_task in self.site_task_list])
+
+
+# Crawl all sites by a small pool of download threads.
+# Central scheduler keeps a token bucket per host (interval is "crawl_delay" of the site) and hands out the fetch
+# of the host whose token is available first, so workers do not sleep for "crawl_delay".
+# Frontier and parsing are handled in the scheduler thread, so the page records are the same as "page_list_crawl".
+class SchedulerCrawlEngine():
+    def __init__(self, crawler_list, max_workers=16, metrics_interval=60, metrics_path=None):
+        self.crawler_list = crawler_list
+        self.max_workers = max_workers
+        self.metrics_interval = metrics_interval
+        self.metrics_path = metrics_path
+
+    # Per-host metrics (fetch rate and queue depth)
+    def get_metrics(self):
+        elasped_time = max(time.time() - self.start_time, 1e-9)
+        metrics_list = []
+        for host_state in self.host_state_dict.values():
+            metrics_list.append({
+                "host": host_state.host,
+                "fetch_count": host_state.fetch_count,
+                "cached_count": host_state.cached_count,
+                "fetch_rate": host_state.fetch_count / elasped_time,
+                "queue_depth": host_state.get_queue_depth(),
+                "in_flight": host_state.in_flight,
+            })
+        return metrics_list
+
+    def report_metrics(self):
+        metrics_list = self.get_metrics()
+        active_host_size = len([m for m in metrics_list if m["queue_depth"] > 0 or m["in_flight"]])
+        elasped_time = datetime.timedelta(seconds=time.time() - self.start_time)
+        print(
+            f"Scheduler: {active_host_size} active hosts, "
+            f"queue depth {sum([m['queue_depth'] for m in metrics_list])}, "
+            f"{sum([m['fetch_rate'] for m in metrics_list]):.2f} fetches/sec, "
+            f"{len(self.future_dict)} workers busy, elasped time is {elasped_time}"
+        )
+        if self.metrics_path is not None:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            with open(self.metrics_path, "a") as f:
+                f.write(json.dumps({"time": time.time(), "host_list": metrics_list}, ensure_ascii=False) + "\n")
+
+    def push_host(self, host_state, now):
+        if host_state.in_heap or host_state.in_flight or host_state.has_work(self.max_page_size) is False:
+            return
+        ready_time = now + (host_state.bucket.get_wait_time(now) if host_state.pending is not None else 0)
+        heapq.heappush(self.host_heap, (ready_time, self.heap_count, host_state.host))
+        self.heap_count += 1
+        host_state.in_heap = True
+
+    # Wait for the next token of the host and consume it in worker thread right before the request is sent
+    # (the page and the download after its pre-check request), so the delay until the worker starts the fetch does
+    # not shorten the interval. The host has only this fetch in flight, so the scheduler does not use its bucket meanwhile.
+    def wait_host_token(self, host_state):
+        time.sleep(host_state.bucket.get_wait_time(time.monotonic()))
+        host_state.bucket.consume(time.monotonic())
+
+    def fetch_in_worker(self, host_state, crawler, url, parent_url, is_network):
+        wait_host = functools.partial(self.wait_host_token, host_state)
+        if is_network:
+            wait_host()
+        return crawler.fetch_page(
+            url, parent_url, skip_first_delay=True, target_file_type=self.target_file_type, wait_host=wait_host,
+        )
+
+    def submit(self, executor, host_state, site_task, item, is_network):
+        url, parent_url, depth = item
+        future = executor.submit(self.fetch_in_worker, host_state, site_task.crawler, url, parent_url, is_network)
+        self.future_dict[future] = (host_state, site_task, item, is_network)
+        site_task.in_flight_dict[future] = item
+        if is_network:
+            host_state.in_flight = True
+
+    # Load robots.txt of all sites of the host in worker thread (the first fetch of the host)
+    def submit_robots(self, executor, host_state):
+        site_task_list = [site_task for site_task in host_state.site_task_list if site_task.finished is False]
+        future = executor.submit(lambda: [site_task.crawler.load_robot_parser() for site_task in site_task_list])
+        self.future_dict[future] = (host_state, None, None, True)
+        host_state.in_flight = True
+
+    def process_robots_result(self, host_state, now):
+        host_state.in_flight = False
+        host_state.robots_loaded = True
+        crawl_delay = max([site_task.crawler.crawl_delay for site_task in host_state.site_task_list])
+        host_state.bucket.interval = crawl_delay + JITTER_MARGIN if crawl_delay > 0 else 0
+        host_state.bucket.consume(now)
+
+    # Hand out fetches of the hosts whose token is available
+    def dispatch(self, executor, now):
+        while len(self.host_heap) > 0 and len(self.future_dict) < self.max_workers:
+            ready_time, _, host = self.host_heap[0]
+            if ready_time > now:
+                break
+            heapq.heappop(self.host_heap)
+            host_state = self.host_state_dict[host]
+            host_state.in_heap = False
+
+            if host_state.robots_loaded is False:
+                self.submit_robots(executor, host_state)
+                continue
+
+            while len(self.future_dict) < self.max_workers:
+                popped = host_state.pop(self.max_page_size)
+                if popped is None:
+                    break
+                site_task, item = popped
+                crawler = site_task.crawler
+                if crawler.check_target_url(item[0]) is False:
+                    continue
+
+                # Page loaded from saved file does not access to the host (nor page not saved in offline replay,
+                # which is skipped without the token)
+                is_saved = crawler.downloader.is_saved(item[0])
+                if crawler.offline or (crawler.disable_page_reget and is_saved):
+                    host_state.cached_count += is_saved
+                    self.submit(executor, host_state, site_task, item, is_network=False)
+                    continue
+
+                # Token is consumed by the worker
+                wait_time = host_state.bucket.get_wait_time(now)
+                if wait_time > 0:
+                    host_state.pending = (site_task, item)
+                    break
+                host_state.fetch_count += 1
+                self.submit(executor, host_state, site_task, item, is_network=True)
+                break
+
+            self.push_host(host_state, now)
+
+    def process_result(self, future, target_file_type):
+        host_state, site_task, item, is_network = self.future_dict.pop(future)
+        if site_task is None:
+            self.process_robots_result(host_state, time.monotonic())
+            return
+        del site_task.in_flight_dict[future]
+        if is_network:
+            host_state.in_flight = False
+
+        crawler = site_task.crawler
+        state = site_task.state
+        url, parent_url, depth = item
+        try:
+            fetch_result = future.result()
+            if fetch_result is None or site_task.is_max_collected(self.max_page_size):
+                return
+            byte_text, save_path = fetch_result
+
+            page, processed_child_url_list, file_type = \
+                crawler.process_page(url, parent_url, depth, byte_text, save_path, target_file_type)
+
+            self.push_links(site_task, processed_child_url_list, url, depth+1)
+
+            if page is not None:
+                crawler.frontier.add_record(page)
+                crawler.report_progress()
+
+            if file_type in target_file_type:
+                state["collected_page_count"] += 1
+                collected_page_count = state["collected_page_count"]
+                if collected_page_count % crawler.crawl_log_interval == 0:
+                    elasped_time = datetime.timedelta(seconds=time.time() - site_task.start_time)
+                    print(f"Crawled {collected_page_count} pages of {crawler.site_name}, current depth is {depth}, elasped time is {elasped_time}")
+                if collected_page_count % crawler.checkpoint_interval == 0:
+                    crawler.frontier.checkpoint(state, in_flight_list=site_task.get_in_flight_list())
+        except Exception:
+            print(f"Failed to process {url}, parent: {parent_url}")
+            print(traceback.format_exc())
+
+    # Queue links found in the page of the site (distributed engine forwards links of the other hosts)
+    def push_links(self, site_task, link_list, parent_url, depth):
+        for link in link_list:
+            site_task.crawler.frontier.push(link, parent_url, depth)
+
+    # Hooks of distributed engine: receive links from the other nodes, keep sites open until all nodes are idle,
+    # and wait for links when there is no local work (return False to stop crawling)
+    def receive_links(self):
+        pass
+
+    def can_finish_site(self, site_task):
+        return True
+
+    def wait_links(self):
+        return False
+
+    def finish_site(self, site_task):
+        crawler = site_task.crawler
+        site_task.finished = True
+        if site_task.host_state.pending is not None and site_task.host_state.pending[0] is site_task:
+            site_task.host_state.pending = None
+        crawled_all = len(crawler.frontier) == 0
+        page_list = crawler.finish_frontier(site_task.state)
+
+        collected_page_count = site_task.state["collected_page_count"]
+        elasped_time = datetime.timedelta(seconds=time.time() - site_task.start_time)
+        if crawled_all is False:
+            print(f"End crawling {collected_page_count} pages of {crawler.site_name}, elasped time is {elasped_time}")
+        else:
+            print(f"End crawling {collected_page_count} pages of {crawler.site_name} because crawed all pages, elasped time is {elasped_time}")
+        if crawler.disable_page_reget is False:
+            print(crawler.downloader.get_revalidation_report())
+
+        return page_list
+
+    def crawl(self, max_page_size=1, target_file_type=["html"]):
+        self.max_page_size = max_page_size
+        self.target_file_type = target_file_type
+        self.start_time = time.time()
+        self.future_dict = {}
+        self.host_heap = []
+        self.heap_count = 0
+
+        # Sites with the same host share one token bucket, and the longest "crawl_delay" is used.
+        self.host_state_dict = {}
+        site_task_list = []
+        for crawler in self.crawler_list:
+            site_task = SiteTask(crawler)
+            site_task_list.append(site_task)
+            host = crawler.site_netloc
+            if host not in self.host_state_dict:
+                self.host_state_dict[host] = HostState(host)
+            host_state = self.host_state_dict[host]
+            host_state.site_task_list.append(site_task)
+            site_task.host_state = host_state
+
+        now = time.monotonic()
+        for host_state in self.host_state_dict.values():
+            self.push_host(host_state, now)
+
+        page_list = []
+        last_report_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                self.receive_links()
+                self.dispatch(executor, time.monotonic())
+
+                # Finish the sites without work and in-flight fetch
+                for site_task in site_task_list:
+                    if site_task.finished is False and self.can_finish_site(site_task) and (
+                        site_task.is_done(max_page_size) or
+                        (site_task.is_max_collected(max_page_size) and len(site_task.in_flight_dict) == 0)
+                    ):
+                        page_list += self.finish_site(site_task)
+
+                if len(self.future_dict) == 0 and len(self.host_heap) == 0:
+                    if self.wait_links():
+                        continue
+                    break
+
+                if time.time() - last_report_time >= self.metrics_interval:
+                    self.report_metrics()
+                    last_report_time = time.time()
+
+                # Wait until a fetch is completed or the next token is available
+                timeout = None
+                if len(self.host_heap) > 0 and len(self.future_dict) < self.max_workers:
+                    timeout = max(self.host_heap[0][0] - time.monotonic(), 0)
+                if len(self.future_dict) > 0:
+                    done_set, _ = wait(list(self.future_dict.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done_set:
+                        host_state = self.future_dict[future][0]
+                        self.process_result(future, target_file_type)
+                        self.push_host(host_state, time.monotonic())
+                else:
+                    time.sleep(timeout)
+
+        self.report_metrics()
+        return page_list
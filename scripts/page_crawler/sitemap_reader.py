@@ -0,0 +1,96 @@
+import re
+import zlib
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+
+# Split bytes into chunks (downloaded sitemap is parsed incrementally without decoding it to one string)
+def iter_chunks(byte_text, chunk_size=65536):
+    for start in range(0, len(byte_text), chunk_size):
+        yield byte_text[start:start+chunk_size]
+
+
+# Decompress chunks if the sitemap is gzip (e.g. "sitemap.xml.gz"), otherwise pass through
+def iter_decompressed_chunks(chunk_iter):
+    decompressor = None
+    for chunk in chunk_iter:
+        if decompressor is None and chunk.startswith(b"\x1f\x8b"):
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        if len(chunk) > 0:
+            yield chunk
+    if decompressor is not None:
+        chunk = decompressor.flush()
+        if len(chunk) > 0:
+            yield chunk
+
+
+def get_local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def get_namespace(tag):
+    return tag[1:].split("}", 1)[0] if tag.startswith("{") else ""
+
+
+# Yield (loc, lastmod) of each <url> / <sitemap> in sitemap / sitemap index by incremental XML parsing.
+# "lastmod" is None if it is not specified.
+# Only <loc> / <lastmod> which are direct children of <url> / <sitemap> in the same namespace are used,
+# so <image:loc>, <video:loc> and the other extensions do not replace the url of the page.
+# Parsed elements are removed from the tree, so memory does not grow with the number of urls.
+# If the XML is broken, the rest of <loc> are extracted by regex (same as the previous reader) without lastmod.
+def iter_sitemap_entries(byte_text, chunk_size=65536):
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    # Tags of the open elements (elements themselves are cleared while parsing)
+    tag_stack = []
+    loc_count = 0
+    loc = None
+    lastmod = None
+
+    def read_entries():
+        nonlocal root, loc_count, loc, lastmod
+        for event, element in parser.read_events():
+            if root is None:
+                root = element
+            if event == "start":
+                tag_stack.append(element.tag)
+                continue
+            tag_stack.pop()
+            parent_tag = tag_stack[-1] if len(tag_stack) > 0 else None
+            is_entry_child = parent_tag is not None and get_local_name(parent_tag) in ["url", "sitemap"] and \
+                get_namespace(parent_tag) == get_namespace(element.tag)
+
+            name = get_local_name(element.tag)
+            if is_entry_child and name == "loc":
+                loc = (element.text or "").strip()
+            elif is_entry_child and name == "lastmod":
+                lastmod = (element.text or "").strip() or None
+            elif name in ["url", "sitemap"] and loc is not None:
+                yield loc, lastmod
+                loc_count += 1
+                loc = None
+                lastmod = None
+
+    try:
+        for chunk in iter_decompressed_chunks(iter_chunks(byte_text, chunk_size)):
+            parser.feed(chunk)
+            yield from read_entries()
+            if root is not None:
+                root.clear()
+        parser.close()
+        yield from read_entries()
+    except (ParseError, zlib.error):
+        print("Failed to parse sitemap as XML, extract <loc> by regex")
+        try:
+            text = b"".join(iter_decompressed_chunks(iter_chunks(byte_text, chunk_size))).decode(errors="replace")
+        except zlib.error:
+            return
+        for regex_loc in re.findall(r"<loc>(.*?)</loc>", text, flags=re.S)[loc_count:]:
+            yield regex_loc.strip(), None
+
+
+# Yield text of <loc> in sitemap / sitemap index
+def iter_sitemap_locs(byte_text, chunk_size=65536):
+    for loc, _ in iter_sitemap_entries(byte_text, chunk_size):
+        yield loc
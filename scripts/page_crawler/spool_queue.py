@@ -0,0 +1,60 @@
+import os
+import json
+import time
+
+
+# Lightweight message queue between crawler nodes on a shared folder (local disk for nodes on one machine,
+# or a network file system for several machines). Each node has an inbox folder, and one batch of messages is one
+# JSONL file, which is written to a temporary file and renamed into the inbox, so a partial batch is never read.
+# Status of each node (idle, number of sent / received messages) is saved in the same folder to detect the end of crawl.
+class SpoolQueue():
+    def __init__(self, spool_folder, node_id):
+        self.spool_folder = spool_folder
+        self.node_id = node_id
+        self.batch_count = 0
+        for folder in [self.get_inbox_folder(node_id), f"{spool_folder}/status", f"{spool_folder}/tmp"]:
+            os.makedirs(folder, exist_ok=True)
+
+    def get_inbox_folder(self, node_id):
+        return f"{self.spool_folder}/inbox/{node_id}"
+
+    def write_atomic(self, path, text):
+        tmp_path = f"{self.spool_folder}/tmp/{self.node_id}-{os.path.basename(path)}"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def send(self, node_id, message_list):
+        inbox_folder = self.get_inbox_folder(node_id)
+        os.makedirs(inbox_folder, exist_ok=True)
+        file_name = f"{time.time_ns()}-{self.node_id}-{self.batch_count}.jsonl"
+        self.batch_count += 1
+        self.write_atomic(
+            f"{inbox_folder}/{file_name}",
+            "".join([json.dumps(message, ensure_ascii=False) + "\n" for message in message_list]),
+        )
+
+    # Return all messages in the inbox (batches are removed after reading)
+    def receive(self):
+        inbox_folder = self.get_inbox_folder(self.node_id)
+        message_list = []
+        for file_name in sorted(os.listdir(inbox_folder)):
+            path = f"{inbox_folder}/{file_name}"
+            with open(path) as f:
+                message_list += [json.loads(line) for line in f]
+            os.remove(path)
+        return message_list
+
+    def set_status(self, **status):
+        self.write_atomic(f"{self.spool_folder}/status/{self.node_id}.json", json.dumps(status))
+
+    # Status of all nodes (None if the node has not started yet)
+    def get_status_list(self, node_size):
+        status_list = []
+        for node_id in range(node_size):
+            try:
+                with open(f"{self.spool_folder}/status/{node_id}.json") as f:
+                    status_list.append(json.load(f))
+            except FileNotFoundError:
+                status_list.append(None)
+        return status_list
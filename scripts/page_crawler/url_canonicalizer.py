@@ -0,0 +1,165 @@
+import json
+from urllib.parse import urlparse, urlunparse, unquote
+
+
+# Query parameters which only track the visitor (removed from canonical url)
+TRACKING_PARAM_PREFIX_LIST = ["utm_", "mc_", "pk_", "hsa_"]
+TRACKING_PARAM_LIST = [
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "_ga", "_gl", "ocid", "cmpid", "ref_src", "ref_url",
+    "smid", "smtyp", "xtor", "at_medium", "at_campaign",
+]
+INDEX_FILE_LIST = ["index.html", "index.htm", "index.php", "index.shtml", "default.htm", "default.html", "default.aspx"]
+DEFAULT_PORT_DICT = {"http": 80, "https": 443}
+
+# trailing_slash: "add" (to the path without file extension), "remove", "keep",
+# or "auto" (keep until "learn_count" redirects of the site add / remove the trailing slash in the same way, then follow it)
+DEFAULT_RULE = {
+    "trailing_slash": "auto",
+    "remove_index_file": True,
+    "drop_tracking_params": True,
+    "drop_param_list": [],
+    "keep_param_list": None,
+    "sort_query": True,
+}
+
+
+# Url used to match the page with content page list (compatible with the previous preprocess.py)
+def normalize_url(url):
+    parsed_url = urlparse(url)
+
+    path = parsed_url.path
+    if path.endswith("index.htm") or path.endswith("index.html"):
+        path = path[:path.rfind("/")]
+
+    if path.endswith("/") == False:
+        path += "/"
+
+    normalized_url = urlunparse(parsed_url._replace(path=path))
+    return normalized_url
+
+
+# Load per-site canonicalization rules: {site_name: rule}. "default" is applied to the sites not in the file.
+def load_canonical_rule_dict(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_site_canonical_rule(rule_dict, site_name):
+    rule = dict(rule_dict.get("default", {}))
+    rule.update(rule_dict.get(site_name, {}))
+    return rule
+
+
+# Convert url variants of the same page (host case, default port, index file, trailing slash,
+# tracking query parameters, order of query parameters, fragment) into one canonical url.
+# "rule" overrides "DEFAULT_RULE" for the site.
+class UrlCanonicalizer():
+    def __init__(self, rule=None, learn_count=3):
+        self.rule = dict(DEFAULT_RULE)
+        self.rule.update(rule or {})
+        self.learn_count = learn_count
+        self.auto_trailing_slash = self.rule["trailing_slash"] == "auto"
+        # Trailing slash redirects of the site and the learned rule (saved in the frontier checkpoint)
+        self.redirect_state = {"add_count": 0, "remove_count": 0, "trailing_slash": None}
+        self.drop_param_set = set([param.lower() for param in self.rule["drop_param_list"]])
+        if self.rule["drop_tracking_params"]:
+            self.drop_param_set.update(TRACKING_PARAM_LIST)
+        self.keep_param_set = \
+            set([param.lower() for param in self.rule["keep_param_list"]]) if self.rule["keep_param_list"] is not None else \
+            None
+
+    def is_dropped_param(self, key):
+        key = unquote(key).lower()
+        if self.keep_param_set is not None:
+            return key not in self.keep_param_set
+        if key in self.drop_param_set:
+            return True
+        return self.rule["drop_tracking_params"] and key.startswith(tuple(TRACKING_PARAM_PREFIX_LIST))
+
+    def canonicalize_path(self, path):
+        if path == "":
+            path = "/"
+
+        segment = path[path.rfind("/")+1:]
+        if self.rule["remove_index_file"] and segment.lower() in INDEX_FILE_LIST:
+            path = path[:path.rfind("/")+1]
+            segment = ""
+
+        if self.rule["trailing_slash"] == "add" and segment != "" and "." not in segment:
+            path += "/"
+        elif self.rule["trailing_slash"] == "remove" and path != "/" and path.endswith("/"):
+            path = path.rstrip("/") or "/"
+        return path
+
+    # Learn the trailing slash of the site from redirects (e.g. "/world" -> "/world/"). Return True if learned.
+    # The rule is learned only if "learn_count" redirects agree and no redirect of the site goes the other way.
+    def learn_redirect(self, url, final_url):
+        if self.rule["trailing_slash"] != "auto":
+            return False
+        parsed_url = urlparse(url)
+        parsed_final_url = urlparse(final_url)
+        if parsed_url._replace(path="", fragment="") != parsed_final_url._replace(path="", fragment=""):
+            return False
+        if parsed_final_url.path == parsed_url.path + "/":
+            direction, other_direction = "add", "remove"
+        elif parsed_url.path == parsed_final_url.path + "/":
+            direction, other_direction = "remove", "add"
+        else:
+            return False
+
+        self.redirect_state[f"{direction}_count"] += 1
+        if self.redirect_state[f"{direction}_count"] >= self.learn_count and self.redirect_state[f"{other_direction}_count"] == 0:
+            self.rule["trailing_slash"] = direction
+            self.redirect_state["trailing_slash"] = direction
+            return True
+        return False
+
+    # Restore redirects and the learned rule from the checkpoint
+    def load_redirect_state(self, redirect_state):
+        self.redirect_state.update(redirect_state)
+        if self.auto_trailing_slash and self.redirect_state["trailing_slash"] is not None:
+            self.rule["trailing_slash"] = self.redirect_state["trailing_slash"]
+
+    # Key of the canonical url in the seen set. With "auto" rule, urls with and without trailing slash are the same key,
+    # so urls seen before the rule is learned are not queued again in the other form.
+    # Canonical url has no fragment, so the path ends before "?" (string operations, called for every link).
+    def get_seen_key(self, url):
+        if self.auto_trailing_slash is False:
+            return url
+        base_url, separator, query = url.partition("?")
+        if base_url.endswith("/") is False:
+            return url
+        stripped_url = base_url.rstrip("/")
+        # Root path ("scheme://host/") is kept
+        if stripped_url.count("/") < 3:
+            return url
+        return stripped_url + separator + query
+
+    def canonicalize_query(self, query):
+        # Parameters are kept as they are (not decoded and encoded again), only filtered and sorted
+        param_list = [param for param in query.split("&") if param != ""]
+        param_list = [param for param in param_list if self.is_dropped_param(param.split("=", 1)[0]) is False]
+        if self.rule["sort_query"]:
+            param_list = sorted(param_list)
+        return "&".join(param_list)
+
+    def canonicalize(self, url):
+        try:
+            parsed_url = urlparse(url)
+            port = parsed_url.port
+        except ValueError:
+            return url
+
+        scheme = parsed_url.scheme.lower()
+        netloc = (parsed_url.hostname or "").lower()
+        if parsed_url.hostname is not None and ":" in parsed_url.hostname:
+            netloc = f"[{netloc}]"
+        if port is not None and DEFAULT_PORT_DICT.get(scheme) != port:
+            netloc += f":{port}"
+        if "@" in parsed_url.netloc:
+            netloc = parsed_url.netloc.rsplit("@", 1)[0] + "@" + netloc
+
+        return urlunparse((
+            scheme, netloc, self.canonicalize_path(parsed_url.path), parsed_url.params,
+            self.canonicalize_query(parsed_url.query), "",
+        ))
@@ -0,0 +1,147 @@
+import sys
+import math
+import hashlib
+import numpy as np
+
+
+def url_hash_pair(url):
+    digest = hashlib.blake2b(url.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+    return int.from_bytes(digest[0:8], "little"), int.from_bytes(digest[8:16], "little")
+
+
+def url_fingerprint(url):
+    digest = hashlib.blake2b(url.encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class BloomFilter():
+    def __init__(self, capacity, fp_rate):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bit_size = max(int(-capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.bit_size / capacity * math.log(2))), 1)
+        self.bit_array = bytearray((self.bit_size + 7) // 8)
+        self.count = 0
+
+    def get_position_list(self, url):
+        h1, h2 = url_hash_pair(url)
+        return [(h1 + i * h2) % self.bit_size for i in range(self.hash_count)]
+
+    def contains_position(self, position_list):
+        for position in position_list:
+            if not self.bit_array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add_position(self, position_list):
+        for position in position_list:
+            self.bit_array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+# Scalable Bloom filter. A new filter (2x capacity, 1/2 false-positive rate) is added when the last one is full,
+# so the total false-positive rate stays under "fp_rate". If "memory_mb" is reached, the last filter keeps growing in count.
+class BloomUrlSet():
+    def __init__(self, capacity=1000000, fp_rate=0.001, memory_mb=None):
+        self.initial_capacity = capacity
+        self.fp_rate = fp_rate
+        self.memory_bytes = memory_mb * 1024 * 1024 if memory_mb is not None else None
+        # The first filter is also within "memory_mb" (smaller capacity than "capacity" if needed)
+        if self.memory_bytes is not None:
+            capacity = min(capacity, max(int(self.memory_bytes * 8 * math.log(2) ** 2 / -math.log(fp_rate / 2)), 1))
+        self.filter_list = [BloomFilter(capacity, fp_rate / 2)]
+        self.size = 0
+        self.reach_memory_limit = False
+
+    def __len__(self):
+        return self.size
+
+    def get_memory_bytes(self):
+        return sum([len(bloom_filter.bit_array) for bloom_filter in self.filter_list])
+
+    def __contains__(self, url):
+        position_cache = {}
+        for bloom_filter in self.filter_list:
+            key = (bloom_filter.bit_size, bloom_filter.hash_count)
+            if key not in position_cache:
+                position_cache[key] = bloom_filter.get_position_list(url)
+            if bloom_filter.contains_position(position_cache[key]):
+                return True
+        return False
+
+    def add(self, url):
+        if url in self:
+            return
+        last_filter = self.filter_list[-1]
+        if last_filter.count >= last_filter.capacity and self.reach_memory_limit is False:
+            next_filter_capacity = last_filter.capacity * 2
+            next_fp_rate = last_filter.fp_rate / 2
+            next_bytes = -next_filter_capacity * math.log(next_fp_rate) / math.log(2) ** 2 / 8
+            if self.memory_bytes is not None and self.get_memory_bytes() + next_bytes > self.memory_bytes:
+                print(f"Url seen set reaches memory limit, false-positive rate will increase (size: {self.size})")
+                self.reach_memory_limit = True
+            else:
+                last_filter = BloomFilter(next_filter_capacity, next_fp_rate)
+                self.filter_list.append(last_filter)
+        last_filter.add_position(last_filter.get_position_list(url))
+        self.size += 1
+
+
+# 64-bit hash of each url in a sorted array. Recently added hashes are kept in a small set and merged periodically.
+# False-positive rate is about size / 2^64. Memory is 8 bytes per url in the array, but about 70 bytes per url in the
+# set (up to 1/8 of the array), and a merge briefly needs a new array and the work arrays ("get_merge_peak_bytes").
+class FingerprintUrlSet():
+    def __init__(self, min_merge_size=65536):
+        self.sorted_array = np.zeros(0, dtype=np.uint64)
+        self.buffer_set = set()
+        self.min_merge_size = min_merge_size
+
+    def __len__(self):
+        return len(self.sorted_array) + len(self.buffer_set)
+
+    # Array, and the set with its int objects
+    def get_memory_bytes(self):
+        return self.sorted_array.nbytes + sys.getsizeof(self.buffer_set) + \
+            sum([sys.getsizeof(fingerprint) for fingerprint in self.buffer_set])
+
+    # Memory while the buffer is merged: merged array (8 bytes per url) and insert mask (1 byte per url),
+    # and the buffer array, its insert positions and their copies in np.insert (32 bytes per buffered url)
+    def get_merge_peak_bytes(self):
+        return self.get_memory_bytes() + len(self) * 9 + len(self.buffer_set) * 32
+
+    def contains_fingerprint(self, fingerprint):
+        if fingerprint in self.buffer_set:
+            return True
+        index = np.searchsorted(self.sorted_array, np.uint64(fingerprint))
+        return index < len(self.sorted_array) and int(self.sorted_array[index]) == fingerprint
+
+    def __contains__(self, url):
+        return self.contains_fingerprint(url_fingerprint(url))
+
+    def add(self, url):
+        fingerprint = url_fingerprint(url)
+        if self.contains_fingerprint(fingerprint):
+            return
+        self.buffer_set.add(fingerprint)
+        if len(self.buffer_set) >= max(self.min_merge_size, len(self.sorted_array) // 8):
+            self.merge()
+
+    # Hashes of the buffer are not in the array, so they are inserted at their positions (np.union1d would sort a
+    # concatenated copy and hold about 3x the array)
+    def merge(self):
+        buffer_array = np.fromiter(self.buffer_set, dtype=np.uint64, count=len(self.buffer_set))
+        buffer_array.sort()
+        self.sorted_array = np.insert(self.sorted_array, np.searchsorted(self.sorted_array, buffer_array), buffer_array)
+        self.buffer_set = set()
+
+
+# exact: Python set of url strings, bloom: "BloomUrlSet", fingerprint: "FingerprintUrlSet"
+def create_url_seen_set(url_seen_type="exact", capacity=1000000, fp_rate=0.001, memory_mb=None):
+    if url_seen_type == "exact":
+        return set()
+    elif url_seen_type == "bloom":
+        return BloomUrlSet(capacity=capacity, fp_rate=fp_rate, memory_mb=memory_mb)
+    elif url_seen_type == "fingerprint":
+        return FingerprintUrlSet()
+    else:
+        raise Exception(f"Not implemented url seen type: {url_seen_type}")
@@ -1,7 +1,12 @@
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
+import queue
+import shutil
 import traceback
 import itertools
+import json
+import threading
+from collections import Counter
 from multiprocessing import Manager, get_context
 
 
@@ -29,6 +34,83 @@ def thread_process_crawl(site_list, func_args, executor_type="thread", max_worke
     return processed_item_list
 
 
+# Append JSONL shards to the output file. "shard_info_list" is returned by "page_list_crawl" with shard_folder.
+def merge_page_shards(shard_info_list, output_file):
+    page_count = 0
+    for shard_info in shard_info_list:
+        with open(shard_info["shard_path"], "rb") as f:
+            shutil.copyfileobj(f, output_file)
+        page_count += shard_info["page_count"]
+    output_file.flush()
+    return page_count
+
+
+# Same as "thread_process_crawl", but each crawler writes page records to its shard while crawling.
+# Shards are merged into "output_path" as soon as each site finishes, and progress is reported by collected pages.
+def thread_process_crawl_stream(site_list, func_args, output_path, executor_type="thread", max_workers=32):
+
+    executor_class = \
+        ThreadPoolExecutor if executor_type == "thread" else \
+        ProcessPoolExecutor if executor_type == "process" else \
+        None
+
+    page_count = 0
+    with Manager() as manager, open(output_path, "wb") as output_file:
+        progress_queue = manager.Queue()
+        for crawler in site_list:
+            crawler.progress_queue = progress_queue
+
+        with executor_class(max_workers=max_workers) as executor:
+            futures = []
+            for crawler in site_list:
+                func = crawler.page_list_crawl
+                future = executor.submit(func, *func_args)
+                futures.append(future)
+
+            not_done = set(futures)
+            finished_site_count = 0
+            with tqdm(unit="page", smoothing=0.1) as pbar:
+                while len(not_done) > 0:
+                    done, not_done = wait(not_done, timeout=1.0, return_when=FIRST_COMPLETED)
+
+                    while True:
+                        try:
+                            pbar.update(progress_queue.get_nowait())
+                        except queue.Empty:
+                            break
+
+                    for future in done:
+                        try:
+                            shard_info_list = future.result()
+                        except Exception:
+                            raise Exception(traceback.format_exc())
+                        page_count += merge_page_shards(shard_info_list, output_file)
+                        finished_site_count += 1
+                        pbar.set_postfix(finished_site=f"{finished_site_count}/{len(site_list)}", merged_page=page_count)
+
+    return page_count
+
+
+# Write page records to JSONL file as soon as they are found. Shared by crawler threads.
+# If "seen_url_set" is specified, pages whose url is in the set are skipped (merge into existing list).
+class PageListWriter():
+    def __init__(self, output_file, seen_url_set=None):
+        self.output_file = output_file
+        self.seen_url_set = seen_url_set
+        self.lock = threading.Lock()
+        self.site_count = Counter()
+
+    def write(self, page):
+        line = json.dumps(page, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.seen_url_set is not None:
+                if page["url"] in self.seen_url_set:
+                    return
+                self.seen_url_set.add(page["url"])
+            self.output_file.write(line)
+            self.site_count[page["site_name"]] += 1
+
+
 def thread_process_crawl_index(site_list, func_args, executor_type="thread", max_workers=32):
 
     processed_item_list = []